@@ -0,0 +1,58 @@
+"""Compare `cat shards`' former pivot with the index × node matrix, on a synthetic `_cat/shards` response.
+
+Usage: python benchmarks/cat_shards.py [--shards N] [--nodes N]
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+
+from esctl.shards import ShardMatrix, _numpy
+
+
+def former_transform(shards_list, nodes):
+    """`CatShards.transform` before it used a matrix."""
+    for shard_index, shards in itertools.groupby(shards_list, key=lambda shard: shard.get("index")):
+        line = {"index": shard_index, **{n: "" for n in nodes}}
+
+        for shard in shards:
+            line[shard.get("node") or "UNASSIGNED"] = f"{shard.get('shard')}{shard.get('prirep')}"
+
+        yield line
+
+
+def timed(function) -> float:
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shards", type=int, default=40_000)
+    parser.add_argument("--nodes", type=int, default=300)
+    args = parser.parse_args()
+
+    random.seed(0)
+    nodes = [f"es-data-{n:03d}" for n in range(args.nodes)]
+    shards = [
+        {"index": f"logs-{i // 10:06d}", "node": random.choice(nodes), "shard": str(i % 5), "prirep": "pr"[i % 2]}
+        for i in range(args.shards)
+    ]
+
+    print(f"numpy : {'yes' if _numpy() is not None else 'no'}")
+    print(f"{'former pivot':<22} {timed(lambda: list(former_transform(shards, nodes))):8.1f} ms")
+
+    matrix = ShardMatrix.from_shards(shards, nodes)
+    print(f"{'matrix build':<22} {timed(lambda: ShardMatrix.from_shards(shards, nodes)):8.1f} ms")
+    print(f"{'matrix pivot':<22} {timed(lambda: list(matrix.rows())):8.1f} ms")
+    print(f"{'shards per node':<22} {timed(matrix.per_node):8.1f} ms")
+    print(f"{'skewed indices':<22} {timed(lambda: matrix.skewed_indices(10)):8.1f} ms")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
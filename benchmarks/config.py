@@ -0,0 +1,105 @@
+"""Compare loading a large config file with and without the config cache.
+
+Every load runs in a fresh interpreter, so import costs (YAML, cerberus) are accounted too.
+
+Usage: python benchmarks/config.py [--runs N] [--clusters N]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+LOAD = "import sys; from esctl.config import ConfigFileParser; ConfigFileParser().load_configuration(sys.argv[1])"
+
+
+def write_config_file(path: Path, clusters: int):
+    lines = ["settings:", "  max_retries: 3", "  timeout: 30", "clusters:"]
+
+    for i in range(clusters):
+        lines += [
+            f"  cluster-{i}:",
+            "    servers:",
+            *[f"      - https://es-{i}-{n}.example.com:9200" for n in range(3)],
+            "    settings:",
+            "      no_check_certificate: true",
+        ]
+
+    lines.append("users:")
+    for i in range(clusters):
+        lines += [
+            f"  user-{i}:",
+            f"    username: user-{i}",
+            "    external_password:",
+            "      command:",
+            f"        run: vault read -field=password secret/es/cluster-{i}",
+        ]
+
+    lines.append("contexts:")
+    for i in range(clusters):
+        lines += [
+            f"  context-{i}:",
+            f"    cluster: cluster-{i}",
+            f"    user: user-{i}",
+            "    pre_commands:",
+            f"      - command: kubectl port-forward svc/es-{i} 9200",
+            "        wait_for_exit: false",
+            "        wait_for_output: Forwarding from",
+        ]
+
+    lines.append("default-context: context-0")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def measure(config_file: Path, cache_dir: Path, runs: int, cached: bool) -> float:
+    timings = []
+    env = {**os.environ, "ESCTL_CACHE_DIR": str(cache_dir)}
+
+    # Populate the cache
+    subprocess.run([sys.executable, "-c", LOAD, str(config_file)], env=env, check=True)
+
+    for _ in range(runs):
+        if not cached:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", LOAD, str(config_file)], env=env, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs (default: 10)")
+    parser.add_argument(
+        "--clusters",
+        type=int,
+        default=400,
+        help="Number of clusters, users and contexts in the config (default: 400)",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = Path(directory) / "esctlrc.yml"
+        cache_dir = Path(directory) / "cache"
+        write_config_file(config_file, args.clusters)
+
+        print(f"Config file: {args.clusters} clusters, {config_file.stat().st_size // 1024} KiB")
+
+        uncached = measure(config_file, cache_dir, args.runs, cached=False)
+        cached = measure(config_file, cache_dir, args.runs, cached=True)
+
+    print(f"{'without cache':<15} {uncached:8.1f} ms")
+    print(f"{'with cache':<15} {cached:8.1f} ms ({uncached / cached:.1f}x faster)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""Compare `flatten_dict` with its former recursive implementation on a synthetic `nodes.stats?level=shards` response.
+
+Usage: python benchmarks/flatten.py [--nodes N] [--shards N] [--runs N]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from esctl.utils import flatten_dict
+
+SHARD_STATS = {
+    "routing": {"state": "STARTED", "primary": True, "node": "node", "relocating_node": None},
+    "docs": {"count": 123456, "deleted": 12},
+    "store": {"size_in_bytes": 987654321, "total_data_set_size_in_bytes": 987654321, "reserved_in_bytes": 0},
+    "indexing": {
+        "index_total": 1234,
+        "index_time_in_millis": 5678,
+        "index_current": 0,
+        "index_failed": 0,
+        "delete_total": 0,
+        "delete_time_in_millis": 0,
+        "is_throttled": False,
+    },
+    "search": {
+        "open_contexts": 0,
+        "query_total": 4321,
+        "query_time_in_millis": 8765,
+        "fetch_total": 1234,
+        "fetch_time_in_millis": 567,
+        "scroll_total": 0,
+    },
+    "merges": {"current": 0, "total": 12, "total_time_in_millis": 3456, "total_docs": 7890},
+    "refresh": {"total": 120, "total_time_in_millis": 345, "listeners": 0},
+    "segments": {"count": 42, "memory_in_bytes": 0, "index_writer_memory_in_bytes": 0},
+    "commit": {"id": "abcdefghijklmnopqrstuv==", "generation": 12, "user_data": {"max_seq_no": "1234"}},
+    "seq_no": {"max_seq_no": 1234, "local_checkpoint": 1234, "global_checkpoint": 1234},
+}
+
+
+def former_flatten_dict(dictionary):
+    """`esctl.utils.flatten_dict` before it became iterative."""
+
+    def expand(key, value):
+        if isinstance(value, dict):
+            return [(key + "." + k, v) for k, v in former_flatten_dict(value).items()]
+        return [(key, value)]
+
+    items = [item for k, v in dictionary.items() for item in expand(k, v)]
+
+    return dict(items)
+
+
+def synthetic_response(nodes: int, shards: int) -> dict:
+    return {
+        f"node-{n:04d}": {
+            "name": f"es-data-{n}",
+            "roles": ["data", "ingest"],
+            "indices": {
+                # Elasticsearch returns a list of {shard ID: stats} per index, which the former
+                # implementation doesn't flatten : use dicts so both do the same work
+                "shards": {f"index-{s:04d}": {str(s % 3): SHARD_STATS} for s in range(shards)},
+            },
+            "jvm": {"mem": {"heap_used_percent": 42, "heap_used_in_bytes": 123456789}},
+        }
+        for n in range(nodes)
+    }
+
+
+def timed(function, runs: int) -> tuple[float, int]:
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings), len(result)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=300)
+    parser.add_argument("--shards", type=int, default=20, help="Shards per node (default: 20)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    response = synthetic_response(args.nodes, args.shards)
+
+    cases = {
+        "former": lambda: former_flatten_dict(response),
+        "current": lambda: flatten_dict(response),
+        "current, max_depth=3": lambda: flatten_dict(response, max_depth=3),
+        "current, one node": lambda: flatten_dict(response, prefixes=["node-0000."]),
+    }
+
+    for name, function in cases.items():
+        median, keys = timed(function, args.runs)
+        print(f"{name:<22} {median:8.1f} ms {keys:>9} keys")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Compare the time and memory needed to hold the settings of many indices, one `Setting` per value or by column.
+
+The synthetic response looks like `GET _settings?include_defaults&flat_settings` : every index has a
+few explicit settings and the same defaults. It is parsed from JSON, like the Elasticsearch client does,
+so values aren't shared between indices until the table interns them.
+
+Usage: python benchmarks/index_settings.py [--indices N] [--defaults N]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from esctl.settings import IndexSettingsTable, Setting
+
+
+def synthetic_response(indices: int, defaults: int) -> dict:
+    return json.loads(
+        json.dumps(
+            {
+                f"logs-{i:06d}": {
+                    "settings": {
+                        "index.number_of_shards": "1",
+                        "index.number_of_replicas": str(1 + i % 2),
+                        "index.refresh_interval": "30s",
+                        "index.provided_name": f"logs-{i:06d}",
+                        "index.uuid": f"{i:022d}",
+                        "index.creation_date": str(1700000000000 + i),
+                    },
+                    "defaults": {f"index.default.setting_{d:04d}": "false" for d in range(defaults)},
+                }
+                for i in range(indices)
+            },
+        ),
+    )
+
+
+def one_setting_per_value(response: dict) -> dict:
+    """`IndexSettings.list_` before it stored settings by column."""
+    settings = {}
+
+    for index_name, index_settings in response.items():
+        settings[index_name] = {}
+        for setting_name, setting_value in index_settings.get("settings").items():
+            settings[index_name][setting_name] = Setting(setting_name, setting_value, "settings")
+        for setting_name, setting_value in index_settings.get("defaults").items():
+            settings[index_name][setting_name] = Setting(setting_name, setting_value, "defaults")
+
+    return settings
+
+
+def measure(function, response: dict) -> tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(response)
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return elapsed, peak / (1024 * 1024)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--indices", type=int, default=8_000)
+    parser.add_argument("--defaults", type=int, default=300, help="Default settings per index (default: 300)")
+    args = parser.parse_args()
+
+    response = synthetic_response(args.indices, args.defaults)
+
+    for name, function in [
+        ("one Setting per value", one_setting_per_value),
+        ("table", IndexSettingsTable.from_response),
+    ]:
+        elapsed, peak = measure(function, response)
+        print(f"{name:<22} {elapsed:8.1f} ms {peak:8.1f} MB")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Compare the peak memory used to output a large `_cat` response, with and without streaming.
+
+Every measure runs in a fresh interpreter and writes to /dev/null. The synthetic response looks like
+`_cat/indices?format=json` and is already parsed, like the Elasticsearch client returns it, so its own
+size is reported as a reference.
+
+Usage: python benchmarks/memory.py [--rows N]
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+from argparse import Namespace
+
+COLUMNS = [
+    ("index"),
+    ("health",),
+    ("status"),
+    ("uuid", "UUID"),
+    ("pri", "Primary"),
+    ("rep", "Replica"),
+    ("docs.count"),
+    ("docs.deleted"),
+    ("store.size"),
+    ("pri.store.size", "Primary Store Size"),
+]
+
+FORMATTERS = ["json", "csv", "ndjson"]
+
+
+def synthetic_response(rows: int) -> list[dict[str, str]]:
+    return [
+        {
+            "health": "green",
+            "status": "open",
+            "index": f"logs-{i:08d}",
+            "uuid": f"{i:022d}",
+            "pri": "1",
+            "rep": "1",
+            "docs.count": str(i * 7),
+            "docs.deleted": "0",
+            "store.size": f"{i % 1000}mb",
+            "pri.store.size": f"{i % 500}mb",
+        }
+        for i in range(rows)
+    ]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run(mode: str, formatter_name: str, rows: int):
+    """Output the synthetic response like esctl did before streaming ("materialized") or does now ("streaming")."""
+    from cliff.formatters.commaseparated import CSVLister
+    from cliff.formatters.json_format import JSONFormatter
+
+    from esctl.formatter import JSONToCliffFormatter, NDJSONFormatter, StreamingJSONFormatter
+
+    response = synthetic_response(rows)
+
+    if mode == "response":
+        print(f"{peak_rss_mb():.1f}")
+        return
+
+    headers, lines = JSONToCliffFormatter(response).format_for_lister(columns=COLUMNS)
+
+    if mode == "materialized":
+        lines = tuple(lines)
+        formatter = {"json": JSONFormatter, "csv": CSVLister, "ndjson": NDJSONFormatter}[formatter_name]()
+    else:
+        formatter = {"json": StreamingJSONFormatter, "csv": CSVLister, "ndjson": NDJSONFormatter}[formatter_name]()
+
+    with open("/dev/null", "w") as devnull:
+        formatter.emit_list(headers, lines, devnull, Namespace(noindent=False, quote_mode="nonnumeric"))
+
+    print(f"{peak_rss_mb():.1f}")
+
+
+def measure(mode: str, formatter_name: str, rows: int) -> float:
+    output = subprocess.run(
+        [sys.executable, __file__, "--rows", str(rows), "--run", mode, formatter_name],
+        stdout=subprocess.PIPE,
+        check=True,
+        text=True,
+    )
+    return float(output.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000, help="Number of rows in the response (default: 200000)")
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "FORMATTER"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run(*args.run, args.rows)
+        return 0
+
+    print(f"{'parsed response only':<20} {measure('response', 'json', args.rows):8.1f} MB")
+    print(f"{'formatter':<20} {'materialized':>12} {'streaming':>12}")
+
+    for formatter_name in FORMATTERS:
+        materialized = measure("materialized", formatter_name, args.rows)
+        streaming = measure("streaming", formatter_name, args.rows)
+        print(f"{formatter_name:<20} {materialized:9.1f} MB {streaming:9.1f} MB")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Measure the time and memory taken by `node stats --rate` samples, on synthetic nodes stats responses.
+
+Usage: python benchmarks/node_rates.py [--nodes N] [--metrics N] [--samples N]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from esctl.rates import CounterRates
+
+
+def sample(nodes: int, metrics: int, tick: int) -> dict:
+    return {
+        f"node-{n:03d}": {
+            "name": f"es-data-{n:03d}",
+            "timestamp": tick * 10_000,
+            "indices": {f"metric_{m:05d}": {"count": tick * m, "size_in_bytes": m} for m in range(metrics // 2)},
+        }
+        for n in range(nodes)
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=300)
+    parser.add_argument("--metrics", type=int, default=5_000)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    samples = [sample(args.nodes, args.metrics, tick) for tick in range(args.samples)]
+
+    counter_rates = CounterRates()
+    start = time.perf_counter()
+
+    for nodes_stats in samples:
+        counter_rates.add(nodes_stats)
+
+    added = time.perf_counter() - start
+    rates = counter_rates.rates(with_peaks=args.samples > 2)
+    computed = time.perf_counter() - start - added
+
+    # Measured apart, as tracing allocations slows everything down
+    tracemalloc.start()
+    kept = CounterRates()
+    for nodes_stats in samples:
+        kept.add(nodes_stats)
+    kept_size, _ = tracemalloc.get_traced_memory()
+    kept.rates(with_peaks=args.samples > 2)
+    _, peak = tracemalloc.get_traced_memory()
+
+    print(f"{args.nodes} nodes x {len(counter_rates.metrics)} counters, {args.samples} samples")
+    print(f"{'samples added':<16} {added * 1000:8.1f} ms")
+    print(f"{'rates computed':<16} {computed * 1000:8.1f} ms ({sum(len(r) for r in rates.values())} values)")
+    print(f"{'samples kept':<16} {kept_size / 2**20:8.1f} MiB")
+    print(f"{'peak memory':<16} {peak / 2**20:8.1f} MiB")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
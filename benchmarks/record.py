@@ -0,0 +1,62 @@
+"""Measure the CPU time and disk space taken by `esctl record` per poll, on synthetic nodes stats responses.
+
+Usage: python benchmarks/record.py [--nodes N] [--metrics N] [--polls N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+from esctl.record import MetricsStore
+
+
+def nodes_stats(nodes: int, metrics: int, tick: int) -> dict:
+    return {
+        "nodes": {
+            f"node-{n:03d}": {
+                "name": f"es-data-{n:03d}",
+                "timestamp": 1_700_000_000_000 + tick * 1000,
+                "indices": {
+                    f"metric_{m:04d}": {"total": tick * m + random.randint(0, 9), "time_in_millis": tick * 3}
+                    for m in range(metrics // 2)
+                },
+            }
+            for n in range(nodes)
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=300)
+    parser.add_argument("--metrics", type=int, default=1_000)
+    parser.add_argument("--polls", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    samples = [nodes_stats(args.nodes, args.metrics, tick) for tick in range(args.polls)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = MetricsStore(os.path.join(directory, "record.sqlite"))
+        start = time.process_time()
+
+        for tick, sample in enumerate(samples):
+            store.append("nodes stats", tick, sample)
+
+        store.close()
+        cpu = time.process_time() - start
+        # The write-ahead log holds whatever wasn't checkpointed into the file yet
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+    print(f"{args.nodes} nodes x {args.metrics} metrics, {args.polls} polls")
+    print(f"{'CPU per poll':<16} {cpu / args.polls * 1000:8.1f} ms")
+    print(f"{'disk per poll':<16} {size / args.polls / 2**10:8.1f} KiB")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Measure esctl's cold start time and fail if it exceeds the regression budget.
+
+Every command is run in a fresh interpreter, like it would be from a shell script or a cron job.
+Network commands are run against a local stub HTTP server so that only esctl's own overhead is measured.
+
+With `--daemon`, commands go through the `esctl` launcher and are forwarded to a daemon started for the benchmark.
+
+Usage: python benchmarks/startup.py [--runs N] [--budget-factor F] [--daemon]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Median wall-clock time allowed for each command, in milliseconds.
+BUDGETS = {
+    ("--help",): 350,
+    ("cluster", "health"): 450,
+    ("config", "show"): 300,
+}
+
+# Run the command in-process, like the `esctl` executable does when no daemon is running
+ENTRY_POINT = "import sys; from esctl.main import main; sys.exit(main(sys.argv[1:]))"
+# Same as the `esctl` console script generated at install time
+LAUNCHER_ENTRY_POINT = "import sys; from esctl.launcher import main; sys.exit(main(sys.argv[1:]))"
+
+RESPONSES = {
+    "/_cluster/health": {
+        "cluster_name": "benchmark",
+        "status": "green",
+        "timed_out": False,
+        "number_of_nodes": 3,
+        "number_of_data_nodes": 3,
+        "active_primary_shards": 10,
+        "active_shards": 20,
+        "relocating_shards": 0,
+        "initializing_shards": 0,
+        "unassigned_shards": 0,
+    },
+}
+
+
+class StubElasticsearchHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps(RESPONSES.get(self.path.split("?")[0], {})).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("X-Elastic-Product", "Elasticsearch")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_config_file(directory: str, port: int) -> str:
+    path = Path(directory) / "esctlrc.yml"
+    path.write_text(
+        "clusters:\n"
+        "  benchmark:\n"
+        "    servers:\n"
+        f"      - http://127.0.0.1:{port}\n"
+        "contexts:\n"
+        "  benchmark:\n"
+        "    cluster: benchmark\n"
+        "default-context: benchmark\n"
+        "settings: {}\n"
+        "users: {}\n",
+    )
+    return str(path)
+
+
+def measure(command: tuple[str, ...], config_file: str, runs: int, entry_point: str = ENTRY_POINT) -> float:
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", entry_point, "--config", config_file, *command],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs per command (default: 10)")
+    parser.add_argument(
+        "--budget-factor",
+        type=float,
+        default=1.0,
+        help="Multiply every budget by this factor, useful on slow machines (default: 1.0)",
+    )
+    parser.add_argument("--daemon", action="store_true", help="Forward commands to an esctl daemon")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubElasticsearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    over_budget = False
+    baseline = measure_interpreter(args.runs)
+    print(f"{'python -c pass':<20} {baseline:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = write_config_file(directory, server.server_address[1])
+        entry_point = ENTRY_POINT
+        daemon = None
+
+        if args.daemon:
+            entry_point = LAUNCHER_ENTRY_POINT
+            daemon = start_daemon(os.path.join(directory, "daemon.sock"))
+
+        for command, budget in BUDGETS.items():
+            budget = budget * args.budget_factor
+            median = measure(command, config_file, args.runs, entry_point)
+            status = "ok" if median <= budget else "OVER BUDGET"
+            over_budget = over_budget or median > budget
+            print(f"{' '.join(command):<20} {median:8.1f} ms (budget: {budget:.0f} ms) {status}")
+
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+
+    server.shutdown()
+
+    return 1 if over_budget else 0
+
+
+def start_daemon(path: str) -> subprocess.Popen:
+    os.environ["ESCTL_DAEMON_SOCKET"] = path
+    daemon = subprocess.Popen([sys.executable, "-m", "esctl.daemon", path], stderr=subprocess.DEVNULL)
+
+    while not os.path.exists(path):
+        time.sleep(0.01)
+
+    return daemon
+
+
+def measure_interpreter(runs: int) -> float:
+    timings = []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
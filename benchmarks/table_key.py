@@ -0,0 +1,95 @@
+"""Measure how long it takes to build the `TableKey`s of a large flattened `node stats` response.
+
+Keys look like `<node id>.indices.search.query_time_in_millis`: every node shares the same keys, with
+its own prefix. The first pass starts with empty caches, the second one shows repeated calls (like
+`--watch`, interactive mode or the daemon). Both are compared to the implementation without cache.
+
+Usage: python benchmarks/table_key.py [--keys N [N ...]]
+"""
+
+import argparse
+import sys
+import time
+
+from esctl.formatter import TableKey, _format_word, _name_from_id
+
+STATS_KEYS = [
+    "indices.docs.count",
+    "indices.docs.deleted",
+    "indices.store.size_in_bytes",
+    "indices.indexing.index_total",
+    "indices.indexing.index_time_in_millis",
+    "indices.search.query_total",
+    "indices.search.query_time_in_millis",
+    "indices.search.fetch_time_in_millis",
+    "indices.merges.total_docs",
+    "indices.segments.memory_in_bytes",
+    "os.cpu.percent",
+    "os.mem.used_percent",
+    "process.open_file_descriptors",
+    "jvm.mem.heap_used_percent",
+    "jvm.gc.collectors.young.collection_time_in_millis",
+    "jvm.gc.collectors.old.collection_count",
+    "thread_pool.write.queue",
+    "thread_pool.search.rejected",
+    "fs.total.available_in_bytes",
+    "transport.rx_size_in_bytes",
+]
+
+
+def uncached_name(id: str) -> str:
+    """Name computed without any cache, like esctl used to."""
+    name = TableKey._split_string(id)
+
+    for idx in range(len(name)):
+        name[idx] = TableKey._format_special_word(name[idx])
+
+        if all(char.islower() for char in name[idx]):
+            name[idx] = name[idx].title()
+        elif name[idx].startswith("_"):
+            name[idx] = name[idx][0] + name[idx][1].upper() + name[idx][2:]
+        else:
+            name[idx] = name[idx][0].upper() + name[idx][1:]
+
+    return " ".join(name)
+
+
+def synthetic_keys(count: int) -> list[str]:
+    nodes = count // len(STATS_KEYS) + 1
+    keys = [f"node{n:06d}_{n * 7919 % 10**6:06d}.{key}" for n in range(nodes) for key in STATS_KEYS]
+    return keys[:count]
+
+
+def timed(function, keys: list[str]) -> float:
+    start = time.perf_counter()
+    function(keys)
+    return (time.perf_counter() - start) * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    args = parser.parse_args()
+
+    print(f"{'keys':>8} {'uncached':>12} {'first pass':>12} {'second pass':>12} {'hit ratio':>10}")
+
+    for count in args.keys:
+        keys = synthetic_keys(count)
+        _name_from_id.cache_clear()
+        _format_word.cache_clear()
+
+        uncached = timed(lambda keys: [uncached_name(key) for key in keys], keys)
+        first = timed(lambda keys: [TableKey(key) for key in keys], keys)
+        second = timed(lambda keys: [TableKey(key) for key in keys], keys)
+        info = _name_from_id.cache_info()
+
+        print(
+            f"{count:>8} {uncached:>9.1f} ms {first:>9.1f} ms {second:>9.1f} ms "
+            f"{info.hits / (info.hits + info.misses):>9.0%}",
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Measure how unevenly shards are spread over nodes, and plan moves to even it out.
+
+The planner is greedy : it repeatedly moves one shard from the most loaded node
+to the least loaded one which can accept it. Both ends are taken from heaps,
+whose stale entries are skipped when popped, so each move costs a logarithmic
+number of heap operations plus a scan of the source node's shards.
+"""
+
+import heapq
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any
+
+# What the planner evens out, and the load each shard puts on its node for it
+METRICS = {
+    "shards": lambda shard: 1,
+    "disk": lambda shard: shard.store,
+    "write": lambda shard: shard.writes,
+}
+
+# Number of least loaded nodes tried as a target before giving up on the most loaded one
+MAX_TARGETS_TRIED = 16
+
+
+def _int(value: Any) -> int:
+    return int(value) if value not in (None, "") else 0
+
+
+class Shard:
+    __slots__ = ("index", "node", "number", "prirep", "store", "writes")
+
+    def __init__(self, index: str, number: str, prirep: str, node: str, store: int = 0, writes: int = 0):
+        self.index = index
+        self.number = number
+        self.prirep = prirep
+        self.node = node
+        self.store = store
+        self.writes = writes
+
+    @property
+    def copy_id(self) -> tuple[str, str]:
+        """The shard this is a copy of : all its copies share it."""
+        return (self.index, self.number)
+
+
+class Node:
+    __slots__ = ("attributes", "disk_total", "disk_used", "load", "name", "shards")
+
+    def __init__(self, name: str, disk_used: int = 0, disk_total: int = 0, attributes: dict[str, str] | None = None):
+        self.name = name
+        self.shards: list[Shard] = []
+        self.disk_used = disk_used
+        self.disk_total = disk_total
+        self.attributes = attributes or {}
+        self.load = 0
+
+    def totals(self) -> dict[str, int]:
+        return {metric: sum(value(shard) for shard in self.shards) for metric, value in METRICS.items()}
+
+
+class Move:
+    __slots__ = ("shard", "source", "target")
+
+    def __init__(self, shard: Shard, source: str, target: str):
+        self.shard = shard
+        self.source = source
+        self.target = target
+
+    def as_reroute_command(self) -> dict[str, Any]:
+        return {
+            "move": {
+                "index": self.shard.index,
+                "shard": int(self.shard.number),
+                "from_node": self.source,
+                "to_node": self.target,
+            },
+        }
+
+
+class ClusterLayout:
+    """Nodes of a cluster and the started shards each of them holds."""
+
+    def __init__(self, nodes: dict[str, Node]):
+        self.nodes = nodes
+        # Nodes holding a copy of every shard, including the target of relocations
+        self.holders: dict[tuple[str, str], set[str]] = defaultdict(set)
+
+    @classmethod
+    def from_cat(
+        cls,
+        shards: Iterable[dict[str, Any]],
+        allocation: Iterable[dict[str, Any]],
+        node_attributes: Iterable[dict[str, Any]] = (),
+    ) -> "ClusterLayout":
+        """Build the layout from `_cat/shards` (index, shard, prirep, state, node, store, indexing.index_total),
+        `_cat/allocation` (node, disk.used, disk.total) and `_cat/nodeattrs` (node, attr, value), sizes in bytes.
+        """
+        attributes: dict[str, dict[str, str]] = defaultdict(dict)
+        for attribute in node_attributes:
+            attributes[attribute.get("node")][attribute.get("attr")] = attribute.get("value")
+
+        layout = cls(
+            {
+                node.get("node"): Node(
+                    node.get("node"),
+                    disk_used=_int(node.get("disk.used")),
+                    disk_total=_int(node.get("disk.total")),
+                    attributes=attributes.get(node.get("node")),
+                )
+                for node in allocation
+                # Unassigned shards get their own line
+                if node.get("node") != "UNASSIGNED"
+            },
+        )
+
+        for line in shards:
+            if not line.get("node"):
+                continue
+
+            # A relocating shard's node is like "node-1 -> 1.2.3.4 abcd node-2"
+            source, _, relocation = line.get("node").partition(" -> ")
+            shard = Shard(
+                line.get("index"),
+                line.get("shard"),
+                line.get("prirep"),
+                source,
+                store=_int(line.get("store")),
+                writes=_int(line.get("indexing.index_total")),
+            )
+
+            layout.holders[shard.copy_id].add(source)
+            if relocation:
+                layout.holders[shard.copy_id].add(relocation.split(" ")[-1])
+
+            # Initializing and relocating shards can't be moved (again) until they are started
+            if source in layout.nodes and line.get("state") == "STARTED":
+                layout.nodes[source].shards.append(shard)
+
+        return layout
+
+    def skew(self) -> dict[str, int]:
+        """Return, for every metric, the difference between the most and the least loaded nodes."""
+        totals = [node.totals() for node in self.nodes.values()]
+
+        return (
+            {
+                metric: max(total[metric] for total in totals) - min(total[metric] for total in totals)
+                for metric in METRICS
+            }
+            if totals
+            else {}
+        )
+
+
+class BalancePlanner:
+    """Plan shard moves reducing the difference between the most and the least loaded nodes.
+
+    :param layout: The current layout, which is updated as moves are planned
+    :param metric: What to even out : `shards`, `disk` or `write`
+    :param max_moves: Maximum number of moves to plan
+    :param awareness_attributes: Node attributes two copies of a shard must not share (like `zone`)
+    :param max_disk_ratio: Don't move a shard to a node if its disk would be used above this ratio
+    :param excluded_nodes: Nodes shards aren't moved to or from
+    """
+
+    def __init__(
+        self,
+        layout: ClusterLayout,
+        metric: str = "shards",
+        max_moves: int = 20,
+        awareness_attributes: list[str] | None = None,
+        max_disk_ratio: float = 0.85,
+        excluded_nodes: Iterable[str] = (),
+    ):
+        self.layout = layout
+        self.value = METRICS[metric]
+        self.unit = metric == "shards"
+        self.max_moves = max_moves
+        self.awareness_attributes = awareness_attributes or []
+        self.max_disk_ratio = max_disk_ratio
+        self.nodes = [node for name, node in layout.nodes.items() if name not in set(excluded_nodes)]
+
+    def plan(self) -> list[Move]:
+        if len(self.nodes) < 2:
+            return []
+
+        versions: dict[str, int] = {}
+        most_loaded: list[tuple[int, int, str]] = []
+        least_loaded: list[tuple[int, int, str]] = []
+
+        def push(node: Node):
+            versions[node.name] = versions.get(node.name, -1) + 1
+            heapq.heappush(most_loaded, (-node.load, versions[node.name], node.name))
+            heapq.heappush(least_loaded, (node.load, versions[node.name], node.name))
+
+        def pop(heap) -> Node | None:
+            # Entries pushed before the node's last change are stale
+            while heap:
+                _, version, name = heapq.heappop(heap)
+                if version == versions[name]:
+                    return self.layout.nodes[name]
+            return None
+
+        for node in self.nodes:
+            node.load = sum(self.value(shard) for shard in node.shards)
+            push(node)
+
+        moves: list[Move] = []
+
+        while len(moves) < self.max_moves:
+            source = pop(most_loaded)
+            if source is None:
+                break
+
+            targets = []
+            move = None
+
+            while len(targets) < MAX_TARGETS_TRIED:
+                target = pop(least_loaded)
+                if target is None or target is source:
+                    break
+                targets.append(target)
+
+                shard = self._pick(source, target)
+                if shard is not None:
+                    move = Move(shard, source.name, target.name)
+                    break
+
+                # Later targets are more loaded : no move would help anymore
+                if source.load - target.load < (2 if self.unit else 1):
+                    break
+
+            for target in targets:
+                if move is None or target.name != move.target:
+                    heapq.heappush(least_loaded, (target.load, versions[target.name], target.name))
+
+            if move is None:
+                # Nothing can leave the most loaded node : try with the next one, leaving it out of the heaps
+                versions[source.name] += 1
+                continue
+
+            self._apply(move)
+            moves.append(move)
+            push(source)
+            push(self.layout.nodes[move.target])
+
+        return moves
+
+    def _pick(self, source: Node, target: Node) -> Shard | None:
+        """Return the shard of `source` whose move to `target` evens them out the most, if any."""
+        difference = source.load - target.load
+        best, best_distance = None, None
+
+        for shard in source.shards:
+            value = self.value(shard)
+
+            # The move must make both nodes closer, without swapping which one is the most loaded
+            if not 0 < value < difference or (self.unit and difference < 2) or not self._allowed(shard, target):
+                continue
+
+            # Closest to half the difference, the cheapest to move when equal
+            distance = (abs(difference - 2 * value), shard.store)
+            if best_distance is None or distance < best_distance:
+                best, best_distance = shard, distance
+
+        return best
+
+    def _allowed(self, shard: Shard, target: Node) -> bool:
+        holders = self.layout.holders[shard.copy_id]
+
+        if target.name in holders:
+            return False
+
+        if target.disk_total and target.disk_used + shard.store > self.max_disk_ratio * target.disk_total:
+            return False
+
+        for attribute in self.awareness_attributes:
+            value = target.attributes.get(attribute)
+            others = {
+                self.layout.nodes[holder].attributes.get(attribute)
+                for holder in holders
+                if holder != shard.node and holder in self.layout.nodes
+            }
+
+            if value is not None and value in others:
+                return False
+
+        return True
+
+    def _apply(self, move: Move):
+        source, target = self.layout.nodes[move.source], self.layout.nodes[move.target]
+        shard = move.shard
+
+        source.shards.remove(shard)
+        target.shards.append(shard)
+        source.load -= self.value(shard)
+        target.load += self.value(shard)
+        source.disk_used -= shard.store
+        target.disk_used += shard.store
+
+        self.layout.holders[shard.copy_id].discard(move.source)
+        self.layout.holders[shard.copy_id].add(move.target)
+        shard.node = move.target
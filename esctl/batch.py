@@ -0,0 +1,168 @@
+"""Run an operation over many indices, in batches sent concurrently.
+
+Every batch is a comma-separated list of index names sent in a single request.
+Batches run in a bounded thread pool, start no faster than a given rate (so the
+master node isn't flooded with cluster state updates), and are retried with an
+exponential backoff when the failure is likely transient.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any
+
+# Index names longer than this don't fit in a request line (4096 bytes by default in Elasticsearch)
+MAX_BATCH_LENGTH = 3072
+
+# HTTP statuses worth retrying : too many requests and unavailable or overloaded nodes
+RETRYABLE_STATUSES = [429, 502, 503, 504]
+
+
+def chunks(names: Iterable[str], size: int, max_length: int = MAX_BATCH_LENGTH) -> list[list[str]]:
+    """Split names into batches of at most `size` names, whose comma-separated list fits in `max_length`."""
+    batches: list[list[str]] = []
+    batch: list[str] = []
+    length = 0
+
+    for name in names:
+        if batch and (len(batch) >= size or length + 1 + len(name) > max_length):
+            batches.append(batch)
+            batch, length = [], 0
+
+        batch.append(name)
+        length += len(name) + (1 if length else 0)
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether the error is transient : a timeout, a lost connection or an overloaded cluster."""
+    from elastic_transport import TransportError
+
+    if isinstance(error, TransportError):
+        return True
+
+    return getattr(error, "status_code", None) in RETRYABLE_STATUSES
+
+
+class RateLimiter:
+    """Space out the calls to `wait` so no more than `rate` of them return per second, whatever the thread."""
+
+    def __init__(self, rate: float | None):
+        self.interval = 1 / rate if rate else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class BatchResult:
+    __slots__ = ("attempts", "duration", "error", "names", "response")
+
+    def __init__(self, names: list[str]):
+        self.names = names
+        self.response: Any = None
+        self.error: Exception | None = None
+        self.attempts = 0
+        self.duration = 0.0
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+class BatchRunner:
+    """Call `operation` with each batch of names, concurrently.
+
+    :param operation: Called with the comma-separated names of a batch, returns the response
+    :param workers: Maximum number of batches running at the same time
+    :param retries: Number of times a batch is retried after a transient failure
+    :param rate: Maximum number of batches started per second (None for no limit)
+    :param backoff: Seconds to wait before the first retry, doubled on every attempt
+    :param on_done: Called with every finished batch, in completion order, and the number of finished batches
+    :param already_done: Tells whether the error of a retried batch means an earlier attempt went through,
+        like a deletion answered with a 404 after a timeout
+    """
+
+    log = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        operation: Callable[[str], Any],
+        workers: int = 4,
+        retries: int = 2,
+        rate: float | None = None,
+        backoff: float = 1.0,
+        on_done: Callable[[BatchResult, int], None] | None = None,
+        already_done: Callable[[Exception], bool] | None = None,
+    ):
+        self.operation = operation
+        self.workers = workers
+        self.retries = retries
+        self.rate_limiter = RateLimiter(rate)
+        self.backoff = backoff
+        self.on_done = on_done
+        self.already_done = already_done
+
+    def run(self, batches: list[list[str]]) -> list[BatchResult]:
+        """Run every batch, and return their results in the order of `batches`."""
+        results = [BatchResult(batch) for batch in batches]
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="esctl-batch") as executor:
+            futures = [executor.submit(self._run_batch, result) for result in results]
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+
+                if self.on_done is not None:
+                    self.on_done(result, done)
+
+        return results
+
+    def _run_batch(self, result: BatchResult) -> BatchResult:
+        from elastic_transport import TransportError
+        from elasticsearch import ApiError
+
+        start = time.monotonic()
+
+        while True:
+            self.rate_limiter.wait()
+            result.attempts += 1
+
+            try:
+                result.response = self.operation(",".join(result.names))
+                result.error = None
+                break
+            except (ApiError, TransportError) as error:
+                if result.attempts > 1 and self.already_done is not None and self.already_done(error):
+                    self.log.info(f"Batch of {len(result.names)} indices was applied by an earlier attempt ({error})")
+                    result.error = None
+                    break
+
+                result.error = error
+
+                if result.attempts > self.retries or not is_retryable(error):
+                    break
+
+                delay = self.backoff * 2 ** (result.attempts - 1)
+                self.log.warning(f"Batch of {len(result.names)} indices failed ({error}), retrying in {delay:g}s")
+                time.sleep(delay)
+
+        result.duration = time.monotonic() - start
+
+        return result
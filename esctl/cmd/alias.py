@@ -5,9 +5,14 @@ from esctl.formatter import JSONToCliffFormatter
 class AliasList(EsctlLister):
     """List all aliases."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
         aliases = self.es.cat.aliases(name=parsed_args.alias, format="json")
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, aliases)
+
         return JSONToCliffFormatter(aliases).format_for_lister(
             columns=[("index",), ("alias",)],
         )
@@ -1,5 +1,8 @@
+import fnmatch
+
 from esctl.commands import EsctlLister
 from esctl.formatter import JSONToCliffFormatter
+from esctl.shards import ShardMatrix
 from esctl.utils import Color
 
 
@@ -10,8 +13,15 @@ class CatAllocation(EsctlLister):
     and their disk space.
     """
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        allocation = self.transform(self.es.cat.allocation(format="json"))
+        allocation = self.es.cat.allocation(format="json")
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, allocation)
+
+        allocation = self.transform(allocation)
 
         return JSONToCliffFormatter(allocation).format_for_lister(
             columns=[
@@ -28,10 +38,10 @@ class CatAllocation(EsctlLister):
         )
 
     def transform(self, allocation):
-        nodes = []
+        colorize = self.uses_table_formatter()
 
         for node in allocation:
-            if self.uses_table_formatter() and node.get("disk.percent") is not None:
+            if colorize and node.get("disk.percent") is not None:
                 if int(node.get("disk.percent")) > 85:
                     node["disk.percent"] = Color.colorize(
                         node.get("disk.percent"),
@@ -44,16 +54,21 @@ class CatAllocation(EsctlLister):
                         Color.YELLOW,
                     )
 
-            nodes.append(node)
-
-        return nodes
+            yield node
 
 
 class CatPlugins(EsctlLister):
     """Returns informations about installed plugins across nodes."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        plugins = self.transform(self.es.cat.plugins(format="json"))
+        plugins = self.es.cat.plugins(format="json")
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, plugins)
+
+        plugins = self.transform(plugins)
 
         return JSONToCliffFormatter(plugins).format_for_lister(
             columns=[("name", "node"), ("component", "plugin"), ("version")],
@@ -64,53 +79,65 @@ class CatPlugins(EsctlLister):
 
 
 class CatShards(EsctlLister):
-    """Provides a detailed view of shard allocation on nodes."""
+    """Provides a detailed view of shard allocation on nodes.
+
+    Besides the index × node table, shards can be summed up per node, or the
+    indices whose shards are the most concentrated on a single node listed.
+    """
+
+    read_only = True
 
     def take_action(self, parsed_args):
-        nodes = [n.get("name") for n in self.es.cat.nodes(format="json", h="name")]
-        shards = self.transform(
-            self.es.cat.shards(
+        def get_shards():
+            # Shards are sorted by index so that every index's line keeps the order of the response
+            return self.es.cat.shards(
                 format="json",
                 index=parsed_args.index,
-                h="index,node,shard,prirep",
-            ),
-            nodes,
-        )
-
-        columns = [("index",)] + [
-            (
-                n,
-                n.lower(),
+                h="index,node,shard,prirep,state",
+                s="index",
             )
-            for n in nodes
-        ]
 
-        if self.has_unassigned_shards:
-            columns = columns + [("UNASSIGNED",)]
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, get_shards())
 
-        return JSONToCliffFormatter(shards).format_for_lister(columns=columns)
+        shards, nodes_list = self.concurrently(get_shards, lambda: self.es.cat.nodes(format="json", h="name"))
 
-    def transform(self, shards_list: list[dict[str, str]], nodes: list[str]):
-        indices = {}
-        self.has_unassigned_shards: bool = False
+        if parsed_args.state is not None:
+            states = parsed_args.state.upper().split(",")
+            shards = [shard for shard in shards if shard.get("state") in states]
+
+        all_nodes = [n.get("name") for n in nodes_list]
+        nodes = None
+
+        if parsed_args.node is not None:
+            nodes = [
+                node
+                for node in all_nodes
+                if any(fnmatch.fnmatch(node, pattern) for pattern in parsed_args.node.split(","))
+            ]
+
+        matrix = ShardMatrix.from_shards(shards, all_nodes)
 
-        for shard in shards_list:
-            shard_index = shard.get("index")
+        if parsed_args.view == "nodes":
+            lines = [line for line in matrix.per_node() if nodes is None or line.get("node") in nodes]
+            return JSONToCliffFormatter(lines).format_for_lister(
+                columns=[("node",), ("shards",), ("primaries",), ("replicas",)],
+            )
 
-            if shard_index not in indices:
-                indices[shard_index] = {
-                    "index": shard_index,
-                    **{n: "" for n in nodes},
-                }
+        if parsed_args.view == "skew":
+            return JSONToCliffFormatter(matrix.skewed_indices(parsed_args.top)).format_for_lister(
+                columns=[("index",), ("shards",), ("nodes",), ("max_per_node", "Max Per Node"), ("skew",)],
+            )
 
-            shard_node = shard.get("node") or "UNASSIGNED"
+        columns = [("index",)] + [(n, n.lower()) for n in (all_nodes if nodes is None else nodes)]
 
-            if shard_node == "UNASSIGNED":
-                self.has_unassigned_shards = True
+        if nodes is None and matrix.has_unassigned():
+            columns = columns + [("UNASSIGNED",)]
 
-            indices[shard_index][shard_node] = f"{shard.get('shard')}{shard.get('prirep')}"
+        return JSONToCliffFormatter(matrix.rows(nodes)).format_for_lister(columns=columns)
 
-        return list(indices.values())
+    def transform(self, shards_list: list[dict[str, str]], nodes: list[str]):
+        return ShardMatrix.from_shards(shards_list, nodes).rows()
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -119,6 +146,29 @@ class CatShards(EsctlLister):
             help="A comma-separated list of index names to limit the returned information",
             nargs="?",
         )
+        parser.add_argument(
+            "--view",
+            choices=["indices", "nodes", "skew"],
+            default="indices",
+            help=(
+                "What to show : the shards of every index on every node, the number of shards per node, "
+                "or the indices whose shards are the most concentrated on a node (default: indices)"
+            ),
+        )
+        parser.add_argument(
+            "--node",
+            help="Comma-separated list of node names (or wildcard expressions) to limit the returned information",
+        )
+        parser.add_argument(
+            "--state",
+            help="Comma-separated list of shard states to keep (STARTED, RELOCATING, INITIALIZING, UNASSIGNED)",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="Number of indices shown by the skew view (default: 10)",
+        )
         return parser
 
 
@@ -128,19 +178,25 @@ class CatThreadpool(EsctlLister):
     Thread pools reference : https://www.elastic.co/guide/en/elasticsearch/reference/6.8/modules-threadpool.html  # noqa
     """
 
+    read_only = True
     _default_headers = "node_name,name,active,queue,rejected,type"
+    counter_columns = ("Rejected", "Completed")
+    key_columns = 2
 
     def take_action(self, parsed_args):
         headers = parsed_args.headers if parsed_args.headers else self._default_headers
 
-        thread_pools = self.transform(
-            self.es.cat.thread_pool(
-                format="json",
-                h=headers,
-                thread_pool_patterns=parsed_args.thread_pool_patterns,
-            ),
+        thread_pools = self.es.cat.thread_pool(
+            format="json",
+            h=headers,
+            thread_pool_patterns=parsed_args.thread_pool_patterns,
         )
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, thread_pools)
+
+        thread_pools = self.transform(thread_pools)
+
         return JSONToCliffFormatter(thread_pools).format_for_lister(
             columns=[(h,) for h in headers.split(",")],
         )
@@ -178,9 +234,14 @@ class CatThreadpool(EsctlLister):
 class CatTemplates(EsctlLister):
     """Returns information about existing templates."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
         templates = self.es.cat.templates(name=parsed_args.name, format="json")
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, templates)
+
         return JSONToCliffFormatter(templates).format_for_lister(
             columns=[("name",), ("index_patterns",), ("order",), ("version")],
         )
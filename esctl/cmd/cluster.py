@@ -1,14 +1,22 @@
-import elasticsearch as elasticsearch
+import fnmatch
+import sys
+import time
 
+from esctl.balance import BalancePlanner, ClusterLayout
 from esctl.cmd.settings import AbstractClusterSettings
 from esctl.commands import EsctlLister, EsctlShowOne
+from esctl.formatter import JSONToCliffFormatter
 from esctl.utils import Color, flatten_dict
 
 
 class ClusterAllocationExplain(EsctlLister):
     """Provide explanations for shard allocations failures."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
+        import elasticsearch
+
         try:
             response = self.es.cluster.allocation_explain()
         except elasticsearch.TransportError as transport_error:
@@ -20,6 +28,9 @@ class ClusterAllocationExplain(EsctlLister):
 
                 return (("Attribute", "Value"), tuple())
         else:
+            if parsed_args.jmespath is not None:
+                return self.jmespath_output(parsed_args.jmespath, response)
+
             output = {
                 "index": response.get("index"),
                 "can_allocate": response.get("can_allocate"),
@@ -38,11 +49,190 @@ class ClusterAllocationExplain(EsctlLister):
             return (("Attribute", "Value"), tuple(output.items()))
 
 
+class ClusterBalance(EsctlLister):
+    """Show how unevenly shards are spread over nodes, and plan the shard moves evening it out.
+
+    The moves are only shown, unless `--execute` is given : they are then sent in
+    small batches, each one waiting for the previous relocations to complete.
+    """
+
+    def is_read_only(self, parsed_args) -> bool:
+        return not parsed_args.execute
+
+    def take_action(self, parsed_args):
+        awareness_attributes = parsed_args.awareness_attributes.split(",") if parsed_args.awareness_attributes else []
+        layout = ClusterLayout.from_cat(
+            *self.concurrently(
+                lambda: self.es.cat.shards(
+                    format="json",
+                    h="index,shard,prirep,state,node,store,indexing.index_total",
+                    bytes="b",
+                ),
+                lambda: self.es.cat.allocation(format="json", h="node,disk.used,disk.total", bytes="b"),
+                lambda: self.es.cat.nodeattrs(format="json", h="node,attr,value") if awareness_attributes else [],
+            ),
+        )
+        before = {name: node.totals() for name, node in layout.nodes.items()}
+        skew_before = layout.skew()
+
+        excluded_patterns = parsed_args.exclude_nodes.split(",") if parsed_args.exclude_nodes else []
+        moves = BalancePlanner(
+            layout,
+            metric=parsed_args.by,
+            max_moves=parsed_args.max_moves,
+            awareness_attributes=awareness_attributes,
+            max_disk_ratio=parsed_args.max_disk_percent / 100,
+            excluded_nodes=[
+                name for name in layout.nodes if any(fnmatch.fnmatch(name, pattern) for pattern in excluded_patterns)
+            ],
+        ).plan()
+        skew_after = layout.skew()
+
+        for metric in skew_before:
+            self.log.info(f"{metric} skew (max - min) : {skew_before[metric]} -> {skew_after[metric]}")
+
+        if parsed_args.execute and moves:
+            self.execute(moves, parsed_args)
+
+        if parsed_args.view == "nodes":
+            lines = [
+                {
+                    "node": name,
+                    **{f"{metric}_before": value for metric, value in before[name].items()},
+                    **{f"{metric}_after": value for metric, value in node.totals().items()},
+                }
+                for name, node in sorted(layout.nodes.items())
+            ]
+
+            if parsed_args.jmespath is not None:
+                return self.jmespath_output(parsed_args.jmespath, lines)
+
+            return JSONToCliffFormatter(lines).format_for_lister(
+                columns=[
+                    ("node",),
+                    ("shards_before",),
+                    ("shards_after",),
+                    ("disk_before",),
+                    ("disk_after",),
+                    ("write_before",),
+                    ("write_after",),
+                ],
+            )
+
+        lines = [
+            {
+                "index": move.shard.index,
+                "shard": move.shard.number,
+                "prirep": move.shard.prirep,
+                "store": move.shard.store,
+                "from": move.source,
+                "to": move.target,
+            }
+            for move in moves
+        ]
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, lines)
+
+        return JSONToCliffFormatter(lines).format_for_lister(
+            columns=[("index",), ("shard",), ("prirep", "Primary/Replica"), ("store",), ("from",), ("to",)],
+        )
+
+    def execute(self, moves, parsed_args):
+        batches = [moves[i : i + parsed_args.batch_size] for i in range(0, len(moves), parsed_args.batch_size)]
+
+        for number, batch in enumerate(batches, start=1):
+            self.log.info(f"[{number}/{len(batches)}] Moving {len(batch)} shard(s)")
+            self.es.cluster.reroute(commands=[move.as_reroute_command() for move in batch])
+
+            # Throttle : the next batch only starts once these relocations are done
+            health = self.es.cluster.health(
+                wait_for_no_relocating_shards=True,
+                timeout=f"{parsed_args.batch_timeout}s",
+            )
+
+            if health.get("timed_out"):
+                self.log.critical(
+                    f"{health.get('relocating_shards')} shard(s) still relocating after {parsed_args.batch_timeout}s, "
+                    f"stopping after {number} of {len(batches)} batch(es)",
+                )
+                sys.exit(1)
+
+            if number < len(batches):
+                time.sleep(parsed_args.interval)
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--by",
+            choices=["shards", "disk", "write"],
+            default="shards",
+            help="What to even out : number of shards, disk used by shards or indexing operations (default: shards)",
+        )
+        parser.add_argument(
+            "--view",
+            choices=["moves", "nodes"],
+            default="moves",
+            help="Show the planned moves, or every node's load before and after them (default: moves)",
+        )
+        parser.add_argument(
+            "--max-moves",
+            type=int,
+            default=20,
+            help="Maximum number of shard moves (default: 20)",
+        )
+        parser.add_argument(
+            "--awareness-attributes",
+            help="Comma-separated node attributes (like zone) two copies of a shard must not share",
+        )
+        parser.add_argument(
+            "--max-disk-percent",
+            type=float,
+            default=85,
+            help="Don't move a shard to a node whose disk would be used above this percentage (default: 85)",
+        )
+        parser.add_argument(
+            "--exclude-nodes",
+            help="Comma-separated node names (or wildcard expressions) no shard is moved to or from",
+        )
+        parser.add_argument(
+            "--execute",
+            action="store_true",
+            help="Apply the moves (default: only show them)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5,
+            help="Number of shards moved at once with --execute (default: 5)",
+        )
+        parser.add_argument(
+            "--batch-timeout",
+            type=int,
+            default=600,
+            help="Seconds to wait for a batch's relocations to complete (default: 600)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds between two batches (default: 5)",
+        )
+        return parser
+
+
 class ClusterHealth(EsctlShowOne):
     """Show the cluster health."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        health = self._sort_and_order_dict(self.es.cluster.health())
+        health = self.es.cluster.health()
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, health)
+
+        health = self._sort_and_order_dict(health)
 
         if self.uses_table_formatter():
             health["status"] = Color.colorize(
@@ -56,9 +246,14 @@ class ClusterHealth(EsctlShowOne):
 class ClusterInfo(EsctlShowOne):
     """Show basic informations about the cluster."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
         infos = self.es.info()
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, infos)
+
         if self.uses_table_formatter():
             infos = self._delete_and_merge_inner_dict_into_parent(infos, "version")
 
@@ -68,31 +263,18 @@ class ClusterInfo(EsctlShowOne):
 class ClusterStats(EsctlShowOne):
     """Show cluster stats."""
 
-    def take_action(self, parsed_args):
-        cluster_stats = self._sort_and_order_dict(
-            self.transform(flatten_dict(self.es.cluster.stats())),
-        )
+    read_only = True
 
-        return (tuple(cluster_stats.keys()), tuple(cluster_stats.values()))
+    def take_action(self, parsed_args):
+        cluster_stats = self.es.cluster.stats()
 
-    def transform(self, stats):
-        for attribute in [
-            "nodes.jvm.versions",
-            "nodes.os.cpu",
-            "nodes.plugins",
-            "nodes.os.names",
-            "nodes.os.pretty_names",
-            "nodes.packaging_types",
-        ]:
-            if attribute in stats:
-                for key, value in self.objects_list_to_flat_dict(
-                    stats.get(attribute),
-                ).items():
-                    stats.update({f"{attribute}{key}": value})
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, cluster_stats)
 
-                del stats[attribute]
+        # Lists such as `nodes.jvm.versions` or `nodes.plugins` are flattened into `[index]` keys
+        cluster_stats = self._sort_and_order_dict(flatten_dict(cluster_stats, flatten_lists=True))
 
-        return stats
+        return (tuple(cluster_stats.keys()), tuple(cluster_stats.values()))
 
 
 class ClusterRoutingAllocationEnable(AbstractClusterSettings):
@@ -106,7 +288,7 @@ class ClusterRoutingAllocationEnable(AbstractClusterSettings):
                 persistency="persistent" if parsed_args.persistent else "transient",
             )
 
-        return self._settings_get("cluster.routing.allocation.enable")
+        return self._settings_get("cluster.routing.allocation.enable", parsed_args.jmespath)
 
     def get_parser(self, prog_name):
         parser = super(AbstractClusterSettings, self).get_parser(prog_name)
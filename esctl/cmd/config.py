@@ -20,6 +20,9 @@ class ConfigClusterList(EsctlLister):
             ).items()
         ]
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, clusters)
+
         return JSONToCliffFormatter(clusters).format_for_lister(
             columns=[("name"), ("servers")],
         )
@@ -40,6 +43,9 @@ class ConfigContextList(EsctlLister):
             ).items()
         ]
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, contexts)
+
         return JSONToCliffFormatter(self.transform(contexts)).format_for_lister(
             columns=[("name"), ("user"), ("cluster")],
         )
@@ -106,6 +112,9 @@ class ConfigUserList(EsctlLister):
             for user_name, user_definition in Esctl._config.get("users").items()
         ]
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, users)
+
         return JSONToCliffFormatter(users).format_for_lister(
             columns=[("name"), ("username"), ("password")],
         )
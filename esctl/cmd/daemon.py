@@ -0,0 +1,94 @@
+import os
+import subprocess
+import sys
+import time
+
+from esctl import launcher
+from esctl.commands import EsctlCommand, EsctlShowOne
+from esctl.exceptions import DaemonNotRunningError
+from esctl.formatter import JSONToCliffFormatter
+
+
+class DaemonStart(EsctlCommand):
+    """Start a daemon keeping configuration, connections and pre-commands warm for subsequent commands."""
+
+    def take_action(self, parsed_args):
+        path = launcher.socket_path()
+
+        if launcher.request({"action": "status"}, path) is not None:
+            self.print_output(f"A daemon is already listening on {path}")
+            return
+
+        if parsed_args.foreground:
+            from esctl.daemon import Daemon
+
+            Daemon(path).serve_forever()
+            return
+
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        log_file = os.path.join(os.path.dirname(path), "daemon.log")
+
+        with open(log_file, "a") as log:
+            subprocess.Popen(
+                [sys.executable, "-m", "esctl.daemon", path],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                start_new_session=True,
+            )
+
+        deadline = time.monotonic() + parsed_args.wait
+
+        while launcher.request({"action": "status"}, path) is None:
+            if time.monotonic() > deadline:
+                self.log.error(f"The daemon didn't start in {parsed_args.wait}s. See {log_file}")
+                return 1
+
+            time.sleep(0.05)
+
+        self.print_success(f"Daemon listening on {path}")
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--foreground",
+            action="store_true",
+            help="Don't detach the daemon from the terminal",
+        )
+        parser.add_argument(
+            "--wait",
+            type=float,
+            default=5,
+            help="Seconds to wait for the daemon to be ready (default: 5)",
+        )
+        return parser
+
+
+class DaemonStatus(EsctlShowOne):
+    """Show the state of the running daemon."""
+
+    def take_action(self, parsed_args):
+        status = launcher.request({"action": "status"})
+
+        if status is None:
+            raise DaemonNotRunningError("No daemon is running")
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, status)
+
+        status["sessions"] = "\n".join(status.get("sessions"))
+
+        return JSONToCliffFormatter(status).to_show_one(
+            lines=[("pid", "PID"), ("socket",), ("uptime", "Uptime (s)"), ("requests",), ("sessions",)],
+        )
+
+
+class DaemonStop(EsctlCommand):
+    """Stop the running daemon."""
+
+    def take_action(self, parsed_args):
+        if launcher.request({"action": "stop"}) is None:
+            self.log.warning("No daemon is running")
+            return
+
+        self.print_success("Daemon stopped")
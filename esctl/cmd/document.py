@@ -6,10 +6,15 @@ from esctl.utils import flatten_dict
 class DocumentGet(EsctlShowOne):
     """Retrieves the specified JSON document from an index."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        document = flatten_dict(
-            self.es.get(format="json", index=parsed_args.index, id=parsed_args.id),
-        )
+        document = self.es.get(index=parsed_args.index, id=parsed_args.id)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, document)
+
+        document = flatten_dict(document)
 
         return JSONToCliffFormatter(document).to_show_one(lines=list(document.keys()))
 
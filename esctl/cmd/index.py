@@ -1,8 +1,33 @@
+import hashlib
+import os
+import re
+import sys
+import time
+from abc import abstractmethod
 from typing import Any
 
+from esctl.batch import BatchResult, BatchRunner, chunks
+from esctl.cmd.cat import CatThreadpool
+from esctl.cmd.task import AbstractTaskWatch
 from esctl.commands import EsctlCommand, EsctlCommandIndex, EsctlLister
+from esctl.config import ConfigCache
 from esctl.formatter import JSONToCliffFormatter
-from esctl.utils import Color
+from esctl.reindex import (
+    DONE,
+    FAILED,
+    PENDING,
+    RUNNING,
+    PressureGauge,
+    ReindexState,
+    check_destination_template,
+    destination_name,
+    reindex_body,
+)
+from esctl.tasks import format_duration
+from esctl.utils import Color, float_at_least, int_at_least, positive_float
+
+# Number of indices sent in each request, when reading their names from stdin
+DEFAULT_BATCH_SIZE = 100
 
 
 class IndexCreate(EsctlCommand):
@@ -31,10 +56,15 @@ class IndexCreate(EsctlCommand):
 class IndexList(EsctlLister):
     """Returns information about indices: number of primaries and replicas, document counts, disk size, ..."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        indices = self.transform(
-            self.es.cat.indices(format="json", index=parsed_args.index),
-        )
+        indices = self.es.cat.indices(format="json", index=parsed_args.index)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, indices)
+
+        indices = self.transform(indices)
         return JSONToCliffFormatter(indices).format_for_lister(
             columns=[
                 ("index"),
@@ -51,21 +81,23 @@ class IndexList(EsctlLister):
         )
 
     def transform(self, indices):
-        if self.uses_table_formatter():
-            for idx, indice in enumerate(indices):
+        colorize = self.uses_table_formatter()
+
+        for indice in indices:
+            if colorize:
                 if indice.get("health"):
-                    indices[idx]["health"] = Color.colorize(
+                    indice["health"] = Color.colorize(
                         indice.get("health"),
                         getattr(Color, indice.get("health").upper()),
                     )
 
                 if indice.get("status") == "close":
-                    indices[idx]["status"] = Color.colorize(
+                    indice["status"] = Color.colorize(
                         indice.get("status"),
                         Color.ITALIC,
                     )
 
-        return indices
+            yield indice
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -77,48 +109,205 @@ class IndexList(EsctlLister):
         return parser
 
 
-class IndexClose(EsctlCommandIndex):
-    """Close an index."""
+class AbstractIndexOperation(EsctlCommandIndex):
+    """Operation sent in a single request for the whole pattern or, in batch mode, in concurrent batches.
+
+    In batch mode, the pattern is resolved into index names with `_cat/indices`
+    (or names are read from stdin when the pattern is `-`), and only indices
+    which the operation would change are sent.
+    """
+
+    # Progressive and past forms of the operation, for messages
+    VERB: str
+    DONE: str
+    # Status of the indices the operation applies to (None for any)
+    STATUS: str | None = None
+    # Kinds of indices the pattern is resolved into in batch mode (None for Elasticsearch's default)
+    expand_wildcards: str | None = None
+
+    @abstractmethod
+    def operate(self, es, index: str):
+        pass
+
+    def already_done(self, error: Exception) -> bool:
+        """Whether the error of a retried batch means that an earlier attempt, which timed out, went through."""
+        return False
 
     def take_action(self, parsed_args):
-        self.log.info("Closing index " + parsed_args.index)
-        print(self.es.indices.close(index=parsed_args.index))
+        if parsed_args.index != "-" and parsed_args.batch_size is None:
+            self.log.info(f"{self.VERB} index {parsed_args.index}")
+            print(self.operate(self.es, parsed_args.index))
+            return
+
+        self.expand_wildcards = parsed_args.expand_wildcards
+        names = self.resolve(parsed_args.index)
+        batches = chunks(names, parsed_args.batch_size or DEFAULT_BATCH_SIZE)
+        self.log.info(f"{self.VERB} {len(names)} indices in {len(batches)} batches")
+
+        es = self.es.options(request_timeout=parsed_args.batch_timeout, max_retries=0)
+        start = time.monotonic()
+
+        def on_done(result: BatchResult, done: int):
+            if result.succeeded:
+                self.log.info(f"[{done}/{len(batches)}] {len(result.names)} indices {self.DONE}")
+            else:
+                self.log.error(f"[{done}/{len(batches)}] {len(result.names)} indices failed : {result.error}")
 
+        results = BatchRunner(
+            lambda index: self.operate(es, index),
+            workers=parsed_args.workers,
+            retries=parsed_args.retries,
+            rate=parsed_args.rate,
+            on_done=on_done,
+            already_done=self.already_done,
+        ).run(batches)
 
-class IndexDelete(EsctlCommandIndex):
+        failed = [result for result in results if not result.succeeded]
+        succeeded = sum(len(result.names) for result in results if result.succeeded)
+
+        self.print_success(f"{succeeded} indices {self.DONE} in {time.monotonic() - start:.1f}s")
+
+        if failed:
+            self.print_output(
+                Color.colorize(
+                    f"{sum(len(result.names) for result in failed)} indices in {len(failed)} batches failed : "
+                    + ",".join(name for result in failed for name in result.names),
+                    Color.RED,
+                ),
+            )
+            return 1
+
+    def resolve(self, index: str) -> list[str]:
+        """Return the names of the indices to operate on, read from stdin if `index` is `-`."""
+        if index == "-":
+            return [name for name in re.split(r"[\s,]+", self.read_from_file_or_stdin(None)) if name]
+
+        indices = self.es.cat.indices(
+            format="json",
+            index=index,
+            h="index,status",
+            expand_wildcards=self.expand_wildcards,
+        )
+
+        return sorted(
+            indice.get("index") for indice in indices if self.STATUS is None or indice.get("status") == self.STATUS
+        )
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.description = f"{parser.description}\n\nUse - as the index to read index names from stdin."
+
+        batch_group = parser.add_argument_group("batch mode")
+        batch_group.add_argument(
+            "--batch-size",
+            type=int_at_least(1),
+            help=(
+                "Resolve the pattern into index names and send them in batches of this size "
+                f"(default: {DEFAULT_BATCH_SIZE} when reading from stdin)"
+            ),
+        )
+        batch_group.add_argument(
+            "--workers",
+            type=int_at_least(1),
+            default=4,
+            help="Maximum number of batches sent at the same time (default: 4)",
+        )
+        batch_group.add_argument(
+            "--batch-timeout",
+            type=positive_float,
+            default=60,
+            help="Seconds to wait for each batch (default: 60)",
+        )
+        batch_group.add_argument(
+            "--retries",
+            type=int_at_least(0),
+            default=2,
+            help="Number of retries of a batch which timed out or hit an overloaded cluster (default: 2)",
+        )
+        batch_group.add_argument(
+            "--rate",
+            type=float_at_least(0),
+            default=2,
+            help="Maximum number of batches started per second, to spare the master node (default: 2, 0 for no limit)",
+        )
+        batch_group.add_argument(
+            "--expand-wildcards",
+            metavar="KINDS",
+            help=(
+                "Kinds of indices the pattern is resolved into, as a comma-separated list of "
+                "all, open, closed, hidden or none (default: Elasticsearch's default)"
+            ),
+        )
+
+        return parser
+
+
+class IndexClose(AbstractIndexOperation):
+    """Close an index."""
+
+    VERB = "Closing"
+    DONE = "closed"
+    STATUS = "open"
+
+    def operate(self, es, index: str):
+        return es.indices.close(index=index)
+
+
+class IndexDelete(AbstractIndexOperation):
     """Delete an index."""
 
-    def take_action(self, parsed_args):
-        self.log.info("Deleting index " + parsed_args.index)
-        print(self.es.indices.delete(index=parsed_args.index))
+    VERB = "Deleting"
+    DONE = "deleted"
+
+    def operate(self, es, index: str):
+        return es.indices.delete(index=index)
 
+    def already_done(self, error: Exception) -> bool:
+        # The indices of a batch are deleted at once : they are all gone if one is
+        return getattr(error, "status_code", None) == 404
 
-class IndexOpen(EsctlCommandIndex):
+
+class IndexOpen(AbstractIndexOperation):
     """Open an index."""
 
-    def take_action(self, parsed_args):
-        self.log.info("Opening index " + parsed_args.index)
-        print(self.es.indices.open(index=parsed_args.index))
+    VERB = "Opening"
+    DONE = "opened"
+    STATUS = "close"
 
+    def operate(self, es, index: str):
+        return es.indices.open(index=index)
 
-class IndexReindex(EsctlCommand):
-    """Reindex a given index into another one."""
+
+class IndexReindex(AbstractTaskWatch):
+    """Reindex a given index into another one.
+
+    The reindex runs as a task, whose progress is shown until it completes.
+    """
 
     def _build_request_body(self, args: dict[str, Any]) -> dict[str, Any]:
-        return {
-            "source": {
-                "index": args.get("source_index"),
-            },
-            "dest": {
-                "index": args.get("destination_index"),
-                "version_type": args.get("version_type"),
-                "op_type": args.get("op_type"),
-            },
-            "conflicts": args.get("conflicts"),
-        }
+        return reindex_body(
+            args.get("source_index"),
+            args.get("destination_index"),
+            version_type=args.get("version_type"),
+            op_type=args.get("op_type"),
+            conflicts=args.get("conflicts"),
+        )
 
     def take_action(self, parsed_args):
-        print(self.es.reindex(body=self._build_request_body(vars(parsed_args))))
+        task_id = self.es.reindex(
+            body=self._build_request_body(vars(parsed_args)),
+            wait_for_completion=False,
+            slices=parsed_args.slices,
+            requests_per_second=parsed_args.requests_per_second,
+        ).get("task")
+
+        if parsed_args.run_async:
+            print(task_id)
+            return
+
+        self.log.info(f"Reindexing {parsed_args.source_index} into {parsed_args.destination_index} (task {task_id})")
+
+        return self.follow_task(task_id, parsed_args.interval)
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -130,29 +319,260 @@ class IndexReindex(EsctlCommand):
             "destination_index",
             help="Name of the index to index document to",
         )
+        _add_reindex_arguments(parser)
         parser.add_argument(
-            "--conflicts",
-            help="Set to `proceed` to continue reindexing even if there are conflicts (default: abort)",
-            choices=["abort", "proceed"],
-            default="abort",
+            "--async",
+            dest="run_async",
+            action="store_true",
+            help="Only start the reindex and print its task ID, to follow with `esctl task watch`",
         )
-        parser.add_argument(
-            "--version-type",
-            help=(
-                "The versioning to use for the indexing operation (default: internal), "
-                "valid choices are: `internal`, `external`, `external_gt`, `external_gte`"
+
+        return parser
+
+
+class IndexReindexMany(EsctlCommand):
+    """Reindex every index matching a pattern, each into an index named after a template.
+
+    Reindexes run as tasks, at most `--concurrency` at a time, and no new one starts
+    while the cluster is under pressure. Progress is saved to a state file : running
+    the same command again resumes an interrupted run, retrying failed indices only.
+    """
+
+    def take_action(self, parsed_args):
+        try:
+            check_destination_template(parsed_args.source_pattern, parsed_args.destination_template)
+            destinations = {
+                source: destination_name(parsed_args.source_pattern, parsed_args.destination_template, source)
+                for source in self.resolve(parsed_args.source_pattern)
+            }
+        except ValueError as err:
+            self.log.critical(f"Cannot name the destination indices : {err}")
+            sys.exit(1)
+
+        state = ReindexState.load(parsed_args.state_file or self._default_state_file(parsed_args))
+        state.resume()
+
+        for source, destination in destinations.items():
+            state.add(source, destination)
+
+        if parsed_args.dry_run:
+            for source, index in state.indices.items():
+                self.print_output(f"{source} -> {index.get('destination')} ({index.get('state')})")
+            return
+
+        state.save()
+        self.log.info(
+            f"{len(state.with_state(PENDING))} indices to reindex, {len(state.with_state(DONE))} already done"
+            f" (state saved to {state.path})",
+        )
+
+        try:
+            self._orchestrate(state, parsed_args)
+        except KeyboardInterrupt:
+            self.log.warning(
+                f"Stopped, running reindexes go on. Run the same command again to resume (state saved to {state.path})",
+            )
+            return 130
+
+        failed = state.with_state(FAILED)
+        self.print_success(f"{len(state.with_state(DONE))} indices reindexed")
+
+        if failed:
+            self.print_output(Color.colorize(f"{len(failed)} indices failed : {','.join(failed)}", Color.RED))
+            return 1
+
+    def _orchestrate(self, state: ReindexState, parsed_args):
+        """Start and follow the reindexes until none is pending or running anymore."""
+        gauge = PressureGauge(parsed_args.max_queue, parsed_args.max_pending_tasks)
+        backoff = parsed_args.interval
+
+        while state.with_state(PENDING) or state.with_state(RUNNING):
+            for source in state.with_state(RUNNING):
+                self._check_task(state, source)
+
+            pending = state.with_state(PENDING)
+            running = state.with_state(RUNNING)
+
+            if pending and len(running) < parsed_args.concurrency:
+                thread_pools, pending_tasks = self.concurrently(
+                    lambda: self.es.cat.thread_pool(
+                        format="json",
+                        h=CatThreadpool._default_headers,
+                        thread_pool_patterns=parsed_args.thread_pools,
+                    ),
+                    lambda: self.es.cluster.pending_tasks(),
+                )
+                pressure = gauge.check(thread_pools, len(pending_tasks.get("tasks", [])))
+
+                if pressure is None:
+                    backoff = parsed_args.interval
+                    for source in pending[: parsed_args.concurrency - len(running)]:
+                        self._start(state, source, parsed_args)
+                else:
+                    backoff = min(backoff * 2, parsed_args.max_backoff)
+                    self.log.warning(f"Cluster under pressure ({pressure}), waiting {backoff:g}s")
+
+            self.log.info(
+                f"{len(state.with_state(DONE))} done, {len(state.with_state(RUNNING))} running,"
+                f" {len(state.with_state(PENDING))} pending, {len(state.with_state(FAILED))} failed",
+            )
+
+            if state.with_state(PENDING) or state.with_state(RUNNING):
+                time.sleep(backoff)
+
+    def _start(self, state: ReindexState, source: str, parsed_args):
+        destination = state.indices[source].get("destination")
+        task_id = self.es.reindex(
+            body=reindex_body(
+                source,
+                destination,
+                version_type=parsed_args.version_type,
+                op_type=parsed_args.op_type,
+                conflicts=parsed_args.conflicts,
             ),
-            choices=["internal", "external", "external_gt", "external_gte"],
-            default="internal",
+            wait_for_completion=False,
+            slices=parsed_args.slices,
+            requests_per_second=parsed_args.requests_per_second,
+        ).get("task")
+
+        self.log.info(f"Reindexing {source} into {destination} (task {task_id})")
+        state.update(source, state=RUNNING, task=task_id)
+
+    def _check_task(self, state: ReindexState, source: str):
+        from elasticsearch import NotFoundError
+
+        task_id = state.indices[source].get("task")
+
+        try:
+            response = self.es.tasks.get(task_id=task_id)
+        except NotFoundError:
+            # The task ran on a node which restarted, or its result was deleted
+            self.log.warning(f"Task {task_id} of {source} is gone, reindexing it again")
+            state.update(source, state=PENDING, task=None)
+            return
+
+        if not response.get("completed"):
+            return
+
+        result = response.get("response", {})
+        error = response.get("error") or (result.get("failures") or None)
+
+        if error is not None:
+            self.log.error(f"Reindexing {source} failed : {error}")
+            state.update(source, state=FAILED, error=str(error))
+        else:
+            self.log.info(
+                f"Reindexed {source} ({result.get('total')} docs in {format_duration(result.get('took', 0) / 1000)})"
+            )
+            state.update(source, state=DONE)
+
+    def resolve(self, pattern: str) -> list[str]:
+        return sorted(indice.get("index") for indice in self.es.cat.indices(format="json", index=pattern, h="index"))
+
+    def _default_state_file(self, parsed_args) -> str:
+        run = f"{self.client.context.name}:{parsed_args.source_pattern}:{parsed_args.destination_template}"
+
+        return os.path.join(ConfigCache().directory, f"reindex-{hashlib.sha1(run.encode()).hexdigest()[:12]}.json")
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "source_pattern",
+            help="Wildcard expression of the indices to reindex, like `logs-2024.*`",
         )
         parser.add_argument(
-            "--op-type",
+            "destination_template",
             help=(
-                "Set to `create` to only index documents that do not already exist (default: index), "
-                "valid choices are: `index`, `create`"
+                "Name of the destination indices, where each `*` is replaced by what the same `*` matched in the "
+                "source pattern, and `{index}` by the source index, like `logs-v2-2024.*`"
             ),
-            choices=["index", "create"],
-            default="index",
+        )
+        _add_reindex_arguments(parser)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=2,
+            help="Maximum number of reindexes running at the same time (default: 2)",
+        )
+        parser.add_argument(
+            "--state-file",
+            metavar="PATH",
+            help="File where progress is saved (default: derived from the context, pattern and template)",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help="Seconds between two checks of the running reindexes (default: 10)",
+        )
+        parser.add_argument(
+            "--max-backoff",
+            type=float,
+            default=300,
+            help="Maximum seconds to wait while the cluster is under pressure (default: 300)",
+        )
+        parser.add_argument(
+            "--thread-pools",
+            default="write,search",
+            help="Comma-separated thread pools to watch for pressure (default: write,search)",
+        )
+        parser.add_argument(
+            "--max-queue",
+            type=int,
+            default=100,
+            help="Thread pool queue size above which no reindex starts (default: 100)",
+        )
+        parser.add_argument(
+            "--max-pending-tasks",
+            type=int,
+            default=20,
+            help="Number of pending cluster tasks above which no reindex starts (default: 20)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only show each source index, its destination and its state",
         )
 
         return parser
+
+
+def _add_reindex_arguments(parser):
+    parser.add_argument(
+        "--conflicts",
+        help="Set to `proceed` to continue reindexing even if there are conflicts (default: abort)",
+        choices=["abort", "proceed"],
+        default="abort",
+    )
+    parser.add_argument(
+        "--version-type",
+        help=(
+            "The versioning to use for the indexing operation (default: internal), "
+            "valid choices are: `internal`, `external`, `external_gt`, `external_gte`"
+        ),
+        choices=["internal", "external", "external_gt", "external_gte"],
+        default="internal",
+    )
+    parser.add_argument(
+        "--op-type",
+        help=(
+            "Set to `create` to only index documents that do not already exist (default: index), "
+            "valid choices are: `index`, `create`"
+        ),
+        choices=["index", "create"],
+        default="index",
+    )
+    parser.add_argument(
+        "--slices",
+        type=_slices,
+        help="Number of slices to split each reindex into, or `auto` to let Elasticsearch choose (default: 1)",
+    )
+    parser.add_argument(
+        "--requests-per-second",
+        type=float,
+        help="Maximum number of documents per second (default: unlimited). See `esctl task rethrottle`",
+    )
+
+
+def _slices(value: str) -> int | str:
+    return value if value == "auto" else int(value)
@@ -7,10 +7,15 @@ class MigrationDeprecations(EsctlLister):
     deprecated features that will be removed or changed in a future version.
     """
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        deprecations = self.transform(
-            self.request("GET", "/_migration/deprecations", None),
-        )
+        deprecations = self.request("GET", "/_migration/deprecations", None)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, deprecations)
+
+        deprecations = self.transform(deprecations)
 
         return JSONToCliffFormatter(deprecations).format_for_lister(
             columns=[
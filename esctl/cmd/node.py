@@ -1,6 +1,9 @@
 from esctl.commands import EsctlCommand, EsctlLister, EsctlShowOne
 from esctl.formatter import JSONToCliffFormatter
-from esctl.utils import Color, flatten_dict
+from esctl.query import NodeStatsPlan, fields_to_paths, read_paths
+from esctl.rates import CounterRates
+from esctl.utils import Color, flatten_dict, int_at_least, positive_float
+from esctl.watch import Schedule
 
 
 class NodeExclude(EsctlCommand):
@@ -72,8 +75,15 @@ class NodeHotThreads(EsctlCommand):
 class NodeList(EsctlLister):
     """List nodes."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        return JSONToCliffFormatter(self.es.cat.nodes(format="json")).format_for_lister(
+        nodes = self.es.cat.nodes(format="json")
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, nodes)
+
+        return JSONToCliffFormatter(nodes).format_for_lister(
             columns=[
                 ("ip", "IP"),
                 ("heap.percent",),
@@ -92,19 +102,19 @@ class NodeList(EsctlLister):
 class NodeStats(EsctlShowOne):
     """Returns statistical information about nodes in the cluster."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        stats = self.es.nodes.stats(
-            format="json",
-            node_id=parsed_args.node,
-            metric=parsed_args.metric,
-            index_metric=parsed_args.index_metric,
-            level=parsed_args.level,
-        ).get("nodes")
+        if parsed_args.rate is not None:
+            return self.take_rates(parsed_args)
 
-        if parsed_args.jmespath is not None:
-            path = self.jmespath_search(parsed_args.jmespath, stats)
+        plan = self.plan(parsed_args)
+        self.log.debug(plan)
 
-            return (tuple(["Result"]), tuple([path]))
+        stats = self.fetch(parsed_args, plan)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, stats)
 
         stats = self.transform(stats)
 
@@ -113,12 +123,63 @@ class NodeStats(EsctlShowOne):
             pretty_key=not parsed_args.no_pretty,
         ).to_show_one(lines=list(stats.keys()))
 
+    def take_rates(self, parsed_args):
+        """Sample the stats `--samples` times, `--rate` seconds apart, and show the rates of their counters."""
+        plan = self.plan(parsed_args)
+
+        # Nodes are told apart by their name, and their samples by the time each node collected them
+        if plan.filter_path is not None:
+            plan = NodeStatsPlan(plan.paths | {("*", "name"), ("*", "timestamp")})
+
+        self.log.debug(plan)
+
+        counter_rates = CounterRates()
+        schedule = Schedule(parsed_args.rate)
+
+        for sample in range(parsed_args.samples):
+            if sample:
+                schedule.wait()
+
+            counter_rates.add(self.fetch(parsed_args, plan))
+
+        rates = counter_rates.rates(with_peaks=parsed_args.samples > 2)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, rates)
+
+        rates = {f"{node}.{key}": value for node, node_rates in rates.items() for key, value in node_rates.items()}
+
+        return JSONToCliffFormatter(
+            rates,
+            pretty_key=not parsed_args.no_pretty,
+        ).to_show_one(lines=list(rates.keys()))
+
+    def fetch(self, parsed_args, plan: NodeStatsPlan):
+        return self.es.nodes.stats(
+            node_id=parsed_args.node,
+            metric=parsed_args.metric or plan.metric,
+            index_metric=parsed_args.index_metric or (None if parsed_args.metric else plan.index_metric),
+            level=parsed_args.level,
+            filter_path=plan.filter_path,
+        ).get("nodes", {})
+
     def transform(self, raw_stats):
         if self.uses_table_formatter():
             return flatten_dict(raw_stats)
 
         return raw_stats
 
+    def plan(self, parsed_args) -> NodeStatsPlan:
+        """Only request the parts of the stats needed by `--fields` or `--jmespath`."""
+        if parsed_args.fields is not None:
+            return NodeStatsPlan(fields_to_paths(parsed_args.fields.split(",")))
+
+        # With --rate, the query reads the rates, not the stats
+        if parsed_args.jmespath is not None and parsed_args.rate is None:
+            return NodeStatsPlan(read_paths(parsed_args.jmespath))
+
+        return NodeStatsPlan({()})
+
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
         parser.add_argument(
@@ -154,5 +215,31 @@ class NodeStats(EsctlShowOne):
             ),
             default="node",
         )
+        parser.add_argument(
+            "--fields",
+            help=(
+                "A comma-separated list of fields to return for every node, like `jvm.mem.heap_used_percent,fs.total`. "
+                "Only these fields are requested to Elasticsearch."
+            ),
+            default=None,
+        )
+        parser.add_argument(
+            "--rate",
+            metavar="INTERVAL",
+            type=positive_float,
+            help=(
+                "Sample the stats INTERVAL seconds apart, and show the per-second rate of every counter, "
+                "the latency per operation and the share of time spent in GC pauses, by node name"
+            ),
+        )
+        parser.add_argument(
+            "--samples",
+            type=int_at_least(2),
+            default=2,
+            help=(
+                "Number of samples taken with --rate (default: 2). "
+                "With more than 2, the highest rate between two successive samples is shown too"
+            ),
+        )
 
         return parser
@@ -0,0 +1,218 @@
+import argparse
+import datetime
+import os
+import re
+import time
+
+from esctl.commands import EsctlCommand, EsctlLister
+from esctl.config import ConfigCache
+from esctl.formatter import JSONToCliffFormatter
+from esctl.record import SOURCES, MetricsStore, RecordedClient, RecordedElasticsearch
+from esctl.watch import Schedule
+
+# A time relative to now, like `10m` (or `-10m`) for 10 minutes ago
+RELATIVE_TIME = re.compile(r"^-?(\d+(?:\.\d+)?)([smhd])$")
+TIME_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_time(value: str) -> float:
+    """Convert a time given as `2024-01-31T12:00:00`, a Unix timestamp or relatively to now (`10m`) to a timestamp."""
+    relative = RELATIVE_TIME.match(value)
+
+    if relative is not None:
+        return time.time() - float(relative.group(1)) * TIME_UNITS[relative.group(2)]
+
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value} isn't a date, a timestamp or a relative time like 10m")
+
+
+def format_time(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+
+
+class AbstractRecordCommand:
+    def store_path(self, parsed_args) -> str:
+        return parsed_args.file or os.path.join(
+            ConfigCache().directory,
+            "records",
+            f"{self.client.context.name}.sqlite",
+        )
+
+    def add_file_argument(self, parser):
+        parser.add_argument(
+            "--file",
+            help="SQLite file holding the samples (default: one per context, in esctl's cache directory)",
+        )
+
+
+class Record(AbstractRecordCommand, EsctlCommand):
+    """Poll the cluster health, nodes stats, thread pools and allocation, and save every sample to a local file.
+
+    Samples can then be shown as they were at any time with `esctl replay`.
+    """
+
+    def take_action(self, parsed_args):
+        sources = parsed_args.sources.split(",")
+        unknown = [source for source in sources if source not in SOURCES]
+
+        if unknown:
+            self.log.critical(f"Unknown sources : {', '.join(unknown)}. Valid choices are : {', '.join(SOURCES)}")
+            return 1
+
+        store = MetricsStore(self.store_path(parsed_args))
+        schedule = Schedule(parsed_args.interval)
+        started = last_flush = time.monotonic()
+        recorded = skipped = 0
+
+        self.log.info(f"Recording {', '.join(sources)} every {parsed_args.interval:g}s to {store.path}")
+
+        try:
+            while parsed_args.duration is None or time.monotonic() - started < parsed_args.duration:
+                for source in sources:
+                    self._poll(store, source, parsed_args)
+
+                if time.monotonic() - last_flush >= parsed_args.flush_interval:
+                    recorded += store.flush()
+                    last_flush = time.monotonic()
+
+                # Polls slower than the interval make the next ones skipped, rather than pile up
+                skipped += schedule.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            recorded += len(store.pending)
+            store.close()
+
+        if skipped:
+            self.log.warning(f"{skipped} poll(s) skipped because the previous ones took longer than the interval")
+
+        self.print_success(f"{recorded} samples recorded to {store.path}")
+
+    def _poll(self, store: MetricsStore, source: str, parsed_args):
+        from elasticsearch import ApiError, TransportError
+
+        try:
+            document = SOURCES[source](self.es, parsed_args.metric)
+        except (ApiError, TransportError) as error:
+            # The cluster being unreachable for a while is exactly what should be looked at later
+            self.log.warning(f"Unable to get {source} : {error}")
+            return
+
+        store.append(source, time.time(), document)
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        self.add_file_argument(parser)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10,
+            help="Seconds between two polls (default: 10)",
+        )
+        parser.add_argument(
+            "--sources",
+            default=",".join(SOURCES),
+            help=f"Comma-separated list of what to record (default: {','.join(SOURCES)})",
+        )
+        parser.add_argument(
+            "--metric",
+            help="Comma-separated list of nodes stats metrics to record, like `jvm,thread_pool` (default: all)",
+        )
+        parser.add_argument(
+            "--flush-interval",
+            type=float,
+            default=10,
+            help="Seconds between two writes of the samples to the file (default: 10)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            help="Stop recording after this many seconds (default: until interrupted)",
+        )
+        return parser
+
+
+class RecordList(AbstractRecordCommand, EsctlLister):
+    """List what was recorded : number of samples of each source, when they were taken and their size."""
+
+    read_only = True
+
+    def take_action(self, parsed_args):
+        store = MetricsStore(self.store_path(parsed_args))
+
+        try:
+            summary = store.summary()
+        finally:
+            store.close()
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, summary)
+
+        for source in summary:
+            source["first"], source["last"] = format_time(source["first"]), format_time(source["last"])
+
+        return JSONToCliffFormatter(summary).format_for_lister(
+            columns=[("source",), ("samples",), ("first",), ("last",), ("size", "Size (bytes)")],
+        )
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        self.add_file_argument(parser)
+        return parser
+
+
+class Replay(AbstractRecordCommand, EsctlCommand):
+    """Run a command on what was recorded at a given time, instead of the cluster.
+
+    Only commands reading the recorded sources can be replayed : `cluster health`,
+    `node stats`, `cat thread-pool` and `cat allocation`.
+
+    :Example:
+        esctl replay --at "2024-01-31 12:00" cat thread-pool --thread-pool-patterns write
+    """
+
+    def take_action(self, parsed_args):
+        if not parsed_args.command:
+            self.log.critical("A command to replay is expected, like `esctl replay --at 10m cluster health`")
+            return 1
+
+        cmd_factory, cmd_name, sub_argv = self.app.command_manager.find_command(parsed_args.command)
+        cmd = cmd_factory(self.app, self.app_args, cmd_name=cmd_name)
+        cmd_parsed_args = cmd.get_parser(f"esctl {cmd_name}").parse_args(sub_argv)
+
+        store = MetricsStore(self.store_path(parsed_args))
+        recorded = RecordedElasticsearch(store, parsed_args.at)
+        client, self.app.client = self.app.client, RecordedClient(self.app.client.context, recorded)
+
+        try:
+            return cmd.run(cmd_parsed_args)
+        finally:
+            self.app.client = client
+            store.close()
+
+            for source, sample_time in recorded.sample_times.items():
+                self.log.info(f"{source} as recorded at {format_time(sample_time)}")
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        self.add_file_argument(parser)
+        parser.add_argument(
+            "--at",
+            type=parse_time,
+            default=time.time(),
+            help="When to replay the command at : a date like `2024-01-31T12:00:00`, a Unix timestamp "
+            "or how long ago, like 10m (default: the last samples)",
+        )
+        parser.add_argument(
+            "command",
+            nargs=argparse.REMAINDER,
+            help="The command to replay, with its arguments",
+        )
+        return parser
@@ -5,9 +5,14 @@ from esctl.formatter import JSONToCliffFormatter
 class RepositoryList(EsctlLister):
     """Returns information about snapshot repositories registered in the cluster."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
         repositories = self.es.cat.repositories(format="json")
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, repositories)
+
         return JSONToCliffFormatter(repositories).format_for_lister(
             columns=[("id"), ("type")],
         )
@@ -16,11 +21,13 @@ class RepositoryList(EsctlLister):
 class RepositoryShow(EsctlShowOne):
     """Returns information about a repository."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        repository = self.es.snapshot.get_repository(
-            repository=parsed_args.repository,
-            format="json",
-        ).get(parsed_args.repository)
+        repository = self.es.snapshot.get_repository(repository=parsed_args.repository).get(parsed_args.repository)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, repository)
 
         return JSONToCliffFormatter(repository).to_show_one(
             lines=list(repository.keys()),
@@ -5,12 +5,15 @@ from esctl.formatter import JSONToCliffFormatter
 class SecurityRolesGet(EsctlLister):
     """Retrieves roles in the native realm."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        roles = self.transform(
-            self._sort_and_order_dict(
-                self.es.security.get_role(format="json", name=parsed_args.roles),
-            ),
-        )
+        roles = self.es.security.get_role(name=parsed_args.roles)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, roles)
+
+        roles = self.transform(self._sort_and_order_dict(roles))
 
         return JSONToCliffFormatter(roles).format_for_lister(
             columns=[
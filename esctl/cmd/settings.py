@@ -1,9 +1,20 @@
 import collections
+import fnmatch
+import sys
+from typing import Any
 
-from esctl.commands import EsctlCommandIndex, EsctlListerIndexSetting, EsctlShowOne
+from esctl.commands import EsctlCommandIndex, EsctlLister, EsctlListerIndexSetting, EsctlShowOne
 from esctl.formatter import JSONToCliffFormatter
-from esctl.settings import ClusterSettings, IndexSettings
-from esctl.utils import Color
+from esctl.settings import (
+    ClusterSettings,
+    ClusterSettingsSnapshot,
+    IndexSettings,
+    IndexTemplate,
+    as_setting_value,
+    is_glob,
+    matching_template,
+)
+from esctl.utils import Color, flatten_dict
 
 
 class AbstractClusterSettings(EsctlShowOne):
@@ -16,16 +27,18 @@ class AbstractClusterSettings(EsctlShowOne):
             self.cluster_settings.set(setting, value, persistency=persistency),
         )
 
-    def _settings_get(self, setting: str):
+    def _settings_get(self, setting: str, expression: str | None = None):
         s = self.cluster_settings.mget(setting)
+        values = {
+            "transient": s.get("transient").value,
+            "persistent": s.get("persistent").value,
+            "defaults": s.get("defaults").value,
+        }
 
-        return JSONToCliffFormatter(
-            {
-                "transient": s.get("transient").value,
-                "persistent": s.get("persistent").value,
-                "defaults": s.get("defaults").value,
-            },
-        ).to_show_one(
+        if expression is not None:
+            return self.jmespath_output(expression, values)
+
+        return JSONToCliffFormatter(values).to_show_one(
             lines=[("transient"), ("persistent"), ("defaults")],
             none_as="" if self.uses_table_formatter() else None,
         )
@@ -41,18 +54,147 @@ class AbstractClusterSettings(EsctlShowOne):
 class ClusterSettingsGet(AbstractClusterSettings):
     """Get a setting value."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        return self._settings_get(parsed_args.setting)
+        if is_glob(parsed_args.setting):
+            return self._settings_match(parsed_args.setting, parsed_args.jmespath)
+
+        return self._settings_get(parsed_args.setting, parsed_args.jmespath)
+
+    def _settings_match(self, pattern: str, expression: str | None = None):
+        """Show the effective value of every setting matching a glob pattern."""
+        snapshot = self.cluster_settings.snapshot([pattern])
+        values = {key: snapshot.effective(key).value for key in snapshot.match(pattern)}
+
+        if expression is not None:
+            return self.jmespath_output(expression, values)
+
+        return JSONToCliffFormatter(values).to_show_one(
+            lines=[(key, key) for key in values],
+            none_as="" if self.uses_table_formatter() else None,
+        )
+
+
+class ClusterSettingsApply(EsctlLister):
+    """Apply many transient and persistent settings at once.
+
+    Read a YAML or JSON document, from either stdin or a path, mapping `transient`
+    and `persistent` to the settings to change (`null` resets a setting). Only
+    settings whose value differs from the current one are sent.
+    """
+
+    cluster_settings: ClusterSettings
+
+    PERSISTENCIES = ("transient", "persistent")
+
+    def is_read_only(self, parsed_args) -> bool:
+        return parsed_args.dry_run
+
+    def take_action(self, parsed_args):
+        wanted = self._read_settings(self.read_from_file_or_stdin(parsed_args.file))
+        keys = list(dict.fromkeys(key for settings in wanted.values() for key in settings))
+
+        changes = self._diff(wanted, self.cluster_settings.snapshot(keys) if keys else None)
+        lines = [
+            {"setting": key, "persistency": persistency, "before": before, "after": after}
+            for persistency, settings in changes.items()
+            for key, (before, after) in settings.items()
+        ]
+
+        if not lines:
+            self.log.info("Every setting already has the requested value")
+        elif parsed_args.dry_run:
+            self.log.info(f"Dry run : {len(lines)} setting(s) would be changed")
+        else:
+            self.log.info(f"Changing {len(lines)} setting(s)")
+            response = self.cluster_settings.set_many(
+                {
+                    persistency: {key: after for key, (_, after) in settings.items()}
+                    for persistency, settings in changes.items()
+                    if settings
+                },
+            )
+            self.log.debug(response)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, lines)
+
+        return JSONToCliffFormatter(lines).format_for_lister(
+            columns=[("setting",), ("persistency",), ("before",), ("after",)],
+            none_as="" if self.uses_table_formatter() else None,
+        )
+
+    def _read_settings(self, document: str) -> dict[str, dict[str, Any]]:
+        """Parse the document into flat settings for each persistency."""
+        import yaml
+
+        try:
+            content = yaml.safe_load(document) or {}
+        except yaml.YAMLError as err:
+            self.log.critical(f"Cannot read settings : {err}")
+            sys.exit(1)
+
+        if not isinstance(content, dict) or not set(content).issubset(self.PERSISTENCIES):
+            self.log.critical(f"Settings must be grouped under {' and/or '.join(self.PERSISTENCIES)}")
+            sys.exit(1)
+
+        for persistency, settings in content.items():
+            if settings is not None and not isinstance(settings, dict):
+                self.log.critical(f"{persistency} settings must be a map of settings to values")
+                sys.exit(1)
+
+        return {persistency: flatten_dict(content.get(persistency) or {}) for persistency in self.PERSISTENCIES}
+
+    def _diff(
+        self,
+        wanted: dict[str, dict[str, Any]],
+        snapshot: ClusterSettingsSnapshot | None,
+    ) -> dict[str, dict[str, tuple[Any, Any]]]:
+        """Return the (current, wanted) values of the settings which would change."""
+        changes = {}
+
+        for persistency, settings in wanted.items():
+            changes[persistency] = {}
+
+            for key, value in settings.items():
+                before = snapshot.settings.get(persistency).get(key)
+                after = as_setting_value(value)
+
+                if before != after:
+                    changes[persistency][key] = (before, after)
+
+        return changes
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--file",
+            metavar="PATH",
+            help="Path to the YAML or JSON document containing the settings (default: stdin)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only show the settings which would be changed",
+        )
+        return parser
 
 
 class ClusterSettingsList(EsctlShowOne):
     """[Experimental] List available settings."""
 
+    read_only = True
     cluster_settings: ClusterSettings
 
     def take_action(self, parsed_args):
         default_settings = {}
-        settings_list = self.cluster_settings.list_().get("defaults")
+        settings = self.cluster_settings.list_()
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, settings)
+
+        settings_list = settings.get("defaults")
 
         for setting_name, setting_value in settings_list.items():
             if type(setting_value).__name__ == "list":
@@ -75,7 +217,7 @@ class ClusterSettingsReset(AbstractClusterSettings):
             None,
             persistency="persistent" if parsed_args.persistent else "transient",
         )
-        return self._settings_get(parsed_args.setting)
+        return self._settings_get(parsed_args.setting, parsed_args.jmespath)
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -104,7 +246,7 @@ class ClusterSettingsSet(AbstractClusterSettings):
             parsed_args.value,
             persistency="persistent" if parsed_args.persistent else "transient",
         )
-        return self._settings_get(parsed_args.setting)
+        return self._settings_get(parsed_args.setting, parsed_args.jmespath)
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -129,7 +271,9 @@ class ClusterSettingsSet(AbstractClusterSettings):
 class IndexSettingsGet(EsctlListerIndexSetting):
     """Get an index-level setting value."""
 
-    def retrieve_setting(self, setting_name, index):
+    read_only = True
+
+    def retrieve_setting(self, setting_name, index, raw=False):
         if not setting_name.startswith("index."):
             setting_name = f"index.{setting_name}"
 
@@ -139,26 +283,175 @@ class IndexSettingsGet(EsctlListerIndexSetting):
         for index_name, settings_list in raw_settings.items():
             for setting in settings_list:
                 if setting.value is not None:
-                    if setting.persistency == "defaults":
+                    if raw:
+                        value = setting.value
+                    elif setting.persistency == "defaults":
                         value = f"{setting.value} ({Color.colorize('default', Color.ITALIC)})"
                     else:
                         value = setting.value
 
-                    settings.append(
-                        {"index": index_name, "setting": setting.name, "value": value},
-                    )
+                    line = {"index": index_name, "setting": setting.name, "value": value}
+
+                    if raw:
+                        line["persistency"] = setting.persistency
+
+                    settings.append(line)
 
         return settings
 
     def take_action(self, parsed_args):
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(
+                parsed_args.jmespath,
+                self.retrieve_setting(parsed_args.setting, parsed_args.index, raw=True),
+            )
+
         return JSONToCliffFormatter(
             self.retrieve_setting(parsed_args.setting, parsed_args.index),
         ).format_for_lister(columns=[("index",), ("setting",), ("value",)])
 
 
+class IndexSettingsDiff(EsctlListerIndexSetting):
+    """Group indices by identical settings and show the settings which differ between groups."""
+
+    read_only = True
+    index_settings: IndexSettings
+
+    # Settings unique to every index, which would put each index in its own group
+    IGNORED_SETTINGS = (
+        "index.creation_date",
+        "index.provided_name",
+        "index.uuid",
+        "index.version.*",
+        "index.history.uuid",
+        "index.resize.source.*",
+        "index.shrink.source.*",
+    )
+
+    def take_action(self, parsed_args):
+        setting_name = parsed_args.setting
+
+        if not setting_name.startswith("index."):
+            setting_name = f"index.{setting_name}"
+
+        if parsed_args.template:
+            table, templates = self.concurrently(
+                lambda: self.index_settings.list_(parsed_args.index, setting_name),
+                self.index_settings.templates,
+            )
+        else:
+            table, templates = self.index_settings.list_(parsed_args.index, setting_name), None
+
+        ignored = (*self.IGNORED_SETTINGS, *(parsed_args.ignore or []))
+        keys = [
+            key
+            for key in fnmatch.filter(table.keys, setting_name)
+            if not any(fnmatch.fnmatch(key, pattern) for pattern in ignored)
+        ]
+        groups = table.group(keys)
+
+        # Only keep the settings whose value isn't the same in every group
+        differing = [
+            position for position in range(len(keys)) if len({fingerprint[position] for fingerprint in groups}) > 1
+        ]
+        self.log.debug(f"{len(groups)} group(s) of indices, differing on {len(differing)} setting(s)")
+
+        if templates is not None:
+            groups = self._split_by_template(groups, templates)
+        else:
+            groups = {(fingerprint, None): indices for fingerprint, indices in groups.items()}
+
+        lines = []
+        for number, ((fingerprint, template), indices) in enumerate(groups.items(), start=1):
+            line = {
+                "group": number,
+                "count": len(indices),
+                "indices": indices,
+                "settings": {keys[position]: fingerprint[position] for position in differing},
+            }
+
+            if templates is not None:
+                line["template"] = template.name if template else None
+                line["drift"] = self._drift(keys, fingerprint, template)
+
+            lines.append(line)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, lines)
+
+        for line in lines:
+            indices = line.pop("indices")
+            line["indices"] = ", ".join(indices[: parsed_args.max_indices]) + (
+                ", ..." if len(indices) > parsed_args.max_indices else ""
+            )
+            line.update(line.pop("settings"))
+
+            if templates is not None:
+                line["drift"] = "\n".join(
+                    f"{key}={drift['value']} (template: {drift['template']})" for key, drift in line["drift"].items()
+                )
+
+        return JSONToCliffFormatter(lines).format_for_lister(
+            columns=[("group",), ("count",), ("indices",)]
+            + ([("template",), ("drift",)] if templates is not None else [])
+            + [(keys[position], keys[position]) for position in differing],
+            none_as="" if self.uses_table_formatter() else None,
+        )
+
+    @staticmethod
+    def _split_by_template(
+        groups: dict[tuple[Any, ...], list[str]],
+        templates: list[IndexTemplate],
+    ) -> dict[tuple[tuple[Any, ...], IndexTemplate | None], list[str]]:
+        """Split each group of indices by the template they were created from, as they may drift from it differently."""
+        split: dict[tuple[tuple[Any, ...], IndexTemplate | None], list[str]] = {}
+
+        for fingerprint, indices in groups.items():
+            for index in indices:
+                split.setdefault((fingerprint, matching_template(index, templates)), []).append(index)
+
+        return dict(sorted(split.items(), key=lambda group: len(group[1]), reverse=True))
+
+    @staticmethod
+    def _drift(keys: list[str], fingerprint: tuple[Any, ...], template: IndexTemplate | None) -> dict[str, dict]:
+        """Settings set by the template whose value isn't the one of the indices (anymore)."""
+        if template is None:
+            return {}
+
+        values = {key: as_setting_value(value) for key, value in zip(keys, fingerprint, strict=True)}
+
+        return {
+            key: {"value": value, "template": template.settings[key]}
+            for key, value in values.items()
+            if key in template.settings and value != template.settings[key]
+        }
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--ignore",
+            metavar="SETTING",
+            action="append",
+            help=f"Setting (or pattern) to ignore, on top of {', '.join(self.IGNORED_SETTINGS)}. Can be repeated",
+        )
+        parser.add_argument(
+            "--max-indices",
+            type=int,
+            default=3,
+            help="Number of indices shown for each group (default: 3)",
+        )
+        parser.add_argument(
+            "--template",
+            action="store_true",
+            help="Also group indices by the index template matching them, and show the settings drifting from it",
+        )
+        return parser
+
+
 class IndexSettingsList(EsctlShowOne):
     """[Experimental] List available settings in an index."""
 
+    read_only = True
     index_settings: IndexSettings
 
     def take_action(self, parsed_args):
@@ -167,7 +460,10 @@ class IndexSettingsList(EsctlShowOne):
             "index",
         )
 
-        settings_list = self.index_settings.list_(sample_index_name)
+        settings_list = self.index_settings.list_(sample_index_name).as_dict(sample_index_name)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, settings_list)
         settings_list = collections.OrderedDict(
             sorted(
                 {
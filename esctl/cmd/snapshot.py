@@ -6,10 +6,15 @@ from esctl.utils import Color
 class SnapshotList(EsctlLister):
     """Returns all snapshots in a specific repository."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        snapshots = self.transform(
-            self.es.cat.snapshots(repository=parsed_args.repository, format="json"),
-        )
+        snapshots = self.es.cat.snapshots(repository=parsed_args.repository, format="json")
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, snapshots)
+
+        snapshots = self.transform(snapshots)
 
         return JSONToCliffFormatter(snapshots).format_for_lister(
             columns=[
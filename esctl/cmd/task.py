@@ -1,21 +1,28 @@
 import datetime
+import time
 
-from esctl.commands import EsctlLister
+from esctl.commands import EsctlCommand, EsctlLister
 from esctl.formatter import JSONToCliffFormatter
+from esctl.tasks import TaskProgress, TaskStatus
 
 
 class TaskList(EsctlLister):
     """Returns a list of tasks."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        tasks = self.transform(
-            self.es.tasks.list(
-                actions=parsed_args.actions,
-                detailed=parsed_args.detailed,
-                parent_task_id=parsed_args.parent_task_id,
-            ).get("nodes"),
+        tasks = self.es.tasks.list(
+            actions=parsed_args.actions,
+            detailed=parsed_args.detailed,
+            parent_task_id=parsed_args.parent_task_id,
         )
 
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, tasks)
+
+        tasks = self.transform(tasks.get("nodes"))
+
         return JSONToCliffFormatter(tasks).format_for_lister(
             columns=[
                 ("name"),
@@ -41,8 +48,6 @@ class TaskList(EsctlLister):
         )
 
     def transform(self, nodes):
-        tasks = []
-
         for _, node_definition in nodes.items():
             for task_name, task in node_definition.get("tasks").items():
                 task["name"] = task_name
@@ -54,9 +59,7 @@ class TaskList(EsctlLister):
                     task.get("start_time_in_millis"),
                 )
 
-                tasks.append(task)
-
-        return tasks
+                yield task
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -76,3 +79,97 @@ class TaskList(EsctlLister):
         )
 
         return parser
+
+
+class AbstractTaskWatch(EsctlCommand):
+    """Poll a bulk-by-scroll task (reindex, update by query, delete by query) until it completes."""
+
+    def follow_task(self, task_id: str, interval: float) -> int | None:
+        progress = TaskProgress()
+        slices_progress: dict[int, TaskProgress] = {}
+
+        try:
+            while True:
+                response = self.es.tasks.get(task_id=task_id)
+                status = TaskStatus.from_response(response)
+
+                if status.completed:
+                    break
+
+                progress.update(status)
+                self.print_output(f"{task_id} : {progress.describe(status)}")
+
+                for slice_status in status.slices:
+                    slice_id = slice_status.status.get("slice_id")
+                    slice_progress = slices_progress.setdefault(slice_id, TaskProgress())
+                    slice_progress.update(slice_status)
+                    self.print_output(f"  slice {slice_id} : {slice_progress.describe(slice_status)}")
+
+                time.sleep(interval)
+
+        except KeyboardInterrupt:
+            self.log.warning(f"Stopped watching, the task goes on. Resume with : esctl task watch {task_id}")
+            return 130
+
+        return self.report(response)
+
+    def report(self, response) -> int | None:
+        """Print the result of a completed task, and return 1 if it failed."""
+        result = response.get("response", {})
+        print(result)
+
+        if response.get("error") is not None:
+            self.log.error(f"Task {response.get('task', {}).get('id')} failed : {response.get('error')}")
+            return 1
+
+        if result.get("failures"):
+            self.log.error(f"{len(result.get('failures'))} document(s) failed")
+            return 1
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Seconds between two progress updates (default: 5)",
+        )
+        return parser
+
+
+class TaskWatch(AbstractTaskWatch):
+    """Show the progress of a reindex, update by query or delete by query task until it completes.
+
+    Useful to follow a task started with `--async`, or again after the terminal was closed.
+    """
+
+    def take_action(self, parsed_args):
+        return self.follow_task(parsed_args.task_id, parsed_args.interval)
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument("task_id", help="ID of the task (node_id:task_number)")
+        return parser
+
+
+class TaskRethrottle(EsctlCommand):
+    """Change the throttling of a running reindex."""
+
+    def take_action(self, parsed_args):
+        self.log.info(f"Throttling task {parsed_args.task_id} to {parsed_args.requests_per_second} requests per second")
+        print(
+            self.es.reindex_rethrottle(
+                task_id=parsed_args.task_id,
+                requests_per_second=parsed_args.requests_per_second,
+            ),
+        )
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument("task_id", help="ID of the reindex task (node_id:task_number)")
+        parser.add_argument(
+            "requests_per_second",
+            type=float,
+            help="Maximum number of documents per second, -1 to disable throttling",
+        )
+        return parser
@@ -5,12 +5,15 @@ from esctl.formatter import JSONToCliffFormatter
 class SecurityUsersGet(EsctlLister):
     """Retrieves information about users in the native realm and built-in users."""
 
+    read_only = True
+
     def take_action(self, parsed_args):
-        users = self.transform(
-            self._sort_and_order_dict(
-                self.es.security.get_user(format="json", username=parsed_args.username),
-            ),
-        )
+        users = self.es.security.get_user(username=parsed_args.username)
+
+        if parsed_args.jmespath is not None:
+            return self.jmespath_output(parsed_args.jmespath, users)
+
+        users = self.transform(self._sort_and_order_dict(users))
 
         return JSONToCliffFormatter(users).format_for_lister(
             columns=[
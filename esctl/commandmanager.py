@@ -0,0 +1,100 @@
+import importlib
+
+from cliff.commandmanager import CommandManager
+
+# Precomputed index of every command shipped with esctl, mapping the command's name
+# to the object reference of its class. It mirrors the `esctl` entry-points group
+# declared in pyproject.toml (a test ensures both stay in sync) and avoids
+# scanning every installed distribution on each invocation.
+COMMANDS: dict[str, str] = {
+    "alias list": "esctl.cmd.alias:AliasList",
+    "cat allocation": "esctl.cmd.cat:CatAllocation",
+    "cat plugins": "esctl.cmd.cat:CatPlugins",
+    "cat shards": "esctl.cmd.cat:CatShards",
+    "cat thread-pool": "esctl.cmd.cat:CatThreadpool",
+    "cat templates": "esctl.cmd.cat:CatTemplates",
+    "cluster allocation explain": "esctl.cmd.cluster:ClusterAllocationExplain",
+    "cluster balance": "esctl.cmd.cluster:ClusterBalance",
+    "cluster health": "esctl.cmd.cluster:ClusterHealth",
+    "cluster info": "esctl.cmd.cluster:ClusterInfo",
+    "cluster routing allocation enable": "esctl.cmd.cluster:ClusterRoutingAllocationEnable",
+    "cluster stats": "esctl.cmd.cluster:ClusterStats",
+    "cluster settings apply": "esctl.cmd.settings:ClusterSettingsApply",
+    "cluster settings list": "esctl.cmd.settings:ClusterSettingsList",
+    "cluster settings get": "esctl.cmd.settings:ClusterSettingsGet",
+    "cluster settings reset": "esctl.cmd.settings:ClusterSettingsReset",
+    "cluster settings set": "esctl.cmd.settings:ClusterSettingsSet",
+    "config cluster list": "esctl.cmd.config:ConfigClusterList",
+    "config context list": "esctl.cmd.config:ConfigContextList",
+    "config context set": "esctl.cmd.config:ConfigContextSet",
+    "config show": "esctl.cmd.config:ConfigShow",
+    "config user list": "esctl.cmd.config:ConfigUserList",
+    "daemon start": "esctl.cmd.daemon:DaemonStart",
+    "daemon status": "esctl.cmd.daemon:DaemonStatus",
+    "daemon stop": "esctl.cmd.daemon:DaemonStop",
+    "document get": "esctl.cmd.document:DocumentGet",
+    "index close": "esctl.cmd.index:IndexClose",
+    "index create": "esctl.cmd.index:IndexCreate",
+    "index delete": "esctl.cmd.index:IndexDelete",
+    "index list": "esctl.cmd.index:IndexList",
+    "index open": "esctl.cmd.index:IndexOpen",
+    "index reindex": "esctl.cmd.index:IndexReindex",
+    "index reindex-many": "esctl.cmd.index:IndexReindexMany",
+    "index settings diff": "esctl.cmd.settings:IndexSettingsDiff",
+    "index settings get": "esctl.cmd.settings:IndexSettingsGet",
+    "index settings list": "esctl.cmd.settings:IndexSettingsList",
+    "index settings set": "esctl.cmd.settings:IndexSettingsSet",
+    "logging get": "esctl.cmd.logging:LoggingGet",
+    "logging reset": "esctl.cmd.logging:LoggingReset",
+    "logging set": "esctl.cmd.logging:LoggingSet",
+    "migration deprecations": "esctl.cmd.migration:MigrationDeprecations",
+    "node exclude": "esctl.cmd.node:NodeExclude",
+    "node hot-threads": "esctl.cmd.node:NodeHotThreads",
+    "node list": "esctl.cmd.node:NodeList",
+    "node stats": "esctl.cmd.node:NodeStats",
+    "raw": "esctl.cmd.raw:RawCommand",
+    "record": "esctl.cmd.record:Record",
+    "record list": "esctl.cmd.record:RecordList",
+    "replay": "esctl.cmd.record:Replay",
+    "repository list": "esctl.cmd.repository:RepositoryList",
+    "repository show": "esctl.cmd.repository:RepositoryShow",
+    "repository verify": "esctl.cmd.repository:RepositoryVerify",
+    "roles get": "esctl.cmd.roles:SecurityRolesGet",
+    "snapshot list": "esctl.cmd.snapshot:SnapshotList",
+    "task list": "esctl.cmd.task:TaskList",
+    "task rethrottle": "esctl.cmd.task:TaskRethrottle",
+    "task watch": "esctl.cmd.task:TaskWatch",
+    "users get": "esctl.cmd.users:SecurityUsersGet",
+}
+
+
+class LazyEntryPoint:
+    """Stand-in for an entry point which only imports its module when the command is loaded."""
+
+    def __init__(self, name: str, value: str):
+        self.name = name
+        self.value = value
+
+    def load(self):
+        module_name, _, class_name = self.value.partition(":")
+        return getattr(importlib.import_module(module_name), class_name)
+
+    def __repr__(self):
+        return f"LazyEntryPoint({self.name} = {self.value})"
+
+
+class LazyCommandManager(CommandManager):
+    """Command manager reading commands from the precomputed `COMMANDS` index.
+
+    Unlike cliff's `CommandManager`, it doesn't scan installed distributions for
+    entry points and doesn't import anything until a command is actually selected.
+    """
+
+    def load_commands(self, namespace):
+        self.group_list.append(namespace)
+
+        for name, value in COMMANDS.items():
+            self.commands[name] = LazyEntryPoint(name, value)
+
+    def get_command_names(self, group=None):
+        return list(self.commands.keys())
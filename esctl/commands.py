@@ -1,23 +1,82 @@
+import argparse
+import contextlib
+import itertools
 import logging
+import operator
 import os
 import sys
+import threading
+import time
+from collections.abc import Callable
+from functools import cache, cached_property
 from typing import Any
 
-import jmespath
 from cliff.command import Command
 from cliff.lister import Lister
 from cliff.show import ShowOne
 
 from esctl.elasticsearch import Client
+from esctl.exceptions import NotRecordedError, SettingNotFoundError
+from esctl.formatter import StreamingJSONFormatter
+from esctl.query import compile_expression
 from esctl.settings import ClusterSettings, IndexSettings
-from esctl.utils import Color
+from esctl.utils import Color, positive_float
+from esctl.watch import LiveTable, Schedule
 
 
 class EsctlCommon:
     log = logging.getLogger(__name__)
-    es = Client().es
-    cluster_settings = ClusterSettings()
-    index_settings = IndexSettings()
+
+    # Columns holding ever-increasing counters, shown with their per-second rate by `--watch`
+    counter_columns: tuple[str, ...] = ()
+
+    # Client of the context this instance runs on, when the command is run on several contexts
+    context_client: Client | None = None
+
+    # Whether the command only reads from the cluster : only such commands can run on several contexts at once
+    read_only = False
+
+    # Reads stdin for all the instances of a command run on several contexts, which share it
+    read_stdin: Callable[[], str] | None = None
+
+    @property
+    def client(self) -> Client:
+        return self.context_client or self.app.client
+
+    @property
+    def es(self):
+        """Elasticsearch client of the current context, only built when a request is actually sent."""
+        return self.client.es
+
+    @cached_property
+    def cluster_settings(self) -> ClusterSettings:
+        return ClusterSettings(self.client)
+
+    @cached_property
+    def index_settings(self) -> IndexSettings:
+        return IndexSettings(self.client)
+
+    @contextlib.contextmanager
+    def fresh_responses(self):
+        """Don't use cached responses in this block, but still store the new ones.
+
+        Commands acting on the cluster, or following its changes, need its current state.
+        """
+        cache = self.client.response_cache
+
+        if cache is None:
+            yield
+            return
+
+        read, cache.read = cache.read, False
+        try:
+            yield
+        finally:
+            cache.read = read
+
+    def jmespath_search(self, expression, data, options=None):
+        # API responses wrap the actual document
+        return compile_expression(expression).search(getattr(data, "body", data), options=options)
 
     def _sort_and_order_dict(self, dct):
         return {e[0]: e[1] for e in sorted(dct.items())}
@@ -36,9 +95,180 @@ class EsctlCommon:
         if path is not None:
             with open(os.path.expanduser(path)) as reader:
                 return reader.read()
+        elif self.read_stdin is not None:
+            return self.read_stdin()
         else:
             return sys.stdin.read()
 
+    def is_read_only(self, parsed_args) -> bool:
+        """Whether this run of the command only reads from the cluster, which some options may change."""
+        return self.read_only
+
+    def runs_on_several_contexts(self, parsed_args) -> bool:
+        if len(self.app.clients) < 2 or self.context_client is not None:
+            return False
+
+        # Commands only reading the config file would give the same rows for every context
+        if self.__class__.__name__ in self.app.LOCAL_COMMANDS:
+            return False
+
+        if not self.is_read_only(parsed_args):
+            self.log.critical(
+                f"`{self.cmd_name}` can change the cluster, so it can only run on a single context, "
+                f"but {', '.join(client.context.name for client in self.app.clients)} were given",
+            )
+            sys.exit(1)
+
+        if parsed_args.watch:
+            self.log.warning("--watch only follows the first context")
+            return False
+
+        return True
+
+    def add_watch_argument(self, parser):
+        parser.add_argument(
+            "--watch",
+            metavar="INTERVAL",
+            type=positive_float,
+            help=("Run the command again every INTERVAL seconds, highlighting what changed, until interrupted"),
+        )
+
+    def watch(self, parsed_args, to_rows, key_columns: int = 1) -> int:
+        """Run `take_action` every `--watch` seconds and redraw its output in place.
+
+        :param to_rows: Turns the result of `take_action` into the column names and the rows to draw
+        :param key_columns: Number of leading columns identifying a row from a tick to the next
+        """
+        from elasticsearch import ApiError, TransportError
+
+        parsed_args = self._run_before_hooks(parsed_args)
+        schedule = Schedule(parsed_args.watch)
+        table = LiveTable(
+            self.app.stdout,
+            counter_columns=self.counter_columns,
+            key_columns=key_columns,
+            tty=self.app.stdout.isatty(),
+        )
+        columns, rows = (), []
+
+        try:
+            # Each tick must show the current state of the cluster
+            with self.fresh_responses():
+                while True:
+                    # Settings are only fetched once per instance otherwise
+                    self.__dict__.pop("cluster_settings", None)
+                    self.__dict__.pop("index_settings", None)
+                    title = f"Every {parsed_args.watch:g}s: esctl {self.cmd_name}"
+
+                    try:
+                        columns, rows = to_rows(
+                            parsed_args, *self._run_after_hooks(parsed_args, self.take_action(parsed_args))
+                        )
+                    except (ApiError, TransportError) as error:
+                        # Keep showing the last known values until the cluster answers again
+                        title = f"{title}  {Color.colorize(error, Color.RED)}"
+
+                    table.draw(f"{title}  {time.strftime('%H:%M:%S')}", columns, rows)
+                    schedule.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            table.close()
+
+        return 0
+
+    def fan_out(self, parsed_args, to_rows) -> tuple[tuple[str, ...], list[tuple[Any, ...]], int]:
+        """Run `take_action` on every context of the app at once, and merge their rows.
+
+        Each context gets its own instance of the command and its own client. A
+        context failing is reported, but doesn't prevent showing the others.
+
+        :param to_rows: Turns the result of `take_action` into the column names and the rows
+        :return: The column names, starting with `Context`, the rows, and how many contexts failed
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        from elastic_transport import TransportError
+        from elasticsearch import ApiError
+
+        parsed_args = self._run_before_hooks(parsed_args)
+        self.formatter = self._formatter_plugins[parsed_args.formatter].obj
+
+        stdin_lock = threading.Lock()
+        stdin = cache(sys.stdin.read)
+
+        def read_stdin() -> str:
+            with stdin_lock:
+                return stdin()
+
+        def run(client: Client):
+            command = type(self)(self.app, self.app_args, cmd_name=self.cmd_name)
+            command.context_client = client
+            command.formatter = self.formatter
+            command.read_stdin = read_stdin
+
+            return to_rows(parsed_args, *command._run_after_hooks(parsed_args, command.take_action(parsed_args)))
+
+        concurrency = max(1, getattr(self.app.options, "context_concurrency", None) or 8)
+        columns: dict[str, None] = {}
+        results: list[tuple[str, tuple[str, ...], list[tuple[Any, ...]]]] = []
+        failures = 0
+
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(self.app.clients))) as executor:
+            futures = [(client.context.name, executor.submit(run, client)) for client in self.app.clients]
+
+            for name, future in futures:
+                try:
+                    context_columns, rows = future.result()
+                except SystemExit:
+                    # The command already told why it stopped
+                    self.log.error(f"{name} : failed")
+                    failures += 1
+                    continue
+                except (ApiError, TransportError, NotRecordedError, SettingNotFoundError) as error:
+                    self.log.error(f"{name} : {error}")
+                    failures += 1
+                    continue
+
+                columns.update(dict.fromkeys(context_columns))
+                results.append((name, tuple(context_columns), list(rows)))
+
+        # Contexts may not give the same columns (like nodes in `cat shards`)
+        merged = []
+        for name, context_columns, rows in results:
+            positions = {column: position for position, column in enumerate(context_columns)}
+
+            for row in rows:
+                merged.append(
+                    (name, *(row[positions[column]] if column in positions else None for column in columns)),
+                )
+
+        return ("Context", *columns), merged, failures
+
+    def concurrently(self, *calls: Callable[[], Any]) -> list[Any]:
+        """Send independent requests at the same time, and return their responses in the same order.
+
+        Over a slow link, they then take as long as the slowest one rather than
+        the sum of their round-trips. If some fail, the first one's error is
+        raised once they all completed.
+
+        :Example:
+                shards, nodes = self.concurrently(
+                    lambda: self.es.cat.shards(format="json"),
+                    lambda: self.es.cat.nodes(format="json"),
+                )
+        """
+        if len(calls) < 2:
+            return [call() for call in calls]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        # The client's connection pool is shared by the threads, each request using its own connection
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            futures = [executor.submit(call) for call in calls]
+
+        return [future.result() for future in futures]
+
     def request(
         self,
         verb: str,
@@ -47,30 +277,6 @@ class EsctlCommon:
     ) -> dict[Any, Any]:
         return self.es.transport.perform_request(verb.upper(), route, body=body)
 
-    def objects_list_to_flat_dict(self, lst: list[dict[str, Any]]) -> dict[str, Any]:
-        """Convert a list of dict to a flattened dict with full name.
-
-        :Example:
-                node.jvm.versions = [{"version":"12.0.1","vm_name":"OpenJDK 64-Bit Server VM","vm_version":"12.0.1+12",
-                "vm_vendor":"Oracle Corporation","bundled_jdk":true,"using_bundled_jdk":true,"count":1}] # noqa: E501
-            becomes
-                {
-                    "node.jvm.versions[0].version": "12.0.1",
-                    "node.jvm.versions[0].vm_name": "OpenJDK 64-Bit Server VM"
-                }
-
-        :param lst: A list of dict to flatten
-        :paramtype lst: list
-        :return: A dict
-        :rtype: dict
-        """
-        flat_dict = {}
-        for index, element in enumerate(lst):
-            for attribute, value in element.items():
-                flat_dict[f"[{index}].{attribute}"] = value
-
-        return flat_dict
-
     def _delete_and_merge_inner_dict_into_parent(
         self,
         parent_dict: dict[str, Any],
@@ -130,6 +336,10 @@ class EsctlCommon:
 class EsctlCommand(Command, EsctlCommon):
     """Simple command to run. Doesn’t expect any output."""
 
+    def run(self, parsed_args):
+        with self.fresh_responses():
+            return super().run(parsed_args)
+
 
 class EsctlCommandWithPersistency(EsctlCommand):
     """Add mutually exclusive arguments `transient` and `persistent` to
@@ -179,6 +389,72 @@ class EsctlCommandSetting(EsctlCommandWithPersistency):
 class EsctlLister(Lister, EsctlCommon):
     """Expect a list of elements in order to create a multi-columns table."""
 
+    # Number of leading columns identifying a line, to follow its changes with `--watch`
+    key_columns = 1
+
+    def run(self, parsed_args):
+        if self.runs_on_several_contexts(parsed_args):
+            columns, rows, failures = self.fan_out(parsed_args, self._watch_rows)
+
+            if failures == len(self.app.clients):
+                return 1
+
+            if parsed_args.formatter == "json":
+                self.formatter = StreamingJSONFormatter()
+
+            if parsed_args.sort_columns:
+                indexes = [columns.index(column) for column in parsed_args.sort_columns if column in columns]
+                if indexes:
+                    rows.sort(key=operator.itemgetter(*indexes))
+
+            self.formatter.emit_list(columns, rows, self.app.stdout, parsed_args)
+
+            return 0
+
+        if parsed_args.watch:
+            return self.watch(parsed_args, self._watch_rows, key_columns=self.key_columns)
+
+        return super().run(parsed_args)
+
+    def _watch_rows(self, parsed_args, column_names, data):
+        columns, selector = self._generate_columns_and_selector(parsed_args, column_names)
+
+        return columns, [tuple(row if selector is None else itertools.compress(row, selector)) for row in data]
+
+    def jmespath_output(self, expression, data):
+        """Run a JMESPath query on the raw data of the command and return its result as lines.
+
+        A list of objects gives a line per object and a column per key, any other
+        list a line per element.
+        """
+        result = self.jmespath_search(expression, data)
+
+        if not isinstance(result, list):
+            result = [result]
+
+        if result and all(isinstance(element, dict) for element in result):
+            columns = list(dict.fromkeys(key for element in result for key in element))
+
+            return (tuple(columns), tuple(tuple(element.get(c) for c in columns) for element in result))
+
+        return (("Result",), tuple((element,) for element in result))
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            "--jmespath",
+            help=("[Experimental] Execute a JMESPath query on the response. See https://jmespath.org for help."),
+        )
+        self.add_watch_argument(parser)
+        return parser
+
+    def produce_output(self, parsed_args, column_names, data):
+        # cliff's JSON formatter holds every row in memory before dumping them
+        if parsed_args.formatter == "json":
+            self.formatter = StreamingJSONFormatter()
+
+        return super().produce_output(parsed_args, column_names, data)
+
 
 class EsctlListerIndexSetting(EsctlLister):
     def get_parser(self, prog_name):
@@ -197,8 +473,44 @@ class EsctlListerIndexSetting(EsctlLister):
 class EsctlShowOne(ShowOne, EsctlCommon):
     """Expect a key-value list to create a two-columns table."""
 
-    def jmespath_search(self, expression, data, options=None):
-        return jmespath.search(expression, data, options=options)
+    def run(self, parsed_args):
+        if self.runs_on_several_contexts(parsed_args):
+            columns, rows, failures = self.fan_out(parsed_args, self._context_rows)
+
+            if failures == len(self.app.clients):
+                return 1
+
+            if hasattr(self.formatter, "emit_list"):
+                # A line per context, with the options only lists have left to their defaults
+                list_args = argparse.Namespace(
+                    **{"print_empty": False, "max_width": 0, "fit_width": False, **vars(parsed_args)},
+                )
+                self.formatter.emit_list(columns, rows, self.app.stdout, list_args)
+            else:
+                for row in rows:
+                    self.formatter.emit_one(columns, row, self.app.stdout, parsed_args)
+
+            return 0
+
+        if parsed_args.watch:
+            return self.watch(parsed_args, self._watch_rows)
+
+        return super().run(parsed_args)
+
+    def _context_rows(self, parsed_args, column_names, data):
+        columns, selector = self._generate_columns_and_selector(parsed_args, column_names)
+
+        return columns, [tuple(data if selector is None else itertools.compress(data, selector))]
+
+    def _watch_rows(self, parsed_args, column_names, data):
+        columns, selector = self._generate_columns_and_selector(parsed_args, column_names)
+        values = data if selector is None else itertools.compress(data, selector)
+
+        return ("Field", "Value"), list(zip(columns, values))
+
+    def jmespath_output(self, expression, data):
+        """Run a JMESPath query on the raw data of the command and return its result."""
+        return (("Result",), (self.jmespath_search(expression, data),))
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -211,4 +523,5 @@ class EsctlShowOne(ShowOne, EsctlCommon):
             "--jmespath",
             help=("[Experimental] Execute a JMESPath query on the response. See https://jmespath.org for help."),
         )
+        self.add_watch_argument(parser)
         return parser
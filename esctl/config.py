@@ -1,15 +1,96 @@
+import fnmatch
+import hashlib
 import logging
+import marshal
 import os
 import sys
 from collections import OrderedDict
 from pathlib import Path
 from typing import Any
 
-import cerberus
-import yaml
-
 from esctl.utils import setup_yaml
 
+SETTINGS_SCHEMA = {
+    "no_check_certificate": {"type": "boolean"},
+    "max_retries": {"type": "integer"},
+    "timeout": {"type": "integer"},
+    "node_selector": {"type": "string", "allowed": ["least_latency", "random", "round_robin"]},
+    "connections_per_node": {"type": "integer", "min": 1},
+    "sniff_on_start": {"type": "boolean"},
+    "retry_on_timeout": {"type": "boolean"},
+    "dead_node_backoff_factor": {"type": "number", "min": 0},
+    "max_dead_node_backoff": {"type": "number", "min": 0},
+    "response_cache": {"type": "boolean"},
+}
+
+EXTERNAL_CREDENTIALS_SCHEMA = {
+    "type": "dict",
+    "schema": {
+        "command": {
+            "type": "dict",
+            "schema": {
+                "run": {
+                    "type": "string",
+                    "required": True,
+                },
+            },
+        },
+    },
+}
+
+SCHEMA = {
+    "settings": {"type": "dict", "schema": SETTINGS_SCHEMA},
+    "clusters": {
+        "type": "dict",
+        "required": True,
+        "keysrules": {},
+        "valuesrules": {
+            "type": "dict",
+            "schema": {
+                "servers": {"type": "list"},
+                "settings": {"type": "dict", "schema": SETTINGS_SCHEMA},
+            },
+        },
+    },
+    "users": {
+        "type": "dict",
+        "keysrules": {"type": "string"},
+        "valuesrules": {
+            "type": "dict",
+            "schema": {
+                "username": {"type": "string"},
+                "password": {"type": "string"},
+                "external_username": EXTERNAL_CREDENTIALS_SCHEMA,
+                "external_password": EXTERNAL_CREDENTIALS_SCHEMA,
+            },
+        },
+    },
+    "contexts": {
+        "type": "dict",
+        "required": True,
+        "keysrules": {"type": "string"},
+        "valuesrules": {
+            "type": "dict",
+            "schema": {
+                "cluster": {"type": "string"},
+                "user": {"type": "string"},
+                "pre_commands": {
+                    "type": "list",
+                    "schema": {
+                        "type": "dict",
+                        "schema": {
+                            "command": {"type": "string"},
+                            "wait_for_exit": {"type": "boolean"},
+                            "wait_for_output": {"type": "string"},
+                        },
+                    },
+                },
+            },
+        },
+    },
+    "default-context": {"type": "string"},
+}
+
 
 class Context:
     def __init__(self, name, user, cluster, settings, **kwargs):
@@ -27,18 +108,90 @@ class Context:
         return f"<Context {self.name} user={self.user} cluster={self.cluster} settings={self.settings}>"
 
 
+class ConfigCache:
+    """Cache of already parsed and validated config files.
+
+    Each config file is stored as a marshal blob under the cache directory, along
+    with the modification time and size of the file it comes from. As long as the
+    file doesn't change, loading it skips both YAML parsing and schema validation.
+    """
+
+    log = logging.getLogger(__name__)
+
+    # Changing the schema invalidates everything which was validated against the previous one
+    SCHEMA_DIGEST = hashlib.sha1(repr(SCHEMA).encode()).hexdigest()
+
+    def __init__(self, directory: str | None = None):
+        self._directory = directory
+
+    @property
+    def directory(self) -> str:
+        return os.path.expanduser(
+            self._directory
+            or os.environ.get("ESCTL_CACHE_DIR")
+            or os.path.join(os.environ.get("XDG_CACHE_HOME", "~/.cache"), "esctl"),
+        )
+
+    def _cache_file(self, path: str) -> str:
+        return os.path.join(self.directory, f"config-{hashlib.sha1(path.encode()).hexdigest()}.marshal")
+
+    def _fingerprint(self, path: str) -> tuple[str, str, int, int]:
+        stat = os.stat(path)
+        return (self.SCHEMA_DIGEST, path, stat.st_mtime_ns, stat.st_size)
+
+    def load(self, path: str) -> "OrderedDict[str, Any] | None":
+        try:
+            with open(self._cache_file(path), "rb") as cache_file:
+                fingerprint, config = marshal.load(cache_file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        if tuple(fingerprint) != self._fingerprint(path):
+            self.log.debug(f"Cached config of {path} is outdated")
+            return None
+
+        return OrderedDict(config)
+
+    def store(self, path: str, config: "OrderedDict[str, Any]"):
+        try:
+            blob = marshal.dumps((self._fingerprint(path), dict(config)))
+        except ValueError:
+            # The config contains values marshal can't serialize (like dates), don't cache it
+            return
+
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            cache_file = self._cache_file(path)
+            with open(f"{cache_file}.tmp", "wb") as writer:
+                writer.write(blob)
+            os.replace(f"{cache_file}.tmp", cache_file)
+        except OSError as err:
+            self.log.debug(f"Cannot write config cache : {err}")
+
+    def invalidate(self, path: str):
+        try:
+            os.unlink(self._cache_file(path))
+        except FileNotFoundError:
+            pass
+
+
 class ConfigFileParser:
     log = logging.getLogger(__name__)
 
-    def __init__(self):
+    def __init__(self, cache: ConfigCache | None = None):
         self.users = {}
         self.contexts = {}
         self.clusters = {}
         self.settings = {}
+        self.cache = cache or ConfigCache()
 
     def write_config_file(self, content):
+        import yaml
+
         setup_yaml()
 
+        self.cache.invalidate(self.path)
+
         with open(self.path, "w") as config_file:
             yaml.dump(content, config_file, default_flow_style=False, width=500)
 
@@ -61,80 +214,10 @@ class ConfigFileParser:
         return default_config
 
     def _ensure_config_file_is_valid(self, document):
-        settings_schema = {
-            "no_check_certificate": {"type": "boolean"},
-            "max_retries": {"type": "integer"},
-            "timeout": {"type": "integer"},
-        }
+        # cerberus is slow to import, and not needed at all when the config comes from the cache
+        import cerberus
 
-        external_credentials_schema = {
-            "type": "dict",
-            "schema": {
-                "command": {
-                    "type": "dict",
-                    "schema": {
-                        "run": {
-                            "type": "string",
-                            "required": True,
-                        },
-                    },
-                },
-            },
-        }
-
-        schema = {
-            "settings": {"type": "dict", "schema": settings_schema},
-            "clusters": {
-                "type": "dict",
-                "required": True,
-                "keysrules": {},
-                "valuesrules": {
-                    "type": "dict",
-                    "schema": {
-                        "servers": {"type": "list"},
-                        "settings": {"type": "dict", "schema": settings_schema},
-                    },
-                },
-            },
-            "users": {
-                "type": "dict",
-                "keysrules": {"type": "string"},
-                "valuesrules": {
-                    "type": "dict",
-                    "schema": {
-                        "username": {"type": "string"},
-                        "password": {"type": "string"},
-                        "external_username": external_credentials_schema,
-                        "external_password": external_credentials_schema,
-                    },
-                },
-            },
-            "contexts": {
-                "type": "dict",
-                "required": True,
-                "keysrules": {"type": "string"},
-                "valuesrules": {
-                    "type": "dict",
-                    "schema": {
-                        "cluster": {"type": "string"},
-                        "user": {"type": "string"},
-                        "pre_commands": {
-                            "type": "list",
-                            "schema": {
-                                "type": "dict",
-                                "schema": {
-                                    "command": {"type": "string"},
-                                    "wait_for_exit": {"type": "boolean"},
-                                    "wait_for_output": {"type": "string"},
-                                },
-                            },
-                        },
-                    },
-                },
-            },
-            "default-context": {"type": "string"},
-        }
-        cerberus_validator = cerberus.Validator(schema)
+        cerberus_validator = cerberus.Validator(SCHEMA)
 
         if not cerberus_validator.validate(document):
             for root_error in cerberus_validator._errors:
@@ -151,6 +234,12 @@ class ConfigFileParser:
 
             raise SyntaxError(f"{self.path} doesn't match expected schema")
 
+    def _validate_or_exit(self, document):
+        try:
+            self._ensure_config_file_is_valid(document)
+        except SyntaxError:
+            sys.exit(1)
+
     def load_configuration(self, path: str = "~/.esctlrc") -> OrderedDict:
         self.path = os.path.expanduser(path)
         self.log.debug(f"Trying to load config file : {self.path}")
@@ -162,7 +251,16 @@ class ConfigFileParser:
             "users",
         ]
 
-        if Path(self.path).is_file():
+        if not Path(self.path).is_file():
+            raw_config_file = self._create_default_config_file()
+            self._validate_or_exit(raw_config_file)
+
+        elif (raw_config_file := self.cache.load(self.path)) is not None:
+            self.log.debug(f"Loaded config file from cache : {self.path}")
+
+        else:
+            import yaml
+
             with open(self.path) as config_file:
                 try:
                     raw_config_file = OrderedDict(yaml.safe_load(config_file))
@@ -170,20 +268,15 @@ class ConfigFileParser:
                     self.log.critical(f"Cannot read YAML from {self.path}")
                     self.log.critical(str(err.problem) + str(err.problem_mark))
                     sys.exit(1)
-        else:
-            raw_config_file = self._create_default_config_file()
 
-        try:
-            self._ensure_config_file_is_valid(raw_config_file)
-        except SyntaxError:
-            sys.exit(1)
+            self._validate_or_exit(raw_config_file)
+            self.cache.store(self.path, raw_config_file)
 
         for config_block in expected_config_blocks:
             self.__setattr__(config_block, raw_config_file.get(config_block))
 
-            self.log.debug(
-                f"Loaded {config_block}: {self.__getattribute__(config_block)}",
-            )
+            # Lazily formatted : large configs are costly to render for nothing
+            self.log.debug("Loaded %s: %s", config_block, raw_config_file.get(config_block))
 
         return raw_config_file
 
@@ -231,6 +324,36 @@ class ConfigFileParser:
 
         return context
 
+    def resolve_context_names(self, pattern: str | None = None) -> list[str | None]:
+        """Return the names of the contexts targeted by `--context`.
+
+        It can be a single name, a comma-separated list of names or globs (like
+        `prod-*,staging`), or `all`. Without it, the default context is used.
+        """
+        if not pattern:
+            return [None]
+
+        names: list[str] = []
+        for part in pattern.split(","):
+            part = part.strip()
+
+            if part == "all":
+                names.extend(self.contexts)
+            elif any(char in part for char in "*?["):
+                names.extend(fnmatch.filter(self.contexts, part))
+            elif part:
+                # Unknown names are reported by `create_context`
+                names.append(part)
+
+        # Remove duplicates, keeping the order
+        names = list(dict.fromkeys(names))
+
+        if not names:
+            self.log.fatal(f"No context matches '{pattern}'. Here are the contexts I know : {', '.join(self.contexts)}")
+            sys.exit(1)
+
+        return names
+
     def create_context(self, context_name: str = None) -> Context:
         if context_name:
             self.log.debug(f"Using provided context : {context_name}")
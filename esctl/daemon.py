@@ -0,0 +1,232 @@
+"""Long-running esctl process serving commands forwarded by `esctl.launcher`.
+
+The daemon keeps, for every (config file, context) pair it has seen, the parsed
+configuration, the resolved context, the Elasticsearch client and its connection
+pool, and the running pre-commands. Commands are executed one at a time.
+"""
+
+import contextlib
+import io
+import logging
+import os
+import socket
+import sys
+import time
+import traceback
+from typing import Any
+
+from esctl.config import ConfigFileParser, Context
+from esctl.elasticsearch import Client
+from esctl.launcher import receive_message, send_message, socket_path
+from esctl.main import Esctl
+
+
+class RunInProcessError(Exception):
+    """Raised when a command cannot be served by the daemon and must run in the caller's process."""
+
+
+class Session:
+    """Everything kept warm for a given config file and context."""
+
+    def __init__(
+        self,
+        config_file_parser: ConfigFileParser,
+        config: dict[str, Any],
+        contexts: list[Context],
+        clients: list[Client],
+    ):
+        self.config_file_parser = config_file_parser
+        self.config = config
+        self.contexts = contexts
+        self.clients = clients
+        self.mtime = self._config_file_mtime()
+        self.pre_commands_started = False
+
+    def _config_file_mtime(self) -> int | None:
+        try:
+            return os.stat(self.config_file_parser.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def is_stale(self) -> bool:
+        """Whether the config file changed since the session was created."""
+        return self._config_file_mtime() != self.mtime
+
+    def pre_commands_alive(self) -> bool:
+        return all(
+            pre_command.get("process") is not None and pre_command.get("process").poll() is None
+            for context in self.contexts
+            for pre_command in context.pre_commands
+            if not pre_command.get("wait_for_exit")
+        )
+
+    def close(self):
+        for context in self.contexts:
+            for pre_command in context.pre_commands:
+                if pre_command.get("process") is not None:
+                    pre_command.get("process").terminate()
+
+        self.pre_commands_started = False
+
+
+class DaemonEsctl(Esctl):
+    """Esctl application reusing the daemon's warm sessions instead of starting from scratch."""
+
+    NAME = "esctl"
+
+    def __init__(self, daemon: "Daemon", stdin, stdout, stderr):
+        super().__init__(stdin=stdin, stdout=stdout, stderr=stderr)
+        self.daemon = daemon
+        self.session: Session | None = None
+
+    def initialize_app(self, argv):
+        key = (os.path.expanduser(self.options.config_file), self.options.context)
+        session = self.daemon.sessions.get(key)
+
+        if session is not None and session.is_stale():
+            self.log.debug(f"{key[0]} changed, reloading it")
+            session.close()
+            session = None
+
+        if session is None:
+            Esctl._config_file_parser = ConfigFileParser()
+            super().initialize_app(argv)
+            session = Session(Esctl._config_file_parser, Esctl._config, self.contexts, self.clients)
+            self.daemon.sessions[key] = session
+        else:
+            Esctl._config_file_parser = session.config_file_parser
+            Esctl._config = session.config
+            self.contexts, self.clients = session.contexts, session.clients
+            self.context, self.client = self.contexts[0], self.clients[0]
+            self.configure_response_caches()
+
+        self.session = session
+
+    def prepare_to_run_command(self, cmd):
+        if cmd.__class__.__name__ in self.LOCAL_COMMANDS:
+            return
+
+        if not self.session.pre_commands_started or not self.session.pre_commands_alive():
+            self.session.close()
+            super().prepare_to_run_command(cmd)
+            self.session.pre_commands_started = True
+
+    def clean_up(self, cmd, result, err):
+        # Pre-commands are left running until the session is closed
+        if err:
+            self.log.debug("got an error: %s", err)
+
+    def interact(self):
+        raise RunInProcessError("Interactive mode requires a terminal")
+
+
+class Daemon:
+    log = logging.getLogger(__name__)
+
+    def __init__(self, path: str | None = None):
+        self.path = path or socket_path()
+        self.sessions: dict[tuple[str, str | None], Session] = {}
+        self.started_at = time.time()
+        self.requests_served = 0
+        self.running = False
+
+    def serve_forever(self):
+        os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            # Only the current user may talk to the daemon
+            umask = os.umask(0o177)
+            try:
+                server.bind(self.path)
+            finally:
+                os.umask(umask)
+
+            server.listen()
+            self.running = True
+            self.log.info(f"Listening on {self.path} (pid {os.getpid()})")
+
+            try:
+                while self.running:
+                    connection, _ = server.accept()
+                    with connection:
+                        self.handle(connection)
+            finally:
+                for session in self.sessions.values():
+                    session.close()
+
+                if os.path.exists(self.path):
+                    os.unlink(self.path)
+
+    def handle(self, connection: socket.socket):
+        message = receive_message(connection)
+
+        if message is None:
+            return
+
+        action = message.get("action")
+
+        if action == "run":
+            response = self.run(message.get("argv", []), message.get("cwd"))
+        elif action == "status":
+            response = self.status()
+        elif action == "stop":
+            self.running = False
+            response = {"stopped": True}
+        else:
+            response = {"stderr": f"Unknown action {action}\n", "returncode": 1}
+
+        send_message(connection, response)
+
+    def run(self, argv: list[str], cwd: str | None = None) -> dict[str, Any]:
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        root_logger = logging.getLogger("")
+        handlers, level = list(root_logger.handlers), root_logger.level
+        previous_cwd = os.getcwd()
+
+        try:
+            if cwd is not None:
+                os.chdir(cwd)
+
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                returncode = DaemonEsctl(self, io.StringIO(), stdout, stderr).run(argv)
+
+        except RunInProcessError:
+            return {"run_in_process": True}
+        except SystemExit as exit:
+            returncode = exit.code if isinstance(exit.code, int) else int(exit.code is not None)
+        except Exception:  # noqa: BLE001
+            # Whatever a command raises (like transport errors re-raised by `--debug`), it only fails for its
+            # client : the daemon keeps serving the others
+            stderr.write(traceback.format_exc())
+            returncode = 1
+        finally:
+            os.chdir(previous_cwd)
+            root_logger.handlers = handlers
+            root_logger.setLevel(level)
+
+        self.requests_served += 1
+
+        return {"stdout": stdout.getvalue(), "stderr": stderr.getvalue(), "returncode": returncode}
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "socket": self.path,
+            "uptime": round(time.time() - self.started_at),
+            "requests": self.requests_served,
+            "sessions": [f"{context or 'default'} ({config_file})" for config_file, context in self.sessions],
+        }
+
+
+if __name__ == "__main__":
+    handler = logging.StreamHandler()
+    handler.setLevel(logging.INFO)
+    handler.setFormatter(logging.Formatter(Esctl.LOG_FILE_MESSAGE_FORMAT))
+    logging.getLogger("").addHandler(handler)
+    logging.getLogger("").setLevel(logging.INFO)
+
+    Daemon(sys.argv[1] if len(sys.argv) > 1 else None).serve_forever()
@@ -1,50 +1,106 @@
-import random
 import ssl
-
-from elasticsearch import Elasticsearch
+import threading
+from typing import TYPE_CHECKING
 
 from esctl.config import Context
+from esctl.response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    from elasticsearch import Elasticsearch
 
 
 class Client:
-    def __new__(
+    """Lazily built Elasticsearch client.
+
+    The underlying `Elasticsearch` object (and the whole HTTP stack) is only
+    imported and created the first time `es` is accessed, so commands which
+    never send a request don't pay for it.
+
+    When `response_cache` is given, responses of read-only endpoints which rarely
+    change (like `_cat/nodes`) are reused until they expire.
+    """
+
+    def __init__(
         self,
-        context: Context | None | None = None,
-        http_auth: tuple[str] | None | None = None,
+        context: Context | None = None,
+        http_auth: tuple[str, str] | None = None,
+        response_cache: ResponseCache | None = None,
     ):
-        if not hasattr(self, "instance"):
-            self.instance = super().__new__(self)
-            self.es: Elasticsearch.Elasticsearch = Client.initialize_elasticsearch_connection(self, context, http_auth)
+        self.context = context
+        self.http_auth = http_auth
+        self.response_cache = response_cache
+        self._es: Elasticsearch | None = None
+        # Commands send independent requests from several threads, which must share a single client
+        self._lock = threading.Lock()
 
-        return self.instance
+    @property
+    def es(self) -> "Elasticsearch":
+        if self._es is None:
+            with self._lock:
+                if self._es is None:
+                    self._es = self.initialize_elasticsearch_connection()
+
+        return self._es
+
+    def initialize_elasticsearch_connection(self) -> "Elasticsearch":
+        import urllib3
+        from elasticsearch import Elasticsearch
+
+        from esctl.transport import NODE_SELECTORS, CachingTransport, LatencyTrackingNode
+
+        # Disable urllib's warnings
+        # See https://urllib3.readthedocs.io/en/latest/advanced-usage.html#ssl-warnings
+        urllib3.disable_warnings()
 
-    @staticmethod
-    def initialize_elasticsearch_connection(
-        client,
-        context: Context | None | None = None,
-        http_auth: tuple[str] | None | None = None,
-    ):
         elasticsearch_client_kwargs = {
-            "http_auth": http_auth,
+            "http_auth": self.http_auth,
         }
 
-        if context is not None:
-            if context.settings.get("no_check_certificate"):
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-                elasticsearch_client_kwargs["ssl_context"] = ssl_context
-                elasticsearch_client_kwargs["verify_certs"] = False
-
-            if "max_retries" in context.settings:
-                elasticsearch_client_kwargs["max_retries"] = context.settings.get(
-                    "max_retries",
-                )
-
-            if "timeout" in context.settings:
-                elasticsearch_client_kwargs["timeout"] = context.settings.get("timeout")
-
-            return Elasticsearch(
-                random.choice(context.cluster["servers"]),
-                **elasticsearch_client_kwargs,
+        if self.context is None:
+            raise RuntimeError("Cannot connect to Elasticsearch before a context has been loaded")
+
+        if self.context.settings.get("no_check_certificate"):
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+            elasticsearch_client_kwargs["ssl_context"] = ssl_context
+            elasticsearch_client_kwargs["verify_certs"] = False
+
+        if "max_retries" in self.context.settings:
+            elasticsearch_client_kwargs["max_retries"] = self.context.settings.get(
+                "max_retries",
             )
+
+        if "timeout" in self.context.settings:
+            elasticsearch_client_kwargs["timeout"] = self.context.settings.get("timeout")
+
+        # Every configured server is handed to the transport, which spreads requests
+        # across them and puts failing ones aside until their backoff expires
+        node_selector = self.context.settings.get("node_selector", "round_robin")
+        elasticsearch_client_kwargs["node_selector_class"] = NODE_SELECTORS[node_selector]
+
+        if node_selector == "least_latency":
+            elasticsearch_client_kwargs["node_class"] = LatencyTrackingNode
+
+        for setting in [
+            "connections_per_node",
+            "dead_node_backoff_factor",
+            "max_dead_node_backoff",
+            "retry_on_timeout",
+            "sniff_on_start",
+        ]:
+            if setting in self.context.settings:
+                elasticsearch_client_kwargs[setting] = self.context.settings.get(setting)
+
+        if self.response_cache is not None:
+            elasticsearch_client_kwargs["transport_class"] = CachingTransport
+
+        es = Elasticsearch(
+            self.context.cluster["servers"],
+            **elasticsearch_client_kwargs,
+        )
+
+        if self.response_cache is not None:
+            es.transport.response_cache = self.response_cache
+
+        return es
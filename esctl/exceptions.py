@@ -1,2 +1,10 @@
 class SettingNotFoundError(Exception):
     pass
+
+
+class DaemonNotRunningError(Exception):
+    pass
+
+
+class NotRecordedError(Exception):
+    pass
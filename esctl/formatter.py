@@ -1,3 +1,19 @@
+import functools
+import json
+
+from cliff.columns import FormattableColumn
+from cliff.formatters.base import ListFormatter
+from cliff.formatters.json_format import JSONFormatter
+
+# Maximum number of column names kept by `TableKey`. `node stats` and `cluster stats`
+# alone produce a few thousand distinct keys per node. Both caches are bounded so that
+# long-running processes (interactive mode, daemon) don't grow indefinitely.
+NAMES_CACHE_SIZE = 65536
+WORDS_CACHE_SIZE = 4096
+
+SPECIAL_WORDS = {"percent": "%", "gc": "GC", "id": "ID", "uuid": "UUID"}
+
+
 class TableKey:
     def __init__(self, id, name=None, pretty_key=True):
         self.id = id
@@ -6,81 +22,60 @@ class TableKey:
         else:
             self.name = name
 
-    def _format_special_word(self, word: str) -> str:
-        if word.lower() in ["percent", "gc", "id", "uuid"]:
-            if word == "percent":
-                word = "%"
+    @staticmethod
+    def _format_special_word(word: str) -> str:
+        return SPECIAL_WORDS.get(word, word)
 
-            elif word == "gc":
-                word = "GC"
+    @staticmethod
+    def _split_string(string: str) -> list[str]:
+        """Split a column ID into words, on dots and on underscores.
 
-            elif word == "id":
-                word = "ID"
-
-            elif word == "uuid":
-                word = "UUID"
-
-        return word
-
-    def _split_string(self, string: str) -> list[str]:
-        splitted_string: list[str]
-
-        if "." in string:
-            splitted_string = string.split(".")
+        Words starting with an underscore (like `_source`) are not split on underscores
+        when the ID contains dots.
+        """
+        if "." not in string:
+            return string.split("_")
 
-            # Check if words can also be splitted on underscores
-            for idx in range(len(splitted_string)):
-                # If there is an underscore anywhere in the word except at the beginning
-                if "_" in splitted_string[idx] and not splitted_string[idx].startswith(
-                    "_",
-                ):
-                    splitted_string[idx] = splitted_string[idx].split("_")
+        words = []
+        for word in string.split("."):
+            if "_" in word and not word.startswith("_"):
+                words.extend(word.split("_"))
+            else:
+                words.append(word)
 
-            flat_list = []
-            for sublist in splitted_string:
-                if sublist.__class__.__name__ == "list":
-                    for item in sublist:
-                        flat_list.append(item)
-                else:
-                    flat_list.append(sublist)
+        return words
 
-            splitted_string = flat_list
+    def _create_name_from_id(self, pretty_key=True):
+        """Extrapolate the column's name based on its ID."""
+        return _name_from_id(self.id, pretty_key)
 
-        elif "_" in string:
-            splitted_string = string.split("_")
+    def __repr__(self):
+        return f"({self.id}, {self.name})"
 
-        else:
-            splitted_string = [string]
 
-        return splitted_string
+@functools.lru_cache(maxsize=NAMES_CACHE_SIZE)
+def _name_from_id(id: str, pretty_key: bool) -> str:
+    if not pretty_key:
+        return id
 
-    def _create_name_from_id(self, pretty_key=True):
-        """Extrapolate the column's name based on its ID."""
-        if not pretty_key:
-            return self.id
-
-        name = self._split_string(self.id)
-
-        for idx in range(len(name)):
-            # Format some special words like "percent" -> %
-            name[idx] = self._format_special_word(name[idx])
-
-            # Put the word to titlecase unless it contains at least an uppercase letter
-            if all(char.islower() for char in name[idx]):
-                name[idx] = name[idx].title()
-            # If the word contains an uppercase letter somewhere, maintain the case
-            # but uppercase the first letter
-            elif name[idx].startswith("_"):
-                name[idx] = name[idx][0] + name[idx][1].upper() + name[idx][2:]
-            else:
-                name[idx] = name[idx][0].upper() + name[idx][1:]
+    return " ".join([_format_word(word) for word in TableKey._split_string(id)])
 
-        name = " ".join(name)
 
-        return name
+# IDs of different nodes or indices mostly share the same words
+@functools.lru_cache(maxsize=WORDS_CACHE_SIZE)
+def _format_word(word: str) -> str:
+    # Format some special words like "percent" -> %
+    word = TableKey._format_special_word(word)
 
-    def __repr__(self):
-        return f"({self.id}, {self.name})"
+    # Put the word to titlecase unless it contains at least an uppercase letter
+    if all(char.islower() for char in word):
+        return word.title()
+    # If the word contains an uppercase letter somewhere, maintain the case
+    # but uppercase the first letter
+    elif word.startswith("_"):
+        return word[0] + word[1].upper() + word[2:]
+    else:
+        return word[0].upper() + word[1:]
 
 
 class JSONToCliffFormatter:
@@ -163,13 +158,17 @@ class JSONToCliffFormatter:
                         JSON object and an optional string defining the new
                         column name
         :paramtype columns: list
-        :return: A tuple containing two tuples : the first one contains the
-        columns' headers and the second one the lines to display
+        :param none_as: The value to display when a column is missing from a line
+        :return: A tuple containing the columns' headers and a generator
+        yielding the lines to display. Lines are only built when the generator
+        is consumed, so formatters can write them as they are produced
         :rtype: tuple
         """
         columns = self._format_columns(columns)
 
-        lst = []
+        return (tuple([c.name for c in columns]), self._iter_lines(columns, none_as))
+
+    def _iter_lines(self, columns, none_as):
         # For every line in the JSON object, pick the value corresponding to
         # the given column ID
         for raw_line in self.json:
@@ -182,9 +181,7 @@ class JSONToCliffFormatter:
 
                 line.append(element)
 
-            lst.append(tuple(line))
-
-        return (tuple([c.name for c in columns]), tuple(lst))
+            yield tuple(line)
 
     def to_show_one(self, lines=[], none_as=None):
         """For every given element, retrieve the value in the original
@@ -214,3 +211,46 @@ class JSONToCliffFormatter:
             values.append(element)
 
         return (tuple(keys), tuple(values))
+
+
+def _machine_readable(value):
+    if isinstance(value, FormattableColumn):
+        return value.machine_readable()
+
+    return value
+
+
+class StreamingJSONFormatter(JSONFormatter):
+    """Same output as cliff's JSON formatter, but every row is written as soon as it is produced
+    instead of building the whole list first."""
+
+    def emit_list(self, column_names, data, stdout, parsed_args):
+        indent = None if parsed_args.noindent else 2
+        separator = ",\n" if indent else ", "
+        opening, closing = ("[\n", "\n]") if indent else ("[", "]")
+        empty = True
+
+        for row in data:
+            item = json.dumps({n: _machine_readable(v) for n, v in zip(column_names, row)}, indent=indent)
+
+            if indent:
+                item = "\n".join(" " * indent + line for line in item.split("\n"))
+
+            stdout.write(opening if empty else separator)
+            stdout.write(item)
+            empty = False
+
+        stdout.write("[]" if empty else closing)
+        stdout.write("\n")
+
+
+class NDJSONFormatter(ListFormatter):
+    """Write one JSON object per row and per line, as soon as the row is produced."""
+
+    def add_argument_group(self, parser):
+        pass
+
+    def emit_list(self, column_names, data, stdout, parsed_args):
+        for row in data:
+            stdout.write(json.dumps({n: _machine_readable(v) for n, v in zip(column_names, row)}))
+            stdout.write("\n")
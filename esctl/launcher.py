@@ -0,0 +1,129 @@
+"""Entry point of the `esctl` executable.
+
+When an `esctl daemon` is running, the command line is forwarded to it through
+a Unix socket and its output is printed back. Otherwise, the command runs
+in-process. Only the standard library is imported before taking that decision,
+so forwarding a command stays as cheap as possible.
+"""
+
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+from typing import Any
+
+DEFAULT_SOCKET_PATH = "~/.cache/esctl/daemon.sock"
+
+# Commands which must always run in-process, like the ones following a task until it completes
+NOT_FORWARDED_COMMANDS = ["daemon", "record", "reindex", "reindex-many", "watch"]
+
+# Options making a command run until interrupted : the daemon would only show its output once done, and block
+# every other command meanwhile
+NOT_FORWARDED_OPTIONS = ["--rate", "--watch"]
+
+_HEADER = struct.Struct("!I")
+
+
+def socket_path() -> str:
+    return os.path.expanduser(os.environ.get("ESCTL_DAEMON_SOCKET", DEFAULT_SOCKET_PATH))
+
+
+def send_message(connection: socket.socket, message: dict[str, Any]):
+    payload = json.dumps(message).encode("utf-8")
+    connection.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def receive_message(connection: socket.socket) -> dict[str, Any] | None:
+    header = _receive_exactly(connection, _HEADER.size)
+    if header is None:
+        return None
+
+    payload = _receive_exactly(connection, _HEADER.unpack(header)[0])
+    if payload is None:
+        return None
+
+    return json.loads(payload.decode("utf-8"))
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes | None:
+    chunks = []
+
+    while size > 0:
+        chunk = connection.recv(min(size, 1 << 16))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b"".join(chunks)
+
+
+def request(message: dict[str, Any], path: str | None = None) -> dict[str, Any] | None:
+    """Send a message to the daemon and return its answer, or None if no daemon is listening."""
+    path = path or socket_path()
+
+    if not os.path.exists(path):
+        return None
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        try:
+            connection.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+
+        send_message(connection, message)
+        return receive_message(connection)
+
+
+def should_forward(argv: list[str]) -> bool:
+    # Interactive mode needs a terminal
+    if not argv:
+        return False
+
+    if os.environ.get("ESCTL_NO_DAEMON"):
+        return False
+
+    # Erring on the side of running in-process if the word appears anywhere
+    if any(arg in NOT_FORWARDED_COMMANDS for arg in argv):
+        return False
+
+    if any(arg.split("=", 1)[0] in NOT_FORWARDED_OPTIONS for arg in argv):
+        return False
+
+    # The daemon can't read our stdin : run commands fed by a pipe or a file in-process
+    try:
+        mode = os.fstat(sys.stdin.fileno()).st_mode
+    except (AttributeError, OSError, ValueError):
+        return True
+
+    return not (stat.S_ISFIFO(mode) or stat.S_ISREG(mode))
+
+
+def forward(argv: list[str]) -> int | None:
+    """Run the command through the daemon. Return its exit code, or None if it couldn't be forwarded."""
+    if not should_forward(argv):
+        return None
+
+    response = request({"action": "run", "argv": argv, "cwd": os.getcwd()})
+
+    # Like interactive mode, which needs a terminal
+    if response is None or response.get("run_in_process"):
+        return None
+
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+
+    return response.get("returncode", 1)
+
+
+def main(argv=sys.argv[1:]):
+    returncode = forward(argv)
+
+    if returncode is None:
+        from esctl.main import main as run_in_process
+
+        returncode = run_in_process(argv)
+
+    return returncode
@@ -4,37 +4,48 @@ import os
 import re
 import subprocess
 import sys
+from importlib import metadata
 
-import pkg_resources
-import urllib3
 from cliff.app import App
-from cliff.commandmanager import CommandManager
 
 from esctl import utils
-from esctl.config import ConfigFileParser
+from esctl.commandmanager import LazyCommandManager
+from esctl.config import ConfigCache, ConfigFileParser, Context
 from esctl.elasticsearch import Client
-from esctl.interactive import InteractiveApp
+from esctl.response_cache import ResponseCache
 
 # `configure_logging` and `build_option_parser` methods comes from cliff
 # and are modified
 
 
+def interactive_app_factory(*args, **kwargs):
+    # cmd2 is a slow import, only pay for it when entering interactive mode
+    from esctl.interactive import InteractiveApp
+
+    return InteractiveApp(*args, **kwargs)
+
+
 class Esctl(App):
-    _es = None
     _config = None
     _config_file_parser = ConfigFileParser()
     log = App.LOG
 
-    def __init__(self):
+    def __init__(self, stdin=None, stdout=None, stderr=None):
         os.environ["COLUMNS"] = "120"
         super().__init__(
-            description=pkg_resources.require("Esctl")[0].project_name,
-            version=pkg_resources.require("Esctl")[0].version,
-            command_manager=CommandManager("esctl"),
+            description="esctl",
+            version=metadata.version("esctl"),
+            command_manager=LazyCommandManager("esctl"),
+            stdin=stdin,
+            stdout=stdout,
+            stderr=stderr,
             deferred_help=True,
-            interactive_app_factory=InteractiveApp,
+            interactive_app_factory=interactive_app_factory,
         )
         self.interactive_mode = False
+        self.client: Client | None = None
+        self.contexts: list[Context] = []
+        self.clients: list[Client] = []
 
         self.LOCAL_COMMANDS: list[str] = [
             "ConfigClusterList",
@@ -42,6 +53,9 @@ class Esctl(App):
             "ConfigContextSet",
             "ConfigShow",
             "ConfigUserList",
+            "DaemonStart",
+            "DaemonStatus",
+            "DaemonStop",
         ]
 
     def configure_logging(self):
@@ -50,10 +64,6 @@ class Esctl(App):
         root_logger.setLevel(logging.DEBUG)
         logging.getLogger("stevedore.extension").setLevel(logging.WARNING)
 
-        # Disable urllib's warnings
-        # See https://urllib3.readthedocs.io/en/latest/advanced-usage.html#ssl-warnings
-        urllib3.disable_warnings()
-
         # Set up logging to a file
         if self.options.log_file:
             file_handler = logging.FileHandler(filename=self.options.log_file)
@@ -73,30 +83,30 @@ class Esctl(App):
 
         logging.addLevelName(
             logging.DEBUG,
-            utils.Color.colorize(logging.getLevelName(logging.DEBUG), utils.Color.END),
+            utils.Color.colorize("DEBUG", utils.Color.END),
         )
         logging.addLevelName(
             logging.INFO,
-            utils.Color.colorize(logging.getLevelName(logging.INFO), utils.Color.BLUE),
+            utils.Color.colorize("INFO", utils.Color.BLUE),
         )
         logging.addLevelName(
             logging.WARNING,
             utils.Color.colorize(
-                logging.getLevelName(logging.WARNING),
+                "WARNING",
                 utils.Color.YELLOW,
             ),
         )
         logging.addLevelName(
             logging.ERROR,
             utils.Color.colorize(
-                logging.getLevelName(logging.ERROR),
+                "ERROR",
                 utils.Color.PURPLE,
             ),
         )
         logging.addLevelName(
             logging.CRITICAL,
             utils.Color.colorize(
-                logging.getLevelName(logging.CRITICAL),
+                "CRITICAL",
                 utils.Color.RED,
             ),
         )
@@ -106,34 +116,57 @@ class Esctl(App):
         console.setFormatter(formatter)
         root_logger.addHandler(console)
 
-    def insert_password_into_context(self):
-        external_passowrd_definition = self.context.user.get("external_password")
-        del self.context.user["external_password"]
+    def insert_password_into_context(self, context: Context | None = None):
+        context = context or self.context
+        external_passowrd_definition = context.user.get("external_password")
+        del context.user["external_password"]
 
         if "command" in external_passowrd_definition and "run" in external_passowrd_definition.get("command"):
-            self.context.user["password"] = self._run_os_system_command(
+            context.user["password"] = self._run_os_system_command(
                 external_passowrd_definition.get("command").get("run"),
             )
 
-    def initialize_app(self, argv):
-        Esctl._config = Esctl._config_file_parser.load_configuration(
-            self.options.config_file,
-        )
-        self.context = Esctl._config_file_parser.create_context(self.options.context)
-
+    def create_client(self, context: Context) -> Client:
         http_auth = None
 
-        if self.context.user is not None:
-            if "external_password" in self.context.user:
-                self.insert_password_into_context()
+        if context.user is not None:
+            if "external_password" in context.user:
+                self.insert_password_into_context(context)
 
             http_auth = (
-                (self.context.user.get("username"), self.context.user.get("password"))
-                if self.context.user.get("username") and self.context.user.get("password")
+                (context.user.get("username"), context.user.get("password"))
+                if context.user.get("username") and context.user.get("password")
                 else None
             )
 
-        Client(self.context, http_auth)
+        response_cache = None
+        if context.settings.get("response_cache"):
+            response_cache = ResponseCache(context.name, os.path.join(ConfigCache().directory, "responses"))
+
+        return Client(context, http_auth, response_cache=response_cache)
+
+    def configure_response_caches(self):
+        """Apply `--no-cache` and `--refresh` to the response cache of every context."""
+        no_cache = getattr(self.options, "no_cache", False)
+        refresh = getattr(self.options, "refresh", False)
+
+        for client in self.clients:
+            if client.response_cache is not None:
+                client.response_cache.read = not (no_cache or refresh)
+                client.response_cache.write = not no_cache
+
+    def initialize_app(self, argv):
+        Esctl._config = Esctl._config_file_parser.load_configuration(
+            self.options.config_file,
+        )
+        # `--context` may target several contexts : commands listing things are then run on all of them
+        self.contexts = [
+            Esctl._config_file_parser.create_context(name)
+            for name in Esctl._config_file_parser.resolve_context_names(self.options.context)
+        ]
+        self.clients = [self.create_client(context) for context in self.contexts]
+        self.context, self.client = self.contexts[0], self.clients[0]
+        self.configure_response_caches()
 
     def _run_os_system_command(self, raw_command: str) -> str:
         self.log.debug(f"Running command : {raw_command}")
@@ -151,49 +184,70 @@ class Esctl(App):
         return process
 
     def prepare_to_run_command(self, cmd):
-        if (cmd.__class__.__name__ not in self.LOCAL_COMMANDS) and hasattr(
-            self.context,
-            "pre_commands",
-        ):
-            for i in range(len(self.context.pre_commands)):
-                command_block = self.context.pre_commands[i]
-                process = self._run_shell_subcommand(command_block.get("command"))
-
-                if command_block.get("wait_for_exit"):
-                    process.communicate()
-
-                elif command_block.get("wait_for_output"):
-                    string_to_look_for = command_block.get("wait_for_output")
-                    pattern = re.compile(string_to_look_for)
-
-                    while True:
-                        line = process.stdout.readline()
-                        if not line:
-                            break
-
-                        line = line.decode("utf-8").strip()
-
-                        match = re.search(pattern, line)
-
-                        if match is None:
-                            self.log.debug(
-                                f"Expecting command output to match `{string_to_look_for}` but got `{line}`...",
-                            )
-                        else:
-                            self.log.debug(
-                                f"Got `{string_to_look_for}` from `{command_block.get('command')}`",
-                            )
-                            break
-
-                self.context.pre_commands[i]["process"] = process
+        if cmd.__class__.__name__ in self.LOCAL_COMMANDS:
+            return
+
+        if len(self.contexts) > 1:
+            from esctl.commands import EsctlLister, EsctlShowOne
+
+            if not isinstance(cmd, (EsctlLister, EsctlShowOne)):
+                self.log.critical(
+                    f"`{cmd.cmd_name}` can only run on a single context, "
+                    f"but {', '.join(context.name for context in self.contexts)} were given",
+                )
+                sys.exit(1)
+
+        if len(self.contexts) < 2:
+            for context in self.contexts:
+                self._start_pre_commands(context)
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        # Like tunnels to each cluster, which may each take a while to open : they are waited for together
+        concurrency = max(1, getattr(self.options, "context_concurrency", None) or 8)
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(self.contexts))) as executor:
+            for future in [executor.submit(self._start_pre_commands, context) for context in self.contexts]:
+                future.result()
+
+    def _start_pre_commands(self, context: Context):
+        for i in range(len(getattr(context, "pre_commands", []))):
+            command_block = context.pre_commands[i]
+            process = self._run_shell_subcommand(command_block.get("command"))
+
+            if command_block.get("wait_for_exit"):
+                process.communicate()
+
+            elif command_block.get("wait_for_output"):
+                string_to_look_for = command_block.get("wait_for_output")
+                pattern = re.compile(string_to_look_for)
+
+                while True:
+                    line = process.stdout.readline()
+                    if not line:
+                        break
+
+                    line = line.decode("utf-8").strip()
+
+                    match = re.search(pattern, line)
+
+                    if match is None:
+                        self.log.debug(
+                            f"Expecting command output to match `{string_to_look_for}` but got `{line}`...",
+                        )
+                    else:
+                        self.log.debug(
+                            f"Got `{string_to_look_for}` from `{command_block.get('command')}`",
+                        )
+                        break
+
+            context.pre_commands[i]["process"] = process
 
     def clean_up(self, cmd, result, err):
-        if (cmd.__class__.__name__ not in self.LOCAL_COMMANDS) and hasattr(
-            self.context,
-            "pre_commands",
-        ):
-            for pre_command in self.context.pre_commands:
-                pre_command.get("process").terminate()
+        if cmd.__class__.__name__ not in self.LOCAL_COMMANDS:
+            for context in self.contexts:
+                for pre_command in getattr(context, "pre_commands", []):
+                    pre_command.get("process").terminate()
 
         if err:
             self.log.debug("got an error: %s", err)
@@ -265,9 +319,28 @@ class Esctl(App):
         parser.add_argument(
             "--context",
             action="store",
-            help="Context to use",
+            help="Context to use. Listing commands also take a comma-separated list of contexts, "
+            "globs (like `prod-*`) or `all`, and are then run on each of them",
             type=str,
         )
+        parser.add_argument(
+            "--context-concurrency",
+            action="store",
+            default=8,
+            help="Number of contexts a command is run on at the same time when several are given (default: 8)",
+            type=int,
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Neither use nor store cached responses, when the context's `response_cache` setting is enabled",
+        )
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Don't use cached responses, but store the new ones, when the context's `response_cache` setting "
+            "is enabled",
+        )
 
         return parser
 
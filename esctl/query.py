@@ -0,0 +1,263 @@
+"""Derive the smallest Elasticsearch request able to answer a JMESPath expression.
+
+The expression is statically analysed to find which parts of the response it
+reads. These parts are then turned into request parameters (`filter_path`,
+`metric`, ...) so Elasticsearch only computes and sends them. The expression
+itself still runs locally, on the trimmed response. Objects with none of the
+read keys are left out of the response by Elasticsearch, which only makes a
+difference for expressions building a value for each object regardless of
+its content.
+"""
+
+import functools
+from typing import Any
+
+import jmespath
+from jmespath.parser import ParsedResult
+
+# Maximum number of compiled JMESPath expressions kept in memory
+EXPRESSIONS_CACHE_SIZE = 256
+
+# A path into a JSON document, "*" standing for every key of an object
+Path = tuple[str, ...]
+
+# Nodes stats' top-level keys, and the metric which returns them
+NODE_STATS_METRICS = {
+    "adaptive_selection": "adaptive_selection",
+    "allocations": "allocations",
+    "breakers": "breaker",
+    "discovery": "discovery",
+    "fs": "fs",
+    "http": "http",
+    "indexing_pressure": "indexing_pressure",
+    "indices": "indices",
+    "ingest": "ingest",
+    "jvm": "jvm",
+    "os": "os",
+    "process": "process",
+    "repositories": "repositories",
+    "script": "script",
+    "script_cache": "script_cache",
+    "thread_pool": "thread_pool",
+    "transport": "transport",
+}
+
+# Nodes stats' keys which are returned whatever the requested metrics
+NODE_STATS_ATTRIBUTES = ["attributes", "host", "ip", "name", "roles", "timestamp", "transport_address"]
+
+# Keys of nodes stats' `indices` metric, and the index metric which returns them
+NODE_STATS_INDEX_METRICS = {
+    "bulk": "bulk",
+    "completion": "completion",
+    "dense_vector": "dense_vector",
+    "docs": "docs",
+    "fielddata": "fielddata",
+    "flush": "flush",
+    "get": "get",
+    "indexing": "indexing",
+    "mappings": "mappings",
+    "merges": "merge",
+    "query_cache": "query_cache",
+    "recovery": "recovery",
+    "refresh": "refresh",
+    "request_cache": "request_cache",
+    "search": "search",
+    "segments": "segments",
+    "shard_stats": "shard_stats",
+    "store": "store",
+    "translog": "translog",
+    "warmer": "warmer",
+}
+
+
+@functools.lru_cache(maxsize=EXPRESSIONS_CACHE_SIZE)
+def compile_expression(expression: str) -> ParsedResult:
+    """Parse a JMESPath expression once, however many documents it is run against."""
+    return jmespath.compile(expression)
+
+
+def read_paths(expression: str) -> set[Path]:
+    """Return the paths of every part of the document the expression reads.
+
+    The whole subtree below each path may be read. Anything the analysis doesn't
+    understand is conservatively considered as reading everything below the
+    current node.
+
+    :Example:
+            read_paths("*.{name: name, heap: jvm.mem.heap_used_percent}")
+        returns
+            {("*", "name"), ("*", "jvm", "mem", "heap_used_percent")}
+    """
+    reads, result = _analyze(compile_expression(expression).parsed, ())
+
+    if result is not None:
+        reads.add(result)
+
+    return _without_overlaps(reads)
+
+
+def _analyze(node: dict[str, Any], base: Path) -> tuple[set[Path], Path | None]:
+    """Return the paths entirely read by the AST node evaluated at `base`, and the path
+    its value comes from (None if the value is computed, like a function's result).
+
+    The node's value itself isn't accounted as read : its parent decides whether it
+    needs all of it or only some of its children.
+    """
+    kind = node["type"]
+    children = node["children"]
+
+    if kind in ["identity", "current", "index", "slice"]:
+        return set(), base
+
+    if kind == "literal":
+        return set(), None
+
+    if kind == "field":
+        return set(), base + (node["value"],)
+
+    if kind in ["subexpression", "index_expression", "pipe"]:
+        reads = set()
+        current = base
+
+        for child in children:
+            child_reads, current = _analyze(child, current)
+            reads |= child_reads
+
+            # What follows applies to a computed value, not to the document
+            if current is None:
+                break
+
+        return reads, current
+
+    if kind in ["projection", "value_projection", "filter_projection"]:
+        reads, left = _analyze(children[0], base)
+
+        if left is None:
+            return reads, None
+
+        # Arrays are transparent in paths (like in `filter_path`), objects' values aren't
+        element = left + ("*",) if kind == "value_projection" else left
+
+        if kind == "filter_projection":
+            reads |= _read_entirely(children[2], element)
+
+        right_reads, right = _analyze(children[1], element)
+
+        return reads | right_reads, right
+
+    if kind == "flatten":
+        return _analyze(children[0], base)
+
+    if kind == "function_expression" and node["value"] == "values" and len(children) == 1:
+        # Like a `*` projection, minus the projection
+        reads, argument = _analyze(children[0], base)
+
+        return reads, None if argument is None else argument + ("*",)
+
+    if kind == "function_expression" and node["value"] in ["max_by", "min_by", "sort_by"] and len(children) == 2:
+        # Return (some of) the array's elements, only the sort key of the others is read
+        reads, argument = _analyze(children[0], base)
+
+        if argument is None or children[1]["type"] != "expref":
+            return reads | _read_entirely(children[1], base), None
+
+        return reads | _read_entirely(children[1]["children"][0], argument), argument
+
+    if kind in [
+        "and_expression",
+        "comparator",
+        "function_expression",
+        "key_val_pair",
+        "multi_select_dict",
+        "multi_select_list",
+        "not_expression",
+        "or_expression",
+    ]:
+        reads = set()
+        for child in children:
+            reads |= _read_entirely(child, base)
+
+        return reads, None
+
+    if kind == "expref":
+        # Only applies to the elements of another argument, which is entirely read already
+        return set(), None
+
+    return {base}, None
+
+
+def _read_entirely(node: dict[str, Any], base: Path) -> set[Path]:
+    reads, result = _analyze(node, base)
+
+    if result is not None:
+        reads.add(result)
+
+    return reads
+
+
+def _without_overlaps(paths: set[Path]) -> set[Path]:
+    """Remove the paths already included in a shorter one."""
+    kept = set()
+
+    for path in sorted(paths, key=len):
+        if not any(path[: len(other)] == other for other in kept):
+            kept.add(path)
+
+    return kept
+
+
+def fields_to_paths(fields: list[str]) -> set[Path]:
+    """Convert dotted fields, relative to every node, like `jvm.mem.heap_used_percent`, to paths."""
+    return _without_overlaps({("*",) + tuple(field.split(".")) for field in fields})
+
+
+class NodeStatsPlan:
+    """Parameters of the smallest nodes stats request returning every given path.
+
+    Paths are relative to the `nodes` object of the response. Parameters which
+    can't be narrowed down are None.
+    """
+
+    def __init__(self, paths: set[Path]):
+        self.paths = _without_overlaps(paths)
+        self.metric = self._metric()
+        self.index_metric = self._index_metric() if self.metric is not None and "indices" in self.metric else None
+        self.filter_path = self._filter_path()
+
+    def _metric(self) -> list[str] | None:
+        metrics = set()
+
+        for path in self.paths:
+            # The whole node (or any of its keys) is needed
+            if len(path) < 2 or path[1] == "*":
+                return None
+
+            if path[1] in NODE_STATS_METRICS:
+                metrics.add(NODE_STATS_METRICS.get(path[1]))
+            elif path[1] not in NODE_STATS_ATTRIBUTES:
+                return None
+
+        return sorted(metrics) or None
+
+    def _index_metric(self) -> list[str] | None:
+        index_metrics = set()
+
+        for path in self.paths:
+            if path[1] != "indices":
+                continue
+
+            if len(path) < 3 or path[2] not in NODE_STATS_INDEX_METRICS:
+                return None
+
+            index_metrics.add(NODE_STATS_INDEX_METRICS.get(path[2]))
+
+        return sorted(index_metrics)
+
+    def _filter_path(self) -> list[str] | None:
+        if () in self.paths:
+            return None
+
+        return sorted(".".join(("nodes",) + path) for path in self.paths)
+
+    def __repr__(self):
+        return f"NodeStatsPlan(metric={self.metric}, index_metric={self.index_metric}, filter_path={self.filter_path})"
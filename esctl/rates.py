@@ -0,0 +1,230 @@
+"""Per-second rates of the counters of successive nodes stats samples.
+
+Counters are stored as one `array` of floats per node and per kept sample,
+whose positions come from a single table of metric names shared by every node.
+Only the first sample, the previous one and the highest rates seen so far are
+kept, so memory doesn't grow with the number of samples.
+"""
+
+import fnmatch
+import math
+import re
+import sys
+import time
+from array import array
+from collections.abc import Container
+from typing import Any
+
+from esctl.utils import flatten_dict
+
+# Flattened keys of nodes stats holding ever-increasing counters. Many gauges end like counters, as
+# indices.docs.count, jvm.threads.count or indices.segments.memory_size_in_bytes : only these keys are counters
+COUNTERS = [
+    "*_total",
+    "*.total",
+    "*.completed",
+    "*.rejected",
+    "*.tripped",
+    "*.evictions",
+    "*.collection_count",
+    "*.hit_count",
+    "*.miss_count",
+    "*_time_in_millis",
+    "*.time_in_millis",
+    "*_time_in_nanos",
+    "process.cpu.total_in_millis",
+    "http.total_opened",
+    "transport.total_outbound_connections",
+    "transport.rx_count",
+    "transport.tx_count",
+    "transport.rx_size_in_bytes",
+    "transport.tx_size_in_bytes",
+    "indices.merges.total_docs",
+    "indices.merges.total_size_in_bytes",
+    "indices.bulk.total_size_in_bytes",
+    "fs.io_stats.*_operations",
+    "fs.io_stats.*_kilobytes",
+    "ingest.*.count",
+    "ingest.*.failed",
+]
+
+COUNTER_PATTERN = re.compile("|".join(fnmatch.translate(pattern) for pattern in COUNTERS))
+
+# Counters which only measure how long ago something happened
+IGNORED_COUNTERS = ["jvm.uptime_in_millis", "timestamp"]
+
+# Counter of the time spent by a collector, whose rate is the share of the time the JVM was paused
+GC_TIME_PATTERN = re.compile(r"^jvm\.gc\.collectors\.([^.]+)\.collection_time_in_millis$")
+
+TIME_SUFFIX = "time_in_millis"
+
+UNKNOWN = object()
+
+
+def is_counter(key: str) -> bool:
+    return key not in IGNORED_COUNTERS and COUNTER_PATTERN.match(key) is not None
+
+
+def operations_counter(time_key: str, keys: Container[str]) -> str | None:
+    """Return the key counting the operations whose time is counted by `time_key`, if any.
+
+    :Example:
+            indices.search.query_time_in_millis -> indices.search.query_total
+            indices.merges.total_time_in_millis -> indices.merges.total
+            jvm.gc.collectors.old.collection_time_in_millis -> jvm.gc.collectors.old.collection_count
+    """
+    prefix = time_key.removesuffix(TIME_SUFFIX)
+
+    for candidate in (f"{prefix}total", f"{prefix}count", prefix.rstrip("_.")):
+        if candidate != time_key and candidate in keys:
+            return candidate
+
+    return None
+
+
+class MetricTable:
+    """Position of every metric name in the sample arrays. Names are interned, as every node shares them."""
+
+    def __init__(self):
+        self.names: list[str] = []
+        self.positions: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def position(self, name: str) -> int:
+        if name not in self.positions:
+            self.positions[name] = len(self.names)
+            self.names.append(sys.intern(name))
+
+        return self.positions[name]
+
+
+class NodeSamples:
+    __slots__ = ("first", "first_timestamp", "last", "name", "peaks", "samples", "timestamp")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.first_timestamp = 0.0
+        self.first: array | None = None
+        self.timestamp = 0.0
+        self.last: array | None = None
+        self.peaks: array = array("d")
+        self.samples = 0
+
+
+def _pad(values: array, length: int):
+    # Metrics which appeared after a sample was taken are missing from it
+    if len(values) < length:
+        values.extend([math.nan] * (length - len(values)))
+
+
+class CounterRates:
+    """Turn successive nodes stats responses into per-second rates, latencies per operation and GC pause shares."""
+
+    def __init__(self):
+        self.metrics = MetricTable()
+        self.nodes: dict[str, NodeSamples] = {}
+        # Position of every flattened key seen, None for those which aren't counters
+        self.positions: dict[str, int | None] = {}
+
+    def add(self, nodes_stats: dict[str, dict[str, Any]], now: float | None = None):
+        """Account a sample : the `nodes` object of a nodes stats response."""
+        now = time.time() if now is None else now
+
+        for node_id, stats in nodes_stats.items():
+            node = self.nodes.setdefault(node_id, NodeSamples(stats.get("name", node_id)))
+            # Each node tells when it collected its stats, which is more accurate than when the response arrived
+            timestamp = stats["timestamp"] / 1000 if "timestamp" in stats else now
+
+            values = array("d", [math.nan]) * len(self.metrics)
+            for key, value in flatten_dict(stats).items():
+                position = self.positions.get(key, UNKNOWN)
+
+                if position is UNKNOWN:
+                    position = self.positions[key] = self.metrics.position(key) if is_counter(key) else None
+
+                if position is None or type(value) not in (int, float):
+                    continue
+
+                if position >= len(values):
+                    values.extend([math.nan] * (position + 1 - len(values)))
+
+                values[position] = value
+
+            if node.last is not None and timestamp > node.timestamp:
+                self._update_peaks(node, values, timestamp)
+
+            if node.first is None:
+                node.first_timestamp, node.first = timestamp, values
+
+            node.timestamp, node.last = timestamp, values
+            node.samples += 1
+
+    def _update_peaks(self, node: NodeSamples, values: array, timestamp: float):
+        elapsed = timestamp - node.timestamp
+        _pad(node.peaks, len(values))
+        _pad(node.last, len(values))
+
+        for position, (value, previous, peak) in enumerate(zip(values, node.last, node.peaks)):
+            rate = (value - previous) / elapsed
+
+            # NaN comparisons are false : a missing counter doesn't set any peak
+            if rate >= 0 and not rate <= peak:
+                node.peaks[position] = rate
+
+    def rates(self, with_peaks: bool = False) -> dict[str, dict[str, float]]:
+        """Return, by node name, the rate of every counter between the first and the last samples.
+
+        Counters which went down (because the node restarted) are left out.
+
+        :param with_peaks: Also return the highest rate between two successive samples
+        """
+        result = {}
+
+        for node in self.nodes.values():
+            elapsed = node.timestamp - node.first_timestamp
+
+            if node.samples < 2 or elapsed <= 0:
+                continue
+
+            for values in (node.first, node.last, node.peaks):
+                _pad(values, len(self.metrics))
+
+            deltas, rates = {}, {}
+            for name, first, last, peak in zip(self.metrics.names, node.first, node.last, node.peaks):
+                delta = last - first
+
+                if delta >= 0:
+                    deltas[name] = delta
+                    rates[f"{name}/s"] = round(delta / elapsed, 3)
+
+                    if with_peaks and not math.isnan(peak):
+                        rates[f"{name}/s max"] = round(peak, 3)
+
+            rates.update(self._derived(deltas, elapsed))
+            result[node.name] = dict(sorted(rates.items()))
+
+        return result
+
+    def _derived(self, deltas: dict[str, float], elapsed: float) -> dict[str, float]:
+        derived = {}
+        gc_pause = None
+
+        for name, delta in deltas.items():
+            if not name.endswith(TIME_SUFFIX):
+                continue
+
+            counter = operations_counter(name, deltas)
+            if counter is not None and deltas[counter] > 0:
+                derived[f"{name.removesuffix(TIME_SUFFIX)}latency_in_millis"] = round(delta / deltas[counter], 3)
+
+            collector = GC_TIME_PATTERN.match(name)
+            if collector is not None:
+                derived[f"jvm.gc.collectors.{collector.group(1)}.pause_percent"] = round(delta / elapsed / 10, 3)
+                gc_pause = (gc_pause or 0) + delta
+
+        if gc_pause is not None:
+            derived["jvm.gc.pause_percent"] = round(gc_pause / elapsed / 10, 3)
+
+        return derived
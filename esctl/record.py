@@ -0,0 +1,289 @@
+"""Record cluster and node metrics to a local SQLite file, and read them back as they were at any time.
+
+Every poll of a source is a row of the `samples` table. Its body is the
+response, marshalled (like the config cache, as it is several times faster
+than JSON) and compressed, or NULL when it is the same as the source's previous
+one : the state at a given time is the last body stored before it. Rows are
+inserted in batches, in a single transaction each.
+"""
+
+import fnmatch
+import logging
+import marshal
+import os
+import sqlite3
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+from esctl.exceptions import NotRecordedError
+from esctl.settings import is_glob
+
+# Columns of `_cat/thread_pool` which are recorded : the ones `cat thread-pool --headers` is most likely to ask for
+THREAD_POOL_HEADERS = "node_name,name,type,active,size,queue,queue_size,rejected,largest,completed"
+
+# Fields every node of a nodes stats response has, whatever the metrics asked for
+NODE_FIELDS = ["name", "timestamp", "transport_address", "host", "ip", "roles", "attributes"]
+
+# Metrics (and index metrics) of nodes stats whose section of the response isn't named like them
+METRIC_SECTIONS = {"breaker": "breakers", "merge": "merges"}
+
+# What can be recorded, and how each of them is fetched
+SOURCES: dict[str, Callable[..., Any]] = {
+    "cluster health": lambda es, metric: es.cluster.health(),
+    "nodes stats": lambda es, metric: es.nodes.stats(metric=metric),
+    "cat thread-pool": lambda es, metric: es.cat.thread_pool(format="json", h=THREAD_POOL_HEADERS),
+    "cat allocation": lambda es, metric: es.cat.allocation(format="json"),
+}
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS samples (source TEXT NOT NULL, timestamp REAL NOT NULL, body BLOB)",
+    "CREATE INDEX IF NOT EXISTS samples_by_time ON samples (source, timestamp)",
+]
+
+# Fast compression : recording every second must leave CPU time for everything else
+COMPRESSION_LEVEL = 1
+
+
+def encode(document: Any) -> bytes:
+    # API responses wrap the actual document
+    document = getattr(document, "body", document)
+
+    return zlib.compress(marshal.dumps(document), COMPRESSION_LEVEL)
+
+
+def decode(body: bytes) -> Any:
+    return marshal.loads(zlib.decompress(body))
+
+
+class MetricsStore:
+    """Samples of every recorded source, in a SQLite file."""
+
+    log = logging.getLogger(__name__)
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        self.connection = sqlite3.connect(path)
+        # Readers (like `replay`) don't block the recorder, and commits don't wait for the disk
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+        self.pending: list[tuple[str, float, bytes | None]] = []
+        self.last_bodies: dict[str, bytes] = {}
+
+    def append(self, source: str, timestamp: float, document: Any):
+        """Add a sample, only written to the file by the next `flush`."""
+        body = encode(document)
+
+        if self.last_bodies.get(source) == body:
+            self.pending.append((source, timestamp, None))
+        else:
+            self.pending.append((source, timestamp, body))
+            self.last_bodies[source] = body
+
+    def flush(self) -> int:
+        """Write the pending samples, and return how many there were."""
+        count = len(self.pending)
+
+        if count:
+            with self.connection:
+                self.connection.executemany("INSERT INTO samples VALUES (?, ?, ?)", self.pending)
+
+            self.pending = []
+
+        return count
+
+    def at(self, source: str, timestamp: float) -> tuple[float, Any] | None:
+        """Return the last sample of a source taken at or before the given time, with when it was taken."""
+        latest = self.connection.execute(
+            "SELECT MAX(timestamp) FROM samples WHERE source = ? AND timestamp <= ?",
+            (source, timestamp),
+        ).fetchone()[0]
+
+        if latest is None:
+            return None
+
+        body = self.connection.execute(
+            "SELECT body FROM samples WHERE source = ? AND timestamp <= ? AND body IS NOT NULL "
+            "ORDER BY timestamp DESC LIMIT 1",
+            (source, timestamp),
+        ).fetchone()
+
+        return latest, decode(body[0])
+
+    def summary(self) -> list[dict[str, Any]]:
+        """Return the number of samples of every source, when they were taken and the size of their bodies."""
+        return [
+            {"source": source, "samples": samples, "first": first, "last": last, "size": size or 0}
+            for source, samples, first, last, size in self.connection.execute(
+                "SELECT source, COUNT(*), MIN(timestamp), MAX(timestamp), SUM(LENGTH(body)) "
+                "FROM samples GROUP BY source ORDER BY source",
+            )
+        ]
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
+def filter_document(document: dict[str, Any], paths: list[str]) -> dict[str, Any]:
+    """Keep the parts of a document matching dotted paths, like the `filter_path` parameter of Elasticsearch."""
+    result: dict[str, Any] = {}
+
+    for path in paths:
+        _copy(document, path.split("."), result)
+
+    return result
+
+
+def _copy(source: Any, keys: list[str], target: dict[str, Any]):
+    if not isinstance(source, dict):
+        return
+
+    key, rest = keys[0], keys[1:]
+    names = fnmatch.filter(source, key) if is_glob(key) else [key] if key in source else []
+
+    for name in names:
+        if not rest:
+            target[name] = source[name]
+        elif isinstance(source[name], dict):
+            _copy(source[name], rest, target.setdefault(name, {}))
+
+
+def _sections(metric: str | list[str] | None) -> set[str] | None:
+    """Sections of nodes stats the metrics are in, or None for all of them."""
+    if metric is None:
+        return None
+
+    metrics = metric.split(",") if isinstance(metric, str) else metric
+
+    if "_all" in metrics:
+        return None
+
+    return {METRIC_SECTIONS.get(name, name) for name in metrics}
+
+
+def _select(lines: list[dict[str, Any]], h: str | None) -> list[dict[str, Any]]:
+    if h is None:
+        return lines
+
+    columns = h.split(",")
+
+    return [{column: line.get(column) for column in columns} for line in lines]
+
+
+def _node_sections(node: dict[str, Any], sections: set[str] | None, index_sections: set[str] | None) -> dict[str, Any]:
+    """Keep the parts of a node's stats which Elasticsearch would have sent for these metrics."""
+    node = {
+        section: value for section, value in node.items() if sections is None or section in (*NODE_FIELDS, *sections)
+    }
+
+    if index_sections is not None and "indices" in node:
+        node["indices"] = {section: value for section, value in node["indices"].items() if section in index_sections}
+
+    return node
+
+
+class _Namespace:
+    """Part of the recorded client (like `cat`), whose APIs which weren't recorded raise a clear error."""
+
+    def __init__(self, name: str, **apis: Callable[..., Any]):
+        self._name = name
+        self.__dict__.update(apis)
+
+    def __getattr__(self, api: str):
+        raise NotRecordedError(f"{self._name}.{api} isn't recorded, only {', '.join(SOURCES)} are")
+
+
+class RecordedElasticsearch:
+    """Stand-in for the Elasticsearch client, answering the recorded APIs as they were at a given time.
+
+    `sample_times` tells, for every source read, when the sample used was taken.
+    """
+
+    def __init__(self, store: MetricsStore, timestamp: float):
+        self.store = store
+        self.timestamp = timestamp
+        self.sample_times: dict[str, float] = {}
+
+        self.cluster = _Namespace("cluster", health=self._cluster_health)
+        self.nodes = _Namespace("nodes", stats=self._nodes_stats)
+        self.cat = _Namespace("cat", thread_pool=self._cat_thread_pool, allocation=self._cat_allocation)
+
+    def __getattr__(self, api: str):
+        raise NotRecordedError(f"{api} isn't recorded, only {', '.join(SOURCES)} are")
+
+    def _sample(self, source: str) -> Any:
+        sample = self.store.at(source, self.timestamp)
+
+        if sample is None:
+            raise NotRecordedError(f"No {source} was recorded at that time")
+
+        self.sample_times[source], document = sample
+
+        return document
+
+    def _cluster_health(self, **kwargs):
+        return self._sample("cluster health")
+
+    def _nodes_stats(self, node_id=None, metric=None, index_metric=None, filter_path=None, **kwargs):
+        stats = self._sample("nodes stats")
+        sections, index_sections = _sections(metric), _sections(index_metric)
+
+        if sections is not None or index_sections is not None:
+            stats["nodes"] = {
+                id: _node_sections(node, sections, index_sections) for id, node in stats.get("nodes", {}).items()
+            }
+
+        if node_id is not None:
+            patterns = node_id.split(",")
+            stats["nodes"] = {
+                id: node
+                for id, node in stats.get("nodes", {}).items()
+                if any(
+                    fnmatch.fnmatch(id, pattern) or fnmatch.fnmatch(node.get("name", ""), pattern)
+                    for pattern in patterns
+                )
+            }
+
+        if filter_path is not None:
+            stats = filter_document(stats, [filter_path] if isinstance(filter_path, str) else filter_path)
+
+        return stats
+
+    def _cat_thread_pool(self, h=None, thread_pool_patterns=None, **kwargs):
+        if h is not None:
+            missing = [column for column in h.split(",") if column not in THREAD_POOL_HEADERS.split(",")]
+
+            if missing:
+                raise NotRecordedError(f"{', '.join(missing)} isn't recorded, only {THREAD_POOL_HEADERS} are")
+
+        thread_pools = self._sample("cat thread-pool")
+
+        if thread_pool_patterns is not None:
+            patterns = thread_pool_patterns.split(",")
+            thread_pools = [
+                thread_pool
+                for thread_pool in thread_pools
+                if any(fnmatch.fnmatch(thread_pool.get("name", ""), pattern) for pattern in patterns)
+            ]
+
+        return _select(thread_pools, h)
+
+    def _cat_allocation(self, h=None, **kwargs):
+        return _select(self._sample("cat allocation"), h)
+
+
+class RecordedClient:
+    """Takes the place of the app's `Client` while a command is replayed."""
+
+    response_cache = None
+
+    def __init__(self, context, es: RecordedElasticsearch):
+        self.context = context
+        self.es = es
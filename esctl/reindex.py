@@ -0,0 +1,152 @@
+"""Reindex many indices, with their progress saved to a state file so an interrupted run can resume."""
+
+import json
+import logging
+import os
+import re
+from typing import Any
+
+# States of every source index in a multi-index reindex
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def reindex_body(
+    source: str,
+    destination: str,
+    version_type: str | None = None,
+    op_type: str | None = None,
+    conflicts: str | None = None,
+) -> dict[str, Any]:
+    return {
+        "source": {
+            "index": source,
+        },
+        "dest": {
+            "index": destination,
+            "version_type": version_type,
+            "op_type": op_type,
+        },
+        "conflicts": conflicts,
+    }
+
+
+def check_destination_template(pattern: str, template: str):
+    """Raise ValueError if the indices matching `pattern` can't be named after `template`."""
+    if "," in pattern:
+        raise ValueError(f"{pattern} holds several patterns : reindex the indices of each one separately")
+
+    if template.count("*") > pattern.count("*"):
+        raise ValueError(f"{template} has more wildcards than {pattern}")
+
+    if "*" in pattern and "*" not in template and "{index}" not in template:
+        raise ValueError(f"Every index matching {pattern} would be reindexed into {template}")
+
+
+def destination_name(pattern: str, template: str, index: str) -> str:
+    """Build the name of the index to reindex `index` into.
+
+    Every `*` of the template is replaced by what the same `*` of the source
+    pattern matched, in order, and `{index}` by the name of the source index.
+
+    :Example:
+            destination_name("logs-2024.*", "logs-v2-2024.*", "logs-2024.01.31")
+        returns
+            "logs-v2-2024.01.31"
+    """
+    match = re.fullmatch("(.*?)".join(re.escape(part) for part in pattern.split("*")), index)
+
+    if match is None:
+        raise ValueError(f"{index} doesn't match {pattern}")
+
+    parts = template.replace("{index}", index).split("*")
+
+    if len(parts) - 1 > len(match.groups()):
+        raise ValueError(f"{template} has more wildcards than {pattern}")
+
+    return parts[0] + "".join(group + part for group, part in zip(match.groups(), parts[1:]))
+
+
+class ReindexState:
+    """Source indices of a multi-index reindex, with their destination, state and task.
+
+    The state is written to a JSON file (atomically) after every change, and
+    read back by the next run with the same file.
+    """
+
+    log = logging.getLogger(__name__)
+
+    def __init__(self, path: str, indices: dict[str, dict[str, Any]] | None = None):
+        self.path = path
+        self.indices: dict[str, dict[str, Any]] = indices or {}
+
+    @classmethod
+    def load(cls, path: str) -> "ReindexState":
+        try:
+            with open(path) as state_file:
+                return cls(path, json.load(state_file).get("indices"))
+        except FileNotFoundError:
+            return cls(path)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        with open(f"{self.path}.tmp", "w") as writer:
+            json.dump({"indices": self.indices}, writer, indent=2)
+
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def add(self, source: str, destination: str):
+        """Add a source index, unless it is already known from a previous run."""
+        self.indices.setdefault(source, {"destination": destination, "state": PENDING, "task": None})
+
+    def update(self, source: str, **changes):
+        self.indices[source].update(changes)
+        self.save()
+
+    def with_state(self, state: str) -> list[str]:
+        return [source for source, index in self.indices.items() if index.get("state") == state]
+
+    def resume(self):
+        """Give failed indices another chance."""
+        for source in self.with_state(FAILED):
+            self.indices[source].update(state=PENDING, task=None, error=None)
+
+
+class PressureGauge:
+    """Tell whether the cluster is too busy to start another reindex.
+
+    It is when any thread pool of the watched ones has a queue above the given
+    size or rejected tasks since the previous check, or when the master has too
+    many pending cluster state updates.
+    """
+
+    def __init__(self, max_queue: int, max_pending_tasks: int):
+        self.max_queue = max_queue
+        self.max_pending_tasks = max_pending_tasks
+        self.rejected: dict[tuple[str, str], int] = {}
+
+    def check(self, thread_pools: list[dict[str, Any]], pending_tasks: int) -> str | None:
+        """Return why the cluster is under pressure, or None if it isn't."""
+        reasons = []
+
+        if pending_tasks > self.max_pending_tasks:
+            reasons.append(f"{pending_tasks} pending cluster tasks")
+
+        for thread_pool in thread_pools:
+            key = (thread_pool.get("node_name"), thread_pool.get("name"))
+            queue = int(thread_pool.get("queue") or 0)
+            rejected = int(thread_pool.get("rejected") or 0)
+
+            if queue > self.max_queue:
+                reasons.append(f"{key[1]} queue at {queue} on {key[0]}")
+
+            # Rejections are counted since the node started : only new ones matter
+            if key in self.rejected and rejected > self.rejected[key]:
+                reasons.append(f"{rejected - self.rejected[key]} {key[1]} rejections on {key[0]}")
+
+            self.rejected[key] = rejected
+
+        return ", ".join(reasons) or None
@@ -0,0 +1,209 @@
+"""Cache of the responses of read-only endpoints whose content rarely changes, like `_cat/nodes`.
+
+Responses are kept in memory, in a bounded LRU, and on disk (a marshal file per
+response, under esctl's cache directory) so that successive esctl runs share
+them. Each endpoint has its own time to live. Any request which may change the
+cluster (anything but GET and HEAD) drops every cached response of its context.
+A response kept in memory is only used while its file is still on disk, as
+another process may have dropped it since.
+"""
+
+import hashlib
+import logging
+import marshal
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+# Cached endpoints, and for how many seconds their responses are kept
+CACHED_ENDPOINTS: list[tuple[re.Pattern, float]] = [
+    (re.compile(r"^/$"), 60),
+    (re.compile(r"^/_cat/nodes$"), 30),
+    (re.compile(r"^/_cat/indices(/[^/]+)?$"), 10),
+    (re.compile(r"^/_cat/(aliases|plugins|repositories|templates)(/[^/]+)?$"), 60),
+]
+
+READ_METHODS = ["GET", "HEAD"]
+
+
+def time_to_live(method: str, target: str) -> float | None:
+    """Return how long the response of a request can be kept, or None if it mustn't be cached."""
+    if method not in READ_METHODS:
+        return None
+
+    path = target.split("?", 1)[0]
+
+    for pattern, ttl in CACHED_ENDPOINTS:
+        if pattern.match(path):
+            return ttl
+
+    return None
+
+
+class ResponseCache:
+    """Responses of a context, as `(status, headers, body)`, by method and target (the route and its parameters).
+
+    :param context_name: Name of the context, the responses of each context being kept apart
+    :param directory: Where responses are written. Only kept in memory when None
+    :param max_entries: Number of responses kept in memory, the least recently used being dropped first
+    :param max_disk_entries: Same, for the responses written to disk
+    """
+
+    log = logging.getLogger(__name__)
+
+    def __init__(
+        self,
+        context_name: str,
+        directory: str | None = None,
+        max_entries: int = 256,
+        max_disk_entries: int = 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.context_name = context_name
+        self.directory = (
+            os.path.join(directory, hashlib.sha1(context_name.encode()).hexdigest()[:16]) if directory else None
+        )
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.clock = clock
+        # Responses are stored marshalled : commands modify the documents they get. Each one comes with the
+        # identity of its file, if written to disk
+        self.entries: OrderedDict[str, tuple[float, bytes, tuple[int, int] | None]] = OrderedDict()
+        # Independent requests of a command are sent from several threads
+        self.lock = threading.Lock()
+        # Whether cached responses are used (`--refresh`), and whether new ones are stored (`--no-cache`)
+        self.read = True
+        self.write = True
+
+    @staticmethod
+    def _key(method: str, target: str) -> str:
+        return hashlib.sha1(f"{method} {target}".encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.marshal")
+
+    def get(self, method: str, target: str) -> tuple[int, dict[str, str], Any] | None:
+        if not self.read or time_to_live(method, target) is None:
+            return None
+
+        key = self._key(method, target)
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+        # Another process (like the daemon's clients) may have dropped or replaced the response on disk
+        if entry is not None and self.directory is not None and entry[2] != self._file_id(key):
+            with self.lock:
+                self.entries.pop(key, None)
+            entry = None
+
+        if entry is None and self.directory is not None:
+            entry = self._load(key)
+
+        if entry is None:
+            return None
+
+        expires, blob, _ = entry
+        with self.lock:
+            if expires <= self.clock():
+                self.entries.pop(key, None)
+                return None
+
+            self._remember(key, entry)
+
+        self.log.debug(f"Using the cached response of {method} {target}")
+
+        return marshal.loads(blob)
+
+    def put(self, method: str, target: str, status: int, headers: dict[str, str], body: Any):
+        ttl = time_to_live(method, target)
+
+        if not self.write or ttl is None or not 200 <= status < 300:
+            return
+
+        try:
+            blob = marshal.dumps((status, headers, body))
+        except ValueError:
+            # Like responses which aren't JSON
+            return
+
+        key = self._key(method, target)
+        expires = self.clock() + ttl
+        file_id = self._store(key, (expires, blob)) if self.directory is not None else None
+
+        with self.lock:
+            self._remember(key, (expires, blob, file_id))
+
+    def clear(self):
+        """Drop every response, because the cluster may have changed."""
+        with self.lock:
+            self.entries.clear()
+
+        if self.directory is None:
+            return
+
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+
+        for name in names:
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _remember(self, key: str, entry: tuple[float, bytes, tuple[int, int] | None]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _file_id(self, key: str) -> tuple[int, int] | None:
+        """Identity of the file of a response : replacing it, or deleting it, changes it."""
+        try:
+            stat = os.stat(self._path(key))
+        except OSError:
+            return None
+
+        # Inodes of deleted files get reused : the modification time tells a new file apart
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _load(self, key: str) -> tuple[float, bytes, tuple[int, int] | None] | None:
+        path = self._path(key)
+
+        try:
+            with open(path, "rb") as reader:
+                expires, blob = marshal.load(reader)
+            # The modification time tells which responses were used the least recently
+            os.utime(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+        return (expires, blob, self._file_id(key))
+
+    def _store(self, key: str, entry: tuple[float, bytes]) -> tuple[int, int] | None:
+        """Write a response to disk, and return the identity of its file."""
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            path = self._path(key)
+            with open(f"{path}.tmp", "wb") as writer:
+                marshal.dump(entry, writer)
+            os.replace(f"{path}.tmp", path)
+            file_id = self._file_id(key)
+
+            names = os.listdir(self.directory)
+            if len(names) > self.max_disk_entries:
+                paths = sorted((os.path.join(self.directory, name) for name in names), key=os.path.getmtime)
+                for stale in paths[: len(paths) - self.max_disk_entries]:
+                    os.unlink(stale)
+        except OSError as err:
+            self.log.debug(f"Cannot write the response cache : {err}")
+            return None
+
+        return file_id
@@ -1,20 +1,37 @@
+import bisect
 import fnmatch
 import logging
+import re
+import sys
 from abc import ABC
 from typing import Any
 
 from esctl.elasticsearch import Client
-from esctl.utils import Color
+from esctl.utils import Color, flatten_dict
+
+# Where cluster settings live, from the highest precedence to the lowest
+CLUSTER_SETTINGS_PERSISTENCIES = ["transient", "persistent", "defaults"]
+
+# Characters making a setting name a glob pattern
+GLOB_CHARACTERS = "*?["
 
 
 class Settings(ABC):
     """Abstract class for settings management."""
 
     log = logging.getLogger(__name__)
-    es = Client().es
+
+    def __init__(self, client: Client | None = None):
+        self.client = client
+
+    @property
+    def es(self):
+        return self.client.es
 
 
 class Setting:
+    __slots__ = ("name", "persistency", "value")
+
     def __init__(self, name: str, value: Any, persistency: str = "defaults"):
         self.name = name
         self.value = value
@@ -24,113 +41,430 @@ class Setting:
         return f"{self.name}={self.value}({self.persistency})"
 
 
-class ClusterSettings(Settings):
-    """Handle cluster-level settings."""
+def is_glob(key: str) -> bool:
+    return any(char in key for char in GLOB_CHARACTERS)
 
-    def list_(self) -> dict[str, dict[str, Any]]:
-        return self.es.cluster.get_settings(include_defaults=True, flat_settings=True)
 
-    def get(self, key: str, persistency: str = "transient") -> Setting:
-        settings: dict[str, dict[str, Any]] = self.list_()
+class ClusterSettingsSnapshot:
+    """Cluster settings as they were when fetched, indexed by key.
 
-        if key in settings.get(persistency):
-            return Setting(key, settings.get(persistency).get(key), persistency)
+    Keys are kept sorted, so every key sharing a prefix is found with a binary
+    search instead of a scan of the thousands of existing settings.
+    """
+
+    def __init__(self, settings: dict[str, dict[str, Any]]):
+        self.settings = {persistency: settings.get(persistency, {}) for persistency in CLUSTER_SETTINGS_PERSISTENCIES}
+        self.keys = sorted(set().union(*self.settings.values()))
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in settings for settings in self.settings.values())
+
+    def get(self, key: str, persistency: str = "transient") -> Setting:
+        if key in self.settings.get(persistency):
+            return Setting(key, self.settings.get(persistency).get(key), persistency)
         # If the setting cannot be found in the requested persistency
         # look for it in the "defaults" values
-        if key in settings.get("defaults"):
-            return Setting(key, settings.get("defaults").get(key), "defaults")
+        if key in self.settings.get("defaults"):
+            return Setting(key, self.settings.get("defaults").get(key), "defaults")
         return Setting(key, None)
 
-    def __get_setting_for_persistency(
-        self,
-        settings: dict[str, dict[str, Any]],
-        key: str,
-        persistency: str,
-    ) -> Setting:
-        if key in settings.get(persistency):
-            return Setting(key, settings.get(persistency).get(key), persistency)
+    def mget(self, key: str) -> dict[str, Setting]:
+        """Return the setting's value in every persistency, None where it isn't set."""
+        return {
+            persistency: Setting(key, settings.get(key), persistency if key in settings else "defaults")
+            for persistency, settings in self.settings.items()
+        }
+
+    def effective(self, key: str) -> Setting:
+        """Return the value the cluster actually uses : transient, then persistent, then default."""
+        for persistency, settings in self.settings.items():
+            if key in settings:
+                return Setting(key, settings.get(key), persistency)
 
         return Setting(key, None)
 
+    def with_prefix(self, prefix: str) -> list[str]:
+        start = bisect.bisect_left(self.keys, prefix)
+        end = start
+
+        while end < len(self.keys) and self.keys[end].startswith(prefix):
+            end += 1
+
+        return self.keys[start:end]
+
+    def match(self, pattern: str) -> list[str]:
+        """Return the keys matching a glob pattern (like `cluster.routing.*`), or the key itself if it exists."""
+        if not is_glob(pattern):
+            return [pattern] if pattern in self else []
+
+        # Only keys starting with the pattern's literal part may match it
+        prefix = re.split(r"[*?[]", pattern, maxsplit=1)[0]
+
+        return fnmatch.filter(self.with_prefix(prefix), pattern)
+
+
+class ClusterSettings(Settings):
+    """Handle cluster-level settings.
+
+    Settings are fetched once and kept for the lifetime of the object, which
+    commands create for each invocation. Looking up a few keys before anything
+    else only fetches these keys.
+    """
+
+    def __init__(self, client: Client | None = None):
+        super().__init__(client)
+        self._snapshot: ClusterSettingsSnapshot | None = None
+
+    def snapshot(self, keys: list[str] | None = None) -> ClusterSettingsSnapshot:
+        """Return every setting, or at least the given keys (or glob patterns) when the snapshot isn't loaded yet."""
+        if self._snapshot is not None:
+            return self._snapshot
+
+        if keys is None:
+            self.log.debug("Retrieving every cluster setting")
+            self._snapshot = ClusterSettingsSnapshot(
+                self.es.cluster.get_settings(include_defaults=True, flat_settings=True),
+            )
+            return self._snapshot
+
+        self.log.debug(f"Retrieving cluster settings {keys}")
+        # `filter_path` splits keys on dots : ask for nested settings, then flatten them
+        response = self.es.cluster.get_settings(
+            include_defaults=True,
+            flat_settings=False,
+            filter_path=[
+                f"{persistency}.{self._filter_path(key)}"
+                for persistency in CLUSTER_SETTINGS_PERSISTENCIES
+                for key in keys
+            ],
+        )
+
+        return ClusterSettingsSnapshot(
+            {
+                persistency: flatten_dict(response.get(persistency, {}))
+                for persistency in CLUSTER_SETTINGS_PERSISTENCIES
+            },
+        )
+
+    @staticmethod
+    def _filter_path(key: str) -> str:
+        """Cut a glob pattern after its first segment with a wildcard, since a `*` may span several segments.
+
+        `filter_path` only understands `*` : a segment with any other wildcard becomes `*`.
+        """
+        segments = key.split(".")
+
+        for idx, segment in enumerate(segments):
+            if is_glob(segment):
+                return ".".join(segments[:idx] + [segment if not is_glob(segment.replace("*", "")) else "*"])
+
+        return key
+
+    def list_(self) -> dict[str, dict[str, Any]]:
+        return self.snapshot().settings
+
+    def get(self, key: str, persistency: str = "transient") -> Setting:
+        return self.snapshot([key]).get(key, persistency)
+
     def mget(self, key: str) -> dict[str, Setting]:
-        settings: dict[str, dict[str, Any]] = self.list_()
+        return self.snapshot([key]).mget(key)
 
-        return {
-            "transient": self.__get_setting_for_persistency(settings, key, "transient"),
-            "persistent": self.__get_setting_for_persistency(
-                settings,
-                key,
-                "persistent",
-            ),
-            "defaults": self.__get_setting_for_persistency(settings, key, "defaults"),
-        }
+    def mget_many(self, keys: list[str]) -> dict[str, dict[str, Setting]]:
+        """Retrieve many settings (or glob patterns) in a single request.
+
+        Glob patterns are replaced by every key they match, while other keys are
+        always returned, even if they don't exist.
+        """
+        snapshot = self.snapshot(keys)
+        settings = {}
+
+        for key in keys:
+            for name in snapshot.match(key) if is_glob(key) else [key]:
+                settings[name] = snapshot.mget(name)
+
+        return settings
 
     def set(self, sections: str, value, persistency: str = "transient"):
         self.log.info(
             f"Changing {persistency}'s {Color.colorize(sections, Color.ITALIC)} to : {Color.colorize(value, Color.ITALIC)}",
         )
-        return self.es.cluster.put_settings(
-            body={persistency: {sections: value}},
-            flat_settings=True,
-        )
 
+        return self.set_many({persistency: {sections: value}})
 
-class IndexSettings(Settings):
-    """Handle index-level settings."""
+    def set_many(self, settings: dict[str, dict[str, Any]]):
+        """Change many settings, grouped by persistency, in a single request."""
+        self._snapshot = None
 
-    def list_(self, index: str) -> dict[str, dict[str, Setting]]:
-        self.log.debug(f"Retrieving settings list for indices : {index}")
+        return self.es.cluster.put_settings(body=settings, flat_settings=True)
 
-        settings: dict[str, dict[str, Setting]] = {}
 
-        for index_name, index_settings in self.es.indices.get_settings(
-            index=index,
-            include_defaults=True,
-            flat_settings=True,
-        ).items():
-            settings[index_name] = {}
-            for setting_name, setting_value in index_settings.get("settings").items():
-                settings[index_name][setting_name] = Setting(
-                    setting_name,
-                    setting_value,
-                    "settings",
-                )
-            for setting_name, setting_value in index_settings.get("defaults").items():
-                settings[index_name][setting_name] = Setting(
-                    setting_name,
-                    setting_value,
-                    "defaults",
-                )
+# Marks a default an index doesn't have, while other indices do
+NO_DEFAULT = object()
+
+
+def _hashable(value: Any) -> Any:
+    # Settings like `index.query.default_field` hold lists
+    return tuple(value) if isinstance(value, list) else value
+
+
+class IndexSettingsTable:
+    """Settings of many indices, stored by column rather than as one object per index and setting.
+
+    Setting names are interned once in a shared key table, and every index only
+    holds an array of its values, by key position. Defaults are stored once,
+    plus the few indices whose default differs from the others'. `Setting`
+    objects are only created for the values actually looked at.
+    """
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.indices: list[str] = []
+        self.index_positions: dict[str, int] = {}
+        # Explicit settings of each index, by key position (None where the index doesn't define the key)
+        self.values: list[list[Any]] = []
+        # Defaults shared by all indices, by key position
+        self.defaults: list[Any] = []
+        # Position of the first index having each default : the ones before it have none
+        self.default_since: list[int | None] = []
+        self.shared_defaults = 0
+        # Defaults which differ from the shared ones (or NO_DEFAULT), by index position then key position
+        self.default_overrides: dict[int, dict[int, Any]] = {}
+
+    @classmethod
+    def from_response(cls, response: dict[str, dict[str, dict[str, Any]]]) -> "IndexSettingsTable":
+        table = cls()
+
+        for index_name, index_settings in response.items():
+            table.add(index_name, index_settings.get("settings", {}), index_settings.get("defaults", {}))
+
+        return table
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def _position(self, key: str) -> int:
+        position = self.positions.get(key)
+
+        if position is None:
+            position = len(self.keys)
+            key = sys.intern(key)
+            self.keys.append(key)
+            self.positions[key] = position
+            self.defaults.append(None)
+            self.default_since.append(None)
+
+        return position
+
+    @staticmethod
+    def _intern(value: Any) -> Any:
+        # The same few values ("1", "false", ...) come back for every index
+        return sys.intern(value) if type(value) is str else value
+
+    def add(self, index: str, settings: dict[str, Any], defaults: dict[str, Any]):
+        """Add an index, given its flat explicit settings and defaults."""
+        index_position = len(self.indices)
+        row: list[Any] = []
+
+        for key, value in settings.items():
+            position = self._position(key)
+
+            if position >= len(row):
+                row.extend([None] * (position + 1 - len(row)))
+
+            row[position] = self._intern(value)
+
+        for key, value in defaults.items():
+            position = self._position(key)
+            value = self._intern(value)
+
+            if self.default_since[position] is None:
+                self.defaults[position] = value
+                self.default_since[position] = index_position
+                self.shared_defaults += 1
+            elif self.defaults[position] != value:
+                self.default_overrides.setdefault(index_position, {})[position] = value
+
+        # Usually, every index has the same defaults : the ones it lacks are only looked for when it doesn't
+        if len(defaults) < self.shared_defaults:
+            present = {self.positions[key] for key in defaults}
+            overrides = self.default_overrides.setdefault(index_position, {})
+
+            for position, since in enumerate(self.default_since):
+                if since is not None and position not in present:
+                    overrides[position] = NO_DEFAULT
+
+        self.index_positions[index] = index_position
+        self.indices.append(index)
+        self.values.append(row)
+
+    def _value(self, index_position: int, position: int) -> tuple[Any, str]:
+        """Return the value of a setting for an index, and whether it is explicit ("settings") or a default."""
+        row = self.values[index_position]
+
+        if position < len(row) and row[position] is not None:
+            return row[position], "settings"
+
+        overrides = self.default_overrides.get(index_position)
+        if overrides is not None and position in overrides:
+            value = overrides[position]
+            return (None if value is NO_DEFAULT else value), "defaults"
+
+        since = self.default_since[position]
+        if since is None or index_position < since:
+            return None, "defaults"
+
+        return self.defaults[position], "defaults"
+
+    def get(self, index: str, key: str) -> Setting | None:
+        position = self.positions.get(key)
+        index_position = self.index_positions.get(index)
+
+        if position is None or index_position is None:
+            return None
+
+        value, persistency = self._value(index_position, position)
+
+        return None if value is None else Setting(key, value, persistency)
+
+    def effective_values(self, index_position: int) -> tuple[Any, ...]:
+        """Return the value of every key for an index, explicit or default, in key table order."""
+        return tuple(self._value(index_position, position)[0] for position in range(len(self.keys)))
+
+    def group(self, keys: list[str]) -> dict[tuple[Any, ...], list[str]]:
+        """Group indices having the same values for the given keys, from the biggest group to the smallest.
+
+        Every index is reduced to the tuple of its values, whose hash makes it
+        cheap to find the indices sharing it, whatever their number.
+        """
+        positions = [self.positions[key] for key in keys]
+        groups: dict[tuple[Any, ...], list[str]] = {}
+
+        for index_position, index in enumerate(self.indices):
+            fingerprint = tuple(_hashable(self._value(index_position, position)[0]) for position in positions)
+            groups.setdefault(fingerprint, []).append(index)
+
+        return dict(sorted(groups.items(), key=lambda group: len(group[1]), reverse=True))
+
+    def as_dict(self, index: str) -> dict[str, dict[str, Any]]:
+        """Return the settings of an index like Elasticsearch does : explicit ones, then defaults."""
+        index_position = self.index_positions[index]
+        settings: dict[str, dict[str, Any]] = {"settings": {}, "defaults": {}}
+
+        for position, key in enumerate(self.keys):
+            value, persistency = self._value(index_position, position)
+
+            if value is not None:
+                settings[persistency][key] = value
 
         return settings
 
+
+class IndexTemplate:
+    __slots__ = ("index_patterns", "name", "priority", "settings")
+
+    def __init__(self, name: str, index_patterns: list[str], priority: int, settings: dict[str, Any]):
+        self.name = name
+        self.index_patterns = [index_patterns] if isinstance(index_patterns, str) else index_patterns
+        self.priority = priority
+        self.settings = settings
+
+    def matches(self, index: str) -> bool:
+        return any(fnmatch.fnmatchcase(index, pattern) for pattern in self.index_patterns)
+
+
+def matching_template(index: str, templates: list[IndexTemplate]) -> IndexTemplate | None:
+    """Return the template an index was created from : the one with the highest priority among those matching it."""
+    return next((template for template in templates if template.matches(index)), None)
+
+
+def as_setting_value(value: Any) -> Any:
+    """Convert a value to the form Elasticsearch returns settings in (strings), so both compare."""
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, (list, tuple)):
+        return [as_setting_value(element) for element in value]
+    return str(value)
+
+
+def _index_settings(settings: dict[str, Any]) -> dict[str, Any]:
+    # Templates may omit the `index.` prefix, and hold numbers where indices hold strings
+    return {
+        key if key.startswith("index.") else f"index.{key}": as_setting_value(value)
+        for key, value in flatten_dict(settings).items()
+    }
+
+
+class IndexSettings(Settings):
+    """Handle index-level settings."""
+
+    def list_(self, index: str, keys: str | None = None) -> IndexSettingsTable:
+        """Retrieve the settings of indices. Only the settings matching `keys` (comma-separated,
+        with wildcards) are sent by Elasticsearch when given.
+        """
+        self.log.debug(f"Retrieving settings {keys or '*'} for indices : {index}")
+
+        return IndexSettingsTable.from_response(
+            self.es.indices.get_settings(
+                index=index,
+                name=keys,
+                include_defaults=True,
+                flat_settings=True,
+            ),
+        )
+
     def get(self, index: str, key: str | None) -> dict[str, list[Setting]]:
         self.log.debug(f"Retrieving setting(s) '{key}' for indices : {index}")
 
-        response = self.list_(index)
+        table = self.list_(index, key)
         settings: dict[str, list[Setting]] = {}
         requested_settings: list[str] = []
 
-        known_settings = [list(index_settings.keys()) for _, index_settings in response.items()][0]
-
         if "*" in key:
-            requested_settings = fnmatch.filter(known_settings, key)
+            requested_settings = fnmatch.filter(table.keys, key)
 
         elif "," in key:
             requested_settings = key.split(",")
         else:
             requested_settings = [key]
 
-        for index_name, index_settings in response.items():
-            settings[index_name] = []
-
-            for setting_name in requested_settings:
-                if setting_name in known_settings:
-                    settings[index_name].append(index_settings.get(setting_name))
-                else:
-                    settings[index_name].append(Setting(setting_name, None))
+        for index_name in table.indices:
+            settings[index_name] = [
+                table.get(index_name, setting_name) or Setting(setting_name, None)
+                for setting_name in requested_settings
+            ]
 
         return settings
 
     def set(self, setting: str, value: Any, index: str):
         return self.es.indices.put_settings(index=index, body={setting: value})
+
+    def templates(self) -> list[IndexTemplate]:
+        """Retrieve the composable index templates, from the one applied first to an index to the last."""
+        index_templates = self.es.indices.get_index_template().get("index_templates", [])
+        component_templates = {
+            component.get("name"): component.get("component_template", {}).get("template", {}).get("settings", {})
+            for component in self.es.cluster.get_component_template().get("component_templates", [])
+        }
+
+        templates = []
+        for template in index_templates:
+            definition = template.get("index_template", {})
+            # Settings of the index template itself override the ones of its components
+            settings: dict[str, Any] = {}
+            for component in definition.get("composed_of", []):
+                settings.update(_index_settings(component_templates.get(component, {})))
+            settings.update(_index_settings(definition.get("template", {}).get("settings", {})))
+
+            templates.append(
+                IndexTemplate(
+                    template.get("name"),
+                    definition.get("index_patterns", []),
+                    definition.get("priority") or 0,
+                    settings,
+                ),
+            )
+
+        return sorted(templates, key=lambda template: template.priority, reverse=True)
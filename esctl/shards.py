@@ -0,0 +1,163 @@
+"""Shards of many indices on many nodes, stored as compact index × node matrices.
+
+Matrices are flat `array`s of counters, row-major (one row per index). When
+NumPy is installed, aggregates are computed on a zero-copy view of these arrays,
+otherwise with slices of the arrays, which also run in C.
+"""
+
+import functools
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+# Column of the shards which aren't allocated to any node
+UNASSIGNED = "UNASSIGNED"
+
+
+@functools.cache
+def _numpy():
+    """Return the numpy module, or None if it isn't installed. Only imported when aggregates are computed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+class ShardMatrix:
+    """Number of shards (and primaries) of every index on every node.
+
+    Nodes are the columns, in the given order, followed by an `UNASSIGNED`
+    column. The label of each shard (like `0p`) is only kept for the cells which
+    have one, by index then by node position, to draw the index × node table.
+    """
+
+    def __init__(self, indices: list[str], nodes: list[str]):
+        self.indices = indices
+        self.nodes = nodes + [UNASSIGNED]
+        self.node_positions = {node: position for position, node in enumerate(self.nodes)}
+        self.shards = array("I", bytes(4 * len(self.indices) * len(self.nodes)))
+        self.primaries = array("I", bytes(4 * len(self.indices) * len(self.nodes)))
+        self.labels: list[dict[int, list[str]]] = [{} for _ in self.indices]
+
+    @classmethod
+    def from_shards(cls, shards: Iterable[dict[str, Any]], nodes: list[str]) -> "ShardMatrix":
+        """Build the matrix from `_cat/shards` lines (with at least the index, node, shard and prirep columns)."""
+        shards = list(shards)
+        matrix = cls(list(dict.fromkeys(shard.get("index") for shard in shards)), nodes)
+        index_positions = {index: position for position, index in enumerate(matrix.indices)}
+
+        for shard in shards:
+            matrix.add(index_positions[shard.get("index")], shard.get("node"), shard.get("shard"), shard.get("prirep"))
+
+        return matrix
+
+    @property
+    def assigned_nodes(self) -> int:
+        return len(self.nodes) - 1
+
+    def add(self, index_position: int, node: str | None, shard: str, prirep: str):
+        # A relocating shard's node is like "node-1 -> 1.2.3.4 abcd node-2" : it is counted on its source
+        node = (node or UNASSIGNED).split(" -> ")[0]
+
+        if node not in self.node_positions:
+            # A node which left the cluster between the two requests
+            return
+
+        node_position = self.node_positions[node]
+        cell = index_position * len(self.nodes) + node_position
+        self.shards[cell] += 1
+
+        if prirep == "p":
+            self.primaries[cell] += 1
+
+        self.labels[index_position].setdefault(node_position, []).append(f"{shard}{prirep}")
+
+    def has_unassigned(self) -> bool:
+        return any(self.shards[self.assigned_nodes :: len(self.nodes)])
+
+    def rows(self, nodes: list[str] | None = None) -> Iterator[dict[str, str]]:
+        """Yield, for every index with shards on the given nodes (all of them, and unassigned shards, by default),
+        its shards on each of these nodes.
+        """
+        if nodes is None:
+            nodes = self.nodes
+
+        positions = {self.node_positions[node] for node in nodes}
+        # Every line starts as a copy of this one, which is much faster than filling each cell
+        empty_line = dict.fromkeys((node for node in nodes if node != UNASSIGNED), "")
+
+        for index, cells in zip(self.indices, self.labels):
+            if positions.isdisjoint(cells):
+                continue
+
+            line = {"index": index, **empty_line}
+            for position, labels in cells.items():
+                if position in positions:
+                    line[self.nodes[position]] = " ".join(labels)
+
+            yield line
+
+    def per_node(self) -> list[dict[str, Any]]:
+        """Return the number of shards, primaries and replicas on every node (unassigned shards last)."""
+        width = len(self.nodes)
+
+        if _numpy() is not None:
+            shards = self._view(self.shards).sum(axis=0).tolist()
+            primaries = self._view(self.primaries).sum(axis=0).tolist()
+        else:
+            shards = [sum(self.shards[position::width]) for position in range(width)]
+            primaries = [sum(self.primaries[position::width]) for position in range(width)]
+
+        return [
+            {
+                "node": node,
+                "shards": shards[position],
+                "primaries": primaries[position],
+                "replicas": shards[position] - primaries[position],
+            }
+            for position, node in enumerate(self.nodes)
+            if node != UNASSIGNED or shards[position]
+        ]
+
+    def skewed_indices(self, top: int) -> list[dict[str, Any]]:
+        """Return the `top` indices whose shards are the most concentrated on a single node.
+
+        The skew of an index is how many more shards its most loaded node holds
+        than it would if the index's shards were spread evenly over every node.
+        """
+        width = len(self.nodes)
+        assigned = self.assigned_nodes
+
+        if assigned == 0:
+            return []
+
+        if _numpy() is not None:
+            matrix = self._view(self.shards)[:, :assigned]
+            totals = matrix.sum(axis=1).tolist()
+            maximums = matrix.max(axis=1).tolist()
+            hosts = (matrix > 0).sum(axis=1).tolist()
+        else:
+            rows = [self.shards[start : start + assigned] for start in range(0, len(self.shards), width)]
+            totals = [sum(row) for row in rows]
+            maximums = [max(row) for row in rows]
+            hosts = [assigned - row.count(0) for row in rows]
+
+        skewed = [
+            {
+                "index": index,
+                "shards": totals[position],
+                "nodes": hosts[position],
+                "max_per_node": maximums[position],
+                "skew": maximums[position] - -(-totals[position] // assigned),
+            }
+            for position, index in enumerate(self.indices)
+        ]
+
+        return sorted(skewed, key=lambda index: (-index["skew"], -index["shards"], index["index"]))[:top]
+
+    def _view(self, counters: array):
+        numpy = _numpy()
+
+        return numpy.frombuffer(counters, dtype=numpy.uint32).reshape(len(self.indices), len(self.nodes))
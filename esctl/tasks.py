@@ -0,0 +1,113 @@
+"""Follow the progress of long-running Elasticsearch tasks (reindex, update by query, ...)."""
+
+import time
+from typing import Any
+
+# Counters of a bulk-by-scroll task's status, whose sum is the number of documents processed
+PROCESSED_COUNTERS = ["created", "updated", "deleted", "noops", "version_conflicts"]
+
+
+def format_duration(seconds: float | None) -> str:
+    """Format a duration like `1h02m03s`, `2m03s` or `3s`."""
+    if seconds is None:
+        return "-"
+
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+
+    if hours:
+        return f"{hours}h{minutes:02d}m{seconds:02d}s"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+class TaskStatus:
+    """Progress of a bulk-by-scroll task, as reported by the task API."""
+
+    def __init__(self, status: dict[str, Any], completed: bool = False, running_time: float = 0.0):
+        self.status = status
+        self.completed = completed
+        self.running_time = running_time
+
+    @classmethod
+    def from_response(cls, response: dict[str, Any]) -> "TaskStatus":
+        task = response.get("task", {})
+
+        return cls(
+            task.get("status", {}),
+            completed=response.get("completed", False),
+            running_time=task.get("running_time_in_nanos", 0) / 1e9,
+        )
+
+    @property
+    def total(self) -> int:
+        return self.status.get("total", 0)
+
+    @property
+    def processed(self) -> int:
+        return sum(self.status.get(counter, 0) for counter in PROCESSED_COUNTERS)
+
+    @property
+    def ratio(self) -> float | None:
+        # The total is only known once the first search returned
+        return self.processed / self.total if self.total else None
+
+    @property
+    def slices(self) -> list["TaskStatus"]:
+        # Slices which didn't start yet are null
+        return [TaskStatus(status) for status in self.status.get("slices", []) if status is not None]
+
+    def describe(self) -> str:
+        ratio = "-" if self.ratio is None else f"{self.ratio:.1%}"
+
+        return f"{ratio} ({self.processed}/{self.total} docs)"
+
+
+class TaskProgress:
+    """Turn successive statuses of a task into a processing rate and an estimated time left.
+
+    The rate is an exponentially weighted moving average of the rate between two
+    polls, so a throttled or bursty task doesn't make the estimate jump around.
+    """
+
+    smoothing_factor: float = 0.3
+
+    def __init__(self):
+        self.rate: float | None = None
+        self._last: tuple[float, int] | None = None
+
+    def update(self, status: TaskStatus, now: float | None = None) -> float | None:
+        """Account a new status, and return the current rate (documents per second)."""
+        now = time.monotonic() if now is None else now
+
+        if self._last is None:
+            # Until a second poll, the average rate since the task started is the best guess
+            if status.running_time > 0 and status.processed:
+                self.rate = status.processed / status.running_time
+        else:
+            elapsed = now - self._last[0]
+
+            if elapsed > 0:
+                rate = (status.processed - self._last[1]) / elapsed
+                self.rate = (
+                    rate
+                    if self.rate is None
+                    else self.smoothing_factor * rate + (1 - self.smoothing_factor) * self.rate
+                )
+
+        self._last = (now, status.processed)
+
+        return self.rate
+
+    def eta(self, status: TaskStatus) -> float | None:
+        """Seconds left before the task completes, at the current rate."""
+        if not self.rate or not status.total:
+            return None
+
+        return max(status.total - status.processed, 0) / self.rate
+
+    def describe(self, status: TaskStatus) -> str:
+        rate = "-" if self.rate is None else f"{self.rate:.0f}"
+
+        return f"{status.describe()}, {rate} docs/s, ETA {format_duration(self.eta(status))}"
@@ -0,0 +1,119 @@
+import itertools
+import time
+from collections.abc import Sequence
+
+from elastic_transport import (
+    ApiResponseMeta,
+    BaseNode,
+    HttpHeaders,
+    NodeConfig,
+    NodeSelector,
+    RandomSelector,
+    RoundRobinSelector,
+    Transport,
+    TransportApiResponse,
+    Urllib3HttpNode,
+)
+
+from esctl.response_cache import READ_METHODS, ResponseCache
+
+
+class LatencyTrackingNode(Urllib3HttpNode):
+    """HTTP node keeping an exponentially weighted moving average of its response times.
+
+    Failed and timed out requests are accounted too, so a slow node quickly
+    gets a worse score than its peers.
+    """
+
+    smoothing_factor: float = 0.3
+
+    def __init__(self, config: NodeConfig):
+        super().__init__(config)
+        self.latency: float | None = None
+        # When the latency was last measured
+        self.measured_at = 0.0
+
+    def perform_request(self, *args, **kwargs):
+        start = time.monotonic()
+
+        try:
+            return super().perform_request(*args, **kwargs)
+        finally:
+            self.record_latency(time.monotonic() - start)
+
+    def record_latency(self, duration: float):
+        self.measured_at = time.monotonic()
+
+        if self.latency is None:
+            self.latency = duration
+        else:
+            self.latency = self.smoothing_factor * duration + (1 - self.smoothing_factor) * self.latency
+
+
+class LeastLatencySelector(NodeSelector):
+    """Select the live node with the lowest average response time.
+
+    Nodes which never answered a request yet are picked first (in their
+    configuration order) so every node eventually gets a score. Then one request
+    in `exploration_interval` goes to the node measured the longest ago : a node
+    which was slow once would otherwise never be measured again, however fast it
+    became.
+    """
+
+    exploration_interval: int = 20
+
+    def __init__(self, node_configs: list[NodeConfig]):
+        super().__init__(node_configs)
+        self.selections = itertools.count(1)
+
+    def select(self, nodes: Sequence[BaseNode]) -> BaseNode:
+        if len(nodes) > 1 and next(self.selections) % self.exploration_interval == 0:
+            return min(nodes, key=lambda node: getattr(node, "measured_at", 0.0))
+
+        return min(nodes, key=self._score)
+
+    @staticmethod
+    def _score(node: BaseNode) -> tuple[bool, float]:
+        latency = getattr(node, "latency", None)
+
+        return (latency is not None, latency or 0.0)
+
+
+NODE_SELECTORS: dict[str, type[NodeSelector]] = {
+    "least_latency": LeastLatencySelector,
+    "random": RandomSelector,
+    "round_robin": RoundRobinSelector,
+}
+
+
+class CachingTransport(Transport):
+    """Transport answering the requests of cached endpoints from `response_cache`, when it is set.
+
+    Requests which may change the cluster drop the cached responses, whether they succeeded or not.
+    """
+
+    response_cache: ResponseCache | None = None
+
+    def perform_request(self, method: str, target: str, **kwargs) -> TransportApiResponse:
+        cache = self.response_cache
+
+        if cache is None:
+            return super().perform_request(method, target, **kwargs)
+
+        if method not in READ_METHODS:
+            try:
+                return super().perform_request(method, target, **kwargs)
+            finally:
+                cache.clear()
+
+        cached = cache.get(method, target)
+        if cached is not None:
+            status, headers, body = cached
+            meta = ApiResponseMeta(status, "1.1", HttpHeaders(headers), 0.0, self.node_pool.all()[0].config)
+
+            return TransportApiResponse(meta, body)
+
+        meta, body = super().perform_request(method, target, **kwargs)
+        cache.put(method, target, meta.status, dict(meta.headers), body)
+
+        return TransportApiResponse(meta, body)
@@ -1,6 +1,7 @@
+import argparse
 from collections import OrderedDict
-
-import yaml
+from collections.abc import Callable, Iterable, Mapping
+from typing import Any
 
 
 class Color:
@@ -21,19 +22,123 @@ class Color:
         return f"{color}{text}{cls.END}"
 
 
-def flatten_dict(dictionary):
-    def expand(key, value):
-        if isinstance(value, dict):
-            return [(key + "." + k, v) for k, v in flatten_dict(value).items()]
-        return [(key, value)]
+def flatten_dict(
+    dictionary: Mapping[str, Any],
+    flatten_lists: bool = False,
+    max_depth: int | None = None,
+    prefixes: Iterable[str] | None = None,
+) -> dict[str, Any]:
+    """Flatten nested dicts into a single dict whose keys are the full path of each value.
+
+    :Example:
+            {"jvm": {"mem": {"heap_used_percent": 42}}, "plugins": [{"name": "foo"}]}
+        becomes
+            {"jvm.mem.heap_used_percent": 42, "plugins": [{"name": "foo"}]}
+        or, with `flatten_lists`
+            {"jvm.mem.heap_used_percent": 42, "plugins[0].name": "foo"}
+
+    Empty dicts (and empty lists with `flatten_lists`) don't produce any key.
+
+    :param dictionary: The dict to flatten
+    :param flatten_lists: Also flatten lists, using `[index]` as the key of their elements
+    :param max_depth: Don't go deeper than this number of nested levels : values
+                      below are kept as they are
+    :param prefixes: Only keep keys starting with one of these prefixes. Branches
+                     which can't match any of them aren't even walked through
+    :return: The flattened dict
+    """
+    if prefixes is not None:
+        prefixes = tuple(prefixes)
+
+    flat_dict = {}
+    # Every level is walked with its own iterator, so keys keep the order of the original document
+    stack = [("", iter(dictionary.items()), 1, ".")]
+
+    while stack:
+        parent_key, items, depth, separator = stack[-1]
+        item = next(items, None)
+
+        if item is None:
+            stack.pop()
+            continue
+
+        key, value = item
+        if parent_key:
+            key = f"{parent_key}{separator}{key}"
+
+        if max_depth is None or depth < max_depth:
+            if isinstance(value, dict):
+                if prefixes is None or _may_match(key, prefixes):
+                    stack.append((key, iter(value.items()), depth + 1, "."))
+                continue
+
+            if flatten_lists and isinstance(value, list):
+                if prefixes is None or _may_match(key, prefixes):
+                    stack.append((key, ((f"[{i}]", v) for i, v in enumerate(value)), depth + 1, ""))
+                continue
+
+        if prefixes is None or key.startswith(prefixes):
+            flat_dict[key] = value
+
+    return flat_dict
+
+
+def _may_match(key: str, prefixes: tuple[str, ...]) -> bool:
+    """Whether some keys below `key` can start with one of the prefixes."""
+    return key.startswith(prefixes) or any(prefix.startswith(key) for prefix in prefixes)
+
 
-    items = [item for k, v in dictionary.items() for item in expand(k, v)]
+def positive_float(value: str) -> float:
+    """Argument type of durations and rates, which must be above zero."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value} isn't a number")
 
-    return dict(items)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"{value} must be greater than 0")
+
+    return number
+
+
+def int_at_least(minimum: int) -> Callable[[str], int]:
+    """Argument type of integers which can't be below `minimum`."""
+
+    def parse(value: str) -> int:
+        try:
+            number = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"{value} isn't an integer")
+
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f"{value} must be at least {minimum}")
+
+        return number
+
+    return parse
+
+
+def float_at_least(minimum: float) -> Callable[[str], float]:
+    """Argument type of numbers which can't be below `minimum`."""
+
+    def parse(value: str) -> float:
+        try:
+            number = float(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"{value} isn't a number")
+
+        if not number >= minimum:
+            raise argparse.ArgumentTypeError(f"{value} must be at least {minimum:g}")
+
+        return number
+
+    return parse
 
 
 def setup_yaml():
     """https://stackoverflow.com/a/8661021"""
+    import yaml
+
     yaml.add_representer(
         OrderedDict,
         lambda self, data: self.represent_mapping(
@@ -0,0 +1,208 @@
+"""Re-run a command on a fixed schedule and redraw its output in place.
+
+Only the lines which changed since the previous tick are rewritten, using
+cursor moves, so a watched command stays cheap to display over a slow link.
+Cells whose value changed are highlighted, and counter columns get a
+per-second rate column next to them.
+"""
+
+import re
+import shutil
+import time
+from collections.abc import Callable, Hashable, Sequence
+from typing import Any, TextIO
+
+# Terminal escape sequences
+ANSI_SEQUENCE = re.compile(r"\033\[[0-9;?]*[A-Za-z]")
+CLEAR_SCREEN = "\033[H\033[2J"
+CLEAR_LINE_END = "\033[K"
+CLEAR_SCREEN_END = "\033[J"
+HIDE_CURSOR = "\033[?25l"
+SHOW_CURSOR = "\033[?25h"
+HIGHLIGHT = "\033[7m"
+HIGHLIGHT_END = "\033[27m"
+RESET = "\033[0m"
+
+COLUMN_SEPARATOR = "  "
+
+
+def strip_ansi(text: str) -> str:
+    return ANSI_SEQUENCE.sub("", text)
+
+
+def fit(line: str, width: int) -> str:
+    """Cut a line so that it shows at most `width` characters, ignoring escape sequences."""
+    if len(strip_ansi(line)) <= width:
+        return line
+
+    parts, shown = [], 0
+    # With a capturing group, escape sequences are at the odd positions
+    for position, token in enumerate(re.split(f"({ANSI_SEQUENCE.pattern})", line)):
+        if position % 2:
+            parts.append(token)
+        else:
+            parts.append(token[: width - shown])
+            shown += len(parts[-1])
+
+            if shown >= width:
+                break
+
+    return "".join(parts) + RESET
+
+
+def _number(value: Any) -> float | None:
+    try:
+        return float(strip_ansi(str(value)))
+    except ValueError:
+        return None
+
+
+class Schedule:
+    """Ticks every `interval` seconds, computed from the first one so that they don't drift.
+
+    When a tick is late (because the command took longer than the interval),
+    the missed ticks are skipped rather than run in a burst.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.interval = interval
+        self.clock = clock
+        self.sleep = sleep
+        self.next_tick = clock()
+
+    def wait(self) -> int:
+        """Sleep until the next tick, and return the number of ticks skipped."""
+        self.next_tick += self.interval
+        now = self.clock()
+        skipped = 0
+
+        if now > self.next_tick:
+            skipped = int((now - self.next_tick) // self.interval) + 1
+            self.next_tick += skipped * self.interval
+
+        self.sleep(self.next_tick - now)
+
+        return skipped
+
+
+class LiveTable:
+    """Draw successive versions of a table on a terminal, rewriting only the lines which changed.
+
+    :param stream: Where the table is written
+    :param counter_columns: Columns holding ever-increasing counters, shown with their rate
+    :param key_columns: Number of leading columns identifying a row from a tick to the next
+    :param tty: Whether the stream is a terminal. If it isn't, each version is written in full after the previous one
+    """
+
+    def __init__(self, stream: TextIO, counter_columns: Sequence[str] = (), key_columns: int = 1, tty: bool = True):
+        self.stream = stream
+        self.counter_columns = set(counter_columns)
+        self.key_columns = key_columns
+        self.tty = tty
+        self.lines: list[str] = []
+        # Previous values and counters of every row, by row key
+        self.rows: dict[Hashable, tuple[str, ...]] = {}
+        self.counters: dict[tuple[Hashable, int], tuple[float, float]] = {}
+
+    def draw(self, title: str, columns: Sequence[str], rows: Sequence[Sequence[Any]], now: float | None = None):
+        now = time.monotonic() if now is None else now
+        counters = {position for position, column in enumerate(columns) if column in self.counter_columns}
+
+        header: list[str] = []
+        for position, column in enumerate(columns):
+            header.append(str(column))
+            if position in counters:
+                header.append(f"{column}/s")
+
+        cells, highlights = [], []
+        previous_rows, self.rows = self.rows, {}
+        previous_counters, self.counters = self.counters, {}
+
+        for row in rows:
+            values = tuple("" if value is None else str(value) for value in row)
+            key = values[: self.key_columns]
+            previous = previous_rows.get(key)
+            self.rows[key] = values
+
+            line, highlighted = [], []
+            for position, value in enumerate(values):
+                line.append(value)
+                highlighted.append(previous is not None and position < len(previous) and previous[position] != value)
+
+                if position in counters:
+                    line.append(self._rate(previous_counters, (key, position), value, now))
+                    highlighted.append(False)
+
+            cells.append(line)
+            highlights.append(highlighted)
+
+        widths = [len(strip_ansi(name)) for name in header]
+        for line in cells:
+            for position, value in enumerate(line):
+                widths[position] = max(widths[position], len(strip_ansi(value)))
+
+        lines = [title, "", self._join(header, widths, [False] * len(header))]
+        lines.extend(self._join(line, widths, highlighted) for line, highlighted in zip(cells, highlights))
+
+        self._write(lines)
+
+    def close(self):
+        if self.tty and self.lines:
+            self.stream.write(f"\033[{len(self.lines) + 1};1H{SHOW_CURSOR}")
+            self.stream.flush()
+
+    def _rate(self, previous_counters, key, value: str, now: float) -> str:
+        number = _number(value)
+
+        if number is None:
+            return ""
+
+        self.counters[key] = (now, number)
+        previous = previous_counters.get(key)
+
+        # A counter going down was reset, by a node restart for example
+        if previous is None or now <= previous[0] or number < previous[1]:
+            return ""
+
+        return f"{(number - previous[1]) / (now - previous[0]):.1f}"
+
+    def _join(self, values: Sequence[str], widths: Sequence[int], highlighted: Sequence[bool]) -> str:
+        cells = []
+        for value, width, highlight in zip(values, widths, highlighted):
+            padding = " " * (width - len(strip_ansi(value)))
+
+            if highlight and self.tty:
+                value = f"{HIGHLIGHT}{value}{HIGHLIGHT_END}"
+
+            cells.append(value + padding)
+
+        return COLUMN_SEPARATOR.join(cells).rstrip()
+
+    def _write(self, lines: list[str]):
+        if not self.tty:
+            self.stream.write("\n".join(lines) + "\n\n")
+            self.stream.flush()
+            self.lines = lines
+            return
+
+        width = shutil.get_terminal_size().columns
+        # Wrapped lines would shift every line below them
+        lines = [fit(line, width) for line in lines]
+
+        if not self.lines:
+            self.stream.write(HIDE_CURSOR + CLEAR_SCREEN + "\n".join(lines))
+        else:
+            for number, line in enumerate(lines):
+                if number >= len(self.lines) or self.lines[number] != line:
+                    self.stream.write(f"\033[{number + 1};1H{line}{CLEAR_LINE_END}")
+
+            if len(lines) < len(self.lines):
+                self.stream.write(f"\033[{len(lines) + 1};1H{CLEAR_SCREEN_END}")
+
+        self.stream.flush()
+        self.lines = lines
@@ -0,0 +1,135 @@
+from esctl.balance import BalancePlanner, ClusterLayout
+
+from .base_test_class import EsctlTestCase
+
+
+def layout(shards, disk_total=1000, attributes=None):
+    nodes = sorted({shard[3] for shard in shards} | set(attributes or {}))
+
+    return ClusterLayout.from_cat(
+        [
+            {"index": index, "shard": number, "prirep": prirep, "state": "STARTED", "node": node, "store": str(store)}
+            for index, number, prirep, node, store in shards
+        ],
+        [
+            {
+                "node": node,
+                "disk.used": str(sum(shard[4] for shard in shards if shard[3] == node)),
+                "disk.total": str(disk_total),
+            }
+            for node in nodes
+        ],
+        [
+            {"node": node, "attr": attribute, "value": value}
+            for node, values in (attributes or {}).items()
+            for attribute, value in values.items()
+        ],
+    )
+
+
+class TestClusterLayout(EsctlTestCase):
+    def test_only_started_shards_are_movable(self):
+        cluster = ClusterLayout.from_cat(
+            [
+                {"index": "logs", "shard": "0", "prirep": "p", "state": "STARTED", "node": "es-1"},
+                {"index": "logs", "shard": "1", "prirep": "p", "state": "INITIALIZING", "node": "es-1"},
+                {
+                    "index": "logs",
+                    "shard": "2",
+                    "prirep": "p",
+                    "state": "RELOCATING",
+                    "node": "es-1 -> 1.2.3.4 abcd es-2",
+                },
+            ],
+            [{"node": "es-1"}, {"node": "es-2"}],
+        )
+
+        self.assertEqual([shard.number for shard in cluster.nodes["es-1"].shards], ["0"])
+        self.assertEqual(cluster.holders[("logs", "1")], {"es-1"})
+
+
+class TestBalancePlanner(EsctlTestCase):
+    def test_shards_are_evened_out(self):
+        cluster = layout(
+            [("logs", str(number), "p", "es-1", 10) for number in range(6)]
+            + [("logs", "6", "p", "es-2", 10)]
+            + [("logs", "7", "p", "es-3", 10)]
+        )
+
+        moves = BalancePlanner(cluster).plan()
+
+        self.assertEqual(len(moves), 3)
+        self.assertEqual({move.source for move in moves}, {"es-1"})
+        self.assertEqual(cluster.skew()["shards"], 1)
+        self.assertEqual(
+            moves[0].as_reroute_command(),
+            {"move": {"index": "logs", "shard": int(moves[0].shard.number), "from_node": "es-1", "to_node": "es-2"}},
+        )
+
+    def test_balanced_cluster_is_left_alone(self):
+        cluster = layout([("logs", "0", "p", "es-1", 10), ("logs", "1", "p", "es-2", 10)])
+
+        self.assertEqual(BalancePlanner(cluster).plan(), [])
+
+    def test_copies_stay_on_distinct_nodes(self):
+        # Every shard of es-1 already has a replica on es-2
+        cluster = layout(
+            [("logs", str(number), "p", "es-1", 10) for number in range(4)]
+            + [("logs", str(number), "r", "es-2", 10) for number in range(4)]
+            + [("other", "0", "p", "es-2", 10), ("other", "1", "p", "es-2", 10)]
+        )
+
+        moves = BalancePlanner(cluster).plan()
+
+        self.assertEqual([(move.shard.index, move.target) for move in moves], [("other", "es-1")])
+        self.assertEqual(cluster.skew()["shards"], 0)
+
+    def test_awareness_attributes(self):
+        zones = {"es-1": {"zone": "a"}, "es-2": {"zone": "b"}, "es-3": {"zone": "b"}}
+        cluster = layout(
+            [("logs", "0", "p", "es-1", 10), ("logs", "0", "r", "es-3", 10), ("logs", "1", "p", "es-1", 10)],
+            attributes=zones,
+        )
+
+        moves = BalancePlanner(cluster, awareness_attributes=["zone"]).plan()
+
+        # Moving logs/0 to es-2 would put both its copies in zone b
+        self.assertEqual(
+            [(move.shard.index, move.shard.number, move.target) for move in moves], [("logs", "1", "es-2")]
+        )
+
+    def test_disk(self):
+        cluster = layout(
+            [("big", "0", "p", "es-1", 600), ("small", "0", "p", "es-1", 100), ("small", "1", "p", "es-2", 100)]
+        )
+
+        moves = BalancePlanner(cluster, metric="disk").plan()
+
+        self.assertEqual([(move.shard.index, move.target) for move in moves], [("small", "es-2")])
+        self.assertEqual(cluster.skew()["disk"], 400)
+
+    def test_full_and_excluded_nodes_receive_nothing(self):
+        shards = [("logs", str(number), "p", "es-1", 100) for number in range(4)] + [("logs", "4", "p", "es-2", 100)]
+
+        self.assertEqual(BalancePlanner(layout(shards, disk_total=400), max_disk_ratio=0.4).plan(), [])
+        self.assertEqual(BalancePlanner(layout(shards), excluded_nodes=["es-2"]).plan(), [])
+
+    def test_relocating_shards(self):
+        cluster = ClusterLayout.from_cat(
+            [
+                {
+                    "index": "logs",
+                    "shard": "0",
+                    "prirep": "p",
+                    "state": "RELOCATING",
+                    "node": "es-1 -> 10.0.0.2 abcd es-2",
+                    "store": "10",
+                },
+            ],
+            [{"node": "es-1"}, {"node": "es-2"}, {"node": "UNASSIGNED"}],
+        )
+
+        self.assertEqual(sorted(cluster.nodes), ["es-1", "es-2"])
+        # Already moving : it isn't moved again
+        self.assertEqual(cluster.nodes["es-1"].shards, [])
+        self.assertEqual(cluster.holders[("logs", "0")], {"es-1", "es-2"})
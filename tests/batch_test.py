@@ -0,0 +1,106 @@
+import threading
+import time
+
+from elastic_transport import ApiResponseMeta, ConnectionTimeout, HttpHeaders, NodeConfig
+from elasticsearch import BadRequestError, NotFoundError
+
+from esctl.batch import BatchRunner, RateLimiter, chunks
+
+from .base_test_class import EsctlTestCase
+
+
+def api_error(error_class, status):
+    meta = ApiResponseMeta(status, "1.1", HttpHeaders(), 0.0, NodeConfig("http", "localhost", 9200))
+    return error_class(str(status), meta, {})
+
+
+class TestChunks(EsctlTestCase):
+    def test_chunks_by_size(self):
+        self.assertEqual(chunks(["a", "b", "c", "d", "e"], 2), [["a", "b"], ["c", "d"], ["e"]])
+        self.assertEqual(chunks([], 2), [])
+
+    def test_chunks_by_length(self):
+        # "aaa,bbb" is 7 characters long, adding ",ccc" would make it 11
+        self.assertEqual(chunks(["aaa", "bbb", "ccc"], 10, max_length=10), [["aaa", "bbb"], ["ccc"]])
+
+
+class TestRateLimiter(EsctlTestCase):
+    def test_calls_are_spaced(self):
+        limiter = RateLimiter(20)
+        start = time.monotonic()
+
+        threads = [threading.Thread(target=limiter.wait) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # The first call is immediate, the four others wait 50ms each
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_no_limit(self):
+        limiter = RateLimiter(None)
+        start = time.monotonic()
+
+        for _ in range(100):
+            limiter.wait()
+
+        self.assertLess(time.monotonic() - start, 0.1)
+
+
+class TestBatchRunner(EsctlTestCase):
+    def test_transient_failures_are_retried(self):
+        calls = []
+
+        def operation(index):
+            calls.append(index)
+            if len(calls) == 1:
+                raise ConnectionTimeout("timed out")
+            return {"acknowledged": True}
+
+        (result,) = BatchRunner(operation, backoff=0).run([["a", "b"]])
+
+        self.assertTrue(result.succeeded)
+        self.assertEqual(result.attempts, 2)
+        self.assertEqual(calls, ["a,b", "a,b"])
+
+    def test_other_failures_are_not_retried(self):
+        def operation(index):
+            raise api_error(BadRequestError, 400)
+
+        results = BatchRunner(operation, backoff=0).run([["a"], ["b"]])
+
+        self.assertEqual([result.attempts for result in results], [1, 1])
+        self.assertEqual([result.error.status_code for result in results], [400, 400])
+
+    def test_retry_finding_the_batch_already_done(self):
+        errors = [ConnectionTimeout("timed out"), api_error(NotFoundError, 404)]
+
+        def operation(index):
+            raise errors.pop(0)
+
+        (result,) = BatchRunner(
+            operation,
+            backoff=0,
+            already_done=lambda error: getattr(error, "status_code", None) == 404,
+        ).run([["a"]])
+
+        self.assertTrue(result.succeeded)
+        self.assertEqual(result.attempts, 2)
+
+    def test_first_attempt_is_never_already_done(self):
+        def operation(index):
+            raise api_error(NotFoundError, 404)
+
+        (result,) = BatchRunner(operation, backoff=0, already_done=lambda error: True).run([["a"]])
+
+        self.assertFalse(result.succeeded)
+
+    def test_every_batch_is_reported(self):
+        done = []
+
+        BatchRunner(lambda index: index, workers=3, on_done=lambda result, count: done.append(count)).run(
+            chunks([str(i) for i in range(10)], 1),
+        )
+
+        self.assertEqual(done, list(range(1, 11)))
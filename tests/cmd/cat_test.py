@@ -0,0 +1,257 @@
+import io
+import json
+import time
+import unittest.mock
+
+from esctl.cmd.cat import CatAllocation, CatShards, CatThreadpool
+from esctl.cmd.cluster import ClusterBalance, ClusterHealth
+from esctl.cmd.settings import ClusterSettingsApply
+from esctl.config import Context
+from esctl.elasticsearch import Client
+from esctl.shards import ShardMatrix
+from esctl.watch import strip_ansi
+
+from ..base_test_class import EsctlTestCase
+from ..stub_elasticsearch import StubElasticsearch, dead_server_url
+
+
+class TestCatShards(EsctlTestCase):
+    def test_transform_groups_shards_by_index(self):
+        shards = [
+            {"index": "bar", "node": "node-1", "shard": "0", "prirep": "p"},
+            {"index": "bar", "node": "node-2", "shard": "0", "prirep": "r"},
+            {"index": "foo", "node": "node-2", "shard": "0", "prirep": "p"},
+            {"index": "foo", "node": None, "shard": "0", "prirep": "r"},
+        ]
+
+        self.assertEqual(
+            list(CatShards(self.app, []).transform(shards, ["node-1", "node-2"])),
+            [
+                {"index": "bar", "node-1": "0p", "node-2": "0r"},
+                {"index": "foo", "node-1": "", "node-2": "0p", "UNASSIGNED": "0r"},
+            ],
+        )
+
+    def test_shards_on_the_same_node_are_all_shown(self):
+        shards = [
+            {"index": "bar", "node": "node-1", "shard": "0", "prirep": "p"},
+            {"index": "bar", "node": "node-1", "shard": "1", "prirep": "p"},
+            {"index": "bar", "node": "node-1 -> 10.0.0.2 abcd node-2", "shard": "1", "prirep": "r"},
+        ]
+
+        self.assertEqual(
+            list(CatShards(self.app, []).transform(shards, ["node-1", "node-2"])),
+            [{"index": "bar", "node-1": "0p 1p 1r", "node-2": ""}],
+        )
+
+
+class TestShardMatrix(EsctlTestCase):
+    def setUp(self):
+        super().setUp()
+        shards = [
+            {"index": "bar", "node": "node-1", "shard": "0", "prirep": "p"},
+            {"index": "bar", "node": "node-1", "shard": "1", "prirep": "p"},
+            {"index": "bar", "node": "node-1", "shard": "2", "prirep": "p"},
+            {"index": "bar", "node": "node-2", "shard": "0", "prirep": "r"},
+            {"index": "foo", "node": "node-2", "shard": "0", "prirep": "p"},
+            {"index": "foo", "node": "node-3", "shard": "0", "prirep": "r"},
+            {"index": "qux", "node": None, "shard": "0", "prirep": "p"},
+        ]
+        self.matrix = ShardMatrix.from_shards(shards, ["node-1", "node-2", "node-3"])
+
+    def test_per_node(self):
+        self.assertEqual(
+            self.matrix.per_node(),
+            [
+                {"node": "node-1", "shards": 3, "primaries": 3, "replicas": 0},
+                {"node": "node-2", "shards": 2, "primaries": 1, "replicas": 1},
+                {"node": "node-3", "shards": 1, "primaries": 0, "replicas": 1},
+                {"node": "UNASSIGNED", "shards": 1, "primaries": 1, "replicas": 0},
+            ],
+        )
+
+    def test_skewed_indices(self):
+        self.assertEqual(
+            self.matrix.skewed_indices(2),
+            [
+                # 4 shards on 3 nodes would be 2 per node at most
+                {"index": "bar", "shards": 4, "nodes": 2, "max_per_node": 3, "skew": 1},
+                {"index": "foo", "shards": 2, "nodes": 2, "max_per_node": 1, "skew": 0},
+            ],
+        )
+
+    def test_rows_of_some_nodes(self):
+        self.assertTrue(self.matrix.has_unassigned())
+        self.assertEqual(list(self.matrix.rows(["node-3"])), [{"index": "foo", "node-3": "0r"}])
+
+    def test_aggregates_without_numpy(self):
+        per_node, skewed = self.matrix.per_node(), self.matrix.skewed_indices(3)
+
+        with unittest.mock.patch("esctl.shards._numpy", return_value=None):
+            self.assertEqual(self.matrix.per_node(), per_node)
+            self.assertEqual(self.matrix.skewed_indices(3), skewed)
+
+
+class TestCatThreadpoolWatch(EsctlTestCase):
+    def test_rejections_rate(self):
+        rejected = iter(["3", "13"])
+
+        def thread_pools(method, path):
+            return [{"node_name": "es-1", "name": "write", "active": "0", "queue": "0", "rejected": next(rejected)}]
+
+        ticks = iter([None, KeyboardInterrupt()])
+
+        def wait(schedule):
+            tick = next(ticks)
+            if tick is not None:
+                raise tick
+
+        with StubElasticsearch({"/_cat/thread_pool": thread_pools}) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+            self.app.stdout = io.StringIO()
+            cmd = CatThreadpool(self.app, [], cmd_name="cat thread-pool")
+            parsed_args = cmd.get_parser("cat thread-pool").parse_args(
+                ["--watch", "5", "--headers", "node_name,name,rejected"]
+            )
+
+            with unittest.mock.patch("esctl.watch.Schedule.wait", wait):
+                self.assertEqual(cmd.run(parsed_args), 0)
+
+        frames = self.app.stdout.getvalue().split("\n\n")
+        self.assertTrue(frames[0].startswith("Every 5s: esctl cat thread-pool"))
+        self.assertEqual(
+            strip_ansi(frames[1]).splitlines()[0].split(), ["Node", "Name", "Name", "Rejected", "Rejected/s"]
+        )
+        # The second run gives the rate of rejections since the first one
+        self.assertRegex(strip_ansi(frames[3]).splitlines()[1], r"^es-1\s+write\s+13\s+[0-9.]+$")
+        self.assertEqual(len(stub.requests), 2)
+
+
+class TestSeveralContexts(EsctlTestCase):
+    def run_on_contexts(self, cmd_class, cmd_name, servers, argv):
+        self.app.clients = [Client(Context(name, None, {"servers": [url]}, {})) for name, url in servers]
+        self.app.client = self.app.clients[0]
+        self.app.options.context_concurrency = 2
+        self.app.stdout = io.StringIO()
+        cmd = cmd_class(self.app, [], cmd_name=cmd_name)
+        parsed_args = cmd.get_parser(cmd_name).parse_args(argv)
+
+        return cmd.run(parsed_args), self.app.stdout.getvalue()
+
+    def test_rows_are_merged_with_a_context_column(self):
+        with (
+            StubElasticsearch({"/_cat/allocation": [{"node": "eu-1", "shards": "10"}]}) as eu,
+            StubElasticsearch({"/_cat/allocation": [{"node": "us-1", "shards": "4"}, {"node": "us-2"}]}) as us,
+        ):
+            result, output = self.run_on_contexts(
+                CatAllocation,
+                "cat allocation",
+                [("eu", eu.url), ("us", us.url)],
+                ["-f", "csv", "-c", "Node", "-c", "Shards"],
+            )
+
+        self.assertEqual(result, 0)
+        self.assertEqual(
+            output.splitlines(),
+            ['"Context","Shards","Node"', '"eu","10","eu-1"', '"us","4","us-1"', '"us","","us-2"'],
+        )
+
+    def test_unreachable_context_is_reported(self):
+        with StubElasticsearch({"/_cluster/health": {"cluster_name": "eu", "status": "green"}}) as eu:
+            with self.assertLogs("esctl.commands", level="ERROR") as logs:
+                result, output = self.run_on_contexts(
+                    ClusterHealth,
+                    "cluster health",
+                    [("eu", eu.url), ("down", dead_server_url())],
+                    ["-f", "json"],
+                )
+
+        self.assertEqual(result, 0)
+        self.assertEqual(json.loads(output), [{"Context": "eu", "cluster_name": "eu", "status": "green"}])
+        self.assertIn("down", logs.output[0])
+
+    def test_commands_changing_the_cluster_are_refused(self):
+        with StubElasticsearch({}) as eu, StubElasticsearch({}) as us:
+            for cmd_class, cmd_name, argv in [
+                (ClusterSettingsApply, "cluster settings apply", ["--file", "/dev/null"]),
+                (ClusterBalance, "cluster balance", ["--execute"]),
+            ]:
+                with self.subTest(cmd_name=cmd_name), self.assertRaises(SystemExit):
+                    self.run_on_contexts(cmd_class, cmd_name, [("eu", eu.url), ("us", us.url)], argv)
+
+        self.assertEqual(eu.requests + us.requests, [])
+
+    def test_pre_commands_start_together(self):
+        self.app.contexts = [
+            Context(name, None, {}, {}, pre_commands=[{"command": "sleep 0.5", "wait_for_exit": True}])
+            for name in ["eu", "us"]
+        ]
+        cmd = ClusterHealth(self.app, [], cmd_name="cluster health")
+
+        started = time.monotonic()
+        self.app.prepare_to_run_command(cmd)
+        elapsed = time.monotonic() - started
+        self.app.clean_up(cmd, 0, None)
+
+        self.assertTrue(all("process" in context.pre_commands[0] for context in self.app.contexts))
+        self.assertLess(elapsed, 0.9)
+
+    def test_dry_runs_share_stdin(self):
+        settings = {"persistent": {}, "transient": {}, "defaults": {"cluster.routing.allocation.enable": "all"}}
+
+        with (
+            StubElasticsearch({"/_cluster/settings": settings}) as eu,
+            StubElasticsearch({"/_cluster/settings": settings}) as us,
+            unittest.mock.patch("sys.stdin", io.StringIO("persistent:\n  cluster.routing.allocation.enable: none\n")),
+        ):
+            result, output = self.run_on_contexts(
+                ClusterSettingsApply,
+                "cluster settings apply",
+                [("eu", eu.url), ("us", us.url)],
+                ["--dry-run", "-f", "csv", "-c", "Setting", "-c", "After"],
+            )
+
+        self.assertEqual(result, 0)
+        self.assertEqual(
+            output.splitlines(),
+            [
+                '"Context","Setting","After"',
+                '"eu","cluster.routing.allocation.enable","none"',
+                '"us","cluster.routing.allocation.enable","none"',
+            ],
+        )
+
+
+class TestCatShardsRequests(EsctlTestCase):
+    def test_shards_and_nodes_are_fetched_at_once(self):
+        responses = {
+            "/_cat/shards": [{"index": "foo", "node": "es-1", "shard": "0", "prirep": "p", "state": "STARTED"}],
+            "/_cat/nodes": [{"name": "es-1"}, {"name": "es-2"}],
+        }
+
+        with StubElasticsearch(responses, delay=0.5) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+            cmd = CatShards(self.app, [], cmd_name="cat shards")
+            cmd.formatter = unittest.mock.MagicMock()
+            parsed_args = cmd.get_parser("cat shards").parse_args([])
+
+            started = time.monotonic()
+            columns, rows = cmd.take_action(parsed_args)
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(columns, ("Index", "es-1", "es-2"))
+        self.assertEqual(list(rows), [("foo", "0p", "")])
+        self.assertEqual(len(stub.requests), 2)
+        # Both answers took 0.5s to come, but they were waited for together
+        self.assertLess(elapsed, 0.9)
+
+    def test_first_error_is_raised(self):
+        cmd = CatShards(self.app, [])
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaisesRegex(ValueError, "boom"):
+            cmd.concurrently(lambda: 1, fail, lambda: 3)
+
+        self.assertEqual(cmd.concurrently(lambda: 1, lambda: 2), [1, 2])
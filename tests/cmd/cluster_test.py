@@ -0,0 +1,64 @@
+from esctl.cmd.cluster import ClusterBalance
+from esctl.config import Context
+from esctl.elasticsearch import Client
+
+from ..base_test_class import EsctlTestCase
+from ..stub_elasticsearch import StubElasticsearch
+
+CAT_SHARDS = [
+    {"index": "logs", "shard": str(number), "prirep": "p", "state": "STARTED", "node": "es-1", "store": "100"}
+    for number in range(4)
+] + [{"index": "logs", "shard": "4", "prirep": "p", "state": "UNASSIGNED", "node": None, "store": None}]
+
+CAT_ALLOCATION = [
+    {"node": "es-1", "disk.used": "400", "disk.total": "10000"},
+    {"node": "es-2", "disk.used": "0", "disk.total": "10000"},
+    {"node": "UNASSIGNED"},
+]
+
+
+class TestClusterBalance(EsctlTestCase):
+    def run_balance(self, *argv, health=None):
+        responses = {
+            "/_cat/shards": CAT_SHARDS,
+            "/_cat/allocation": CAT_ALLOCATION,
+            "/_cluster/health": health or {"timed_out": False, "relocating_shards": 0},
+        }
+
+        with StubElasticsearch(responses) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+            cmd = ClusterBalance(self.app, [])
+            cmd.formatter = cmd._formatter_plugins["json"].obj
+            columns, rows = cmd.take_action(cmd.get_parser("cluster balance").parse_args(argv))
+
+            return columns, list(rows), stub
+
+    def test_moves_are_only_shown(self):
+        columns, rows, stub = self.run_balance()
+
+        self.assertEqual(columns, ("Index", "Shard", "Primary/Replica", "Store", "From", "To"))
+        self.assertEqual([row[-2:] for row in rows], [("es-1", "es-2"), ("es-1", "es-2")])
+        self.assertNotIn("/_cluster/reroute", [path.split("?")[0] for _, path in stub.requests])
+
+    def test_moves_are_executed_in_batches(self):
+        _, rows, stub = self.run_balance("--execute", "--batch-size", "1", "--interval", "0")
+
+        reroutes = [body for (_, path), body in zip(stub.requests, stub.bodies) if path.startswith("/_cluster/reroute")]
+        self.assertEqual(len(reroutes), 2)
+        self.assertEqual(reroutes[0]["commands"][0]["move"]["from_node"], "es-1")
+
+    def test_execution_stops_when_relocations_time_out(self):
+        with self.assertRaises(SystemExit):
+            self.run_balance(
+                "--execute",
+                "--batch-size",
+                "1",
+                "--interval",
+                "0",
+                health={"timed_out": True, "relocating_shards": 1},
+            )
+
+    def test_nodes_view(self):
+        _, rows, _ = self.run_balance("--view", "nodes")
+
+        self.assertEqual([row[:3] for row in rows], [("es-1", 4, 2), ("es-2", 0, 2)])
@@ -1,6 +1,15 @@
-from esctl.cmd.index import IndexReindex
+import io
+import json
+import os
+import tempfile
+import unittest.mock
+
+from esctl.cmd.index import IndexClose, IndexList, IndexReindex, IndexReindexMany
+from esctl.config import Context
+from esctl.elasticsearch import Client
 
 from ..base_test_class import EsctlTestCase
+from ..stub_elasticsearch import StubElasticsearch
 
 
 class TestIndexReindex(EsctlTestCase):
@@ -34,3 +43,193 @@ class TestIndexReindex(EsctlTestCase):
                 index_reindex_cmd._build_request_body(case.get("input")),
                 case.get("expected_output"),
             )
+
+
+class TestIndexList(EsctlTestCase):
+    def take_action(self, *argv):
+        indices = [
+            {"index": "foo", "health": "green", "status": "open", "docs.count": "12"},
+            {"index": "bar", "health": "yellow", "status": "open", "docs.count": "3"},
+        ]
+
+        with StubElasticsearch({"/_cat/indices": indices}) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = IndexList(self.app, [])
+            cmd.formatter = cmd._formatter_plugins["table"].obj
+
+            return cmd.take_action(cmd.get_parser("index list").parse_args(argv))
+
+    def test_jmespath_objects(self):
+        # The query runs on the raw response, before colors are added
+        self.assertEqual(
+            self.take_action("--jmespath", "[?health == 'yellow'].{name: index, docs: \"docs.count\"}"),
+            (("name", "docs"), (("bar", "3"),)),
+        )
+
+    def test_jmespath_values(self):
+        self.assertEqual(
+            self.take_action("--jmespath", "[].index"),
+            (("Result",), (("foo",), ("bar",))),
+        )
+
+
+CAT_INDICES = [
+    {"index": "logs-3", "status": "open"},
+    {"index": "logs-1", "status": "open"},
+    {"index": "logs-2", "status": "close"},
+    {"index": "logs-4", "status": "open"},
+]
+
+
+class TestIndexClose(EsctlTestCase):
+    def run_close(self, *argv, stdin=""):
+        with StubElasticsearch({"/_cat/indices/logs-*": CAT_INDICES}) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = IndexClose(self.app, [])
+            parsed_args = cmd.get_parser("index close").parse_args(argv)
+
+            with unittest.mock.patch("sys.stdin", io.StringIO(stdin)), unittest.mock.patch("builtins.print"):
+                returncode = cmd.take_action(parsed_args)
+
+            return returncode, sorted(stub.requests)
+
+    def test_single_request(self):
+        _, requests = self.run_close("logs-*")
+
+        self.assertEqual(requests, [("POST", "/logs-*/_close")])
+
+    def test_batches_of_open_indices(self):
+        returncode, requests = self.run_close("logs-*", "--batch-size", "2", "--rate", "0")
+
+        self.assertIsNone(returncode)
+        self.assertEqual([path.split("?")[0] for method, path in requests if method == "GET"], ["/_cat/indices/logs-*"])
+        self.assertNotIn("expand_wildcards", requests[0][1])
+        self.assertEqual(
+            [path for method, path in requests if method == "POST"],
+            ["/logs-1,logs-3/_close", "/logs-4/_close"],
+        )
+
+    def test_expand_wildcards(self):
+        _, requests = self.run_close("logs-*", "--batch-size", "2", "--rate", "0", "--expand-wildcards", "all")
+
+        self.assertIn("expand_wildcards=all", requests[0][1])
+
+    def test_invalid_batch_options(self):
+        parser = IndexClose(self.app, []).get_parser("index close")
+
+        for option, value in [("--workers", "0"), ("--batch-size", "0"), ("--retries", "-1"), ("--rate", "-1")]:
+            with self.subTest(option=option), self.assertRaises(SystemExit), unittest.mock.patch("sys.stderr"):
+                parser.parse_args(["logs-*", option, value])
+
+    def test_names_from_stdin(self):
+        _, requests = self.run_close("-", "--rate", "0", stdin="foo\nbar,baz\n")
+
+        self.assertEqual(requests, [("POST", "/foo,bar,baz/_close")])
+
+
+class TestIndexReindexTask(EsctlTestCase):
+    def run_reindex(self, *argv):
+        responses = {
+            "/_reindex": {"task": "abc:42"},
+            "/_tasks/abc%3A42": {
+                "completed": True,
+                "task": {"id": 42, "status": {"total": 10, "created": 10}},
+                "response": {"total": 10, "created": 10, "failures": []},
+            },
+        }
+
+        with StubElasticsearch(responses) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = IndexReindex(self.app, [])
+            parsed_args = cmd.get_parser("index reindex").parse_args(["foo", "bar", *argv])
+
+            with unittest.mock.patch("builtins.print") as print_mock:
+                returncode = cmd.take_action(parsed_args)
+
+            return returncode, stub.requests, print_mock
+
+    def test_async(self):
+        returncode, requests, print_mock = self.run_reindex("--async", "--slices", "auto")
+
+        self.assertIsNone(returncode)
+        self.assertEqual(requests, [("POST", "/_reindex?slices=auto&wait_for_completion=false")])
+        print_mock.assert_called_once_with("abc:42")
+
+    def test_task_is_watched(self):
+        returncode, requests, print_mock = self.run_reindex("--requests-per-second", "500")
+
+        self.assertIsNone(returncode)
+        self.assertEqual(
+            requests,
+            [("POST", "/_reindex?requests_per_second=500.0&wait_for_completion=false"), ("GET", "/_tasks/abc%3A42")],
+        )
+        print_mock.assert_called_once_with({"total": 10, "created": 10, "failures": []})
+
+
+class TestIndexReindexMany(EsctlTestCase):
+    def run_reindex_many(self, state_file, source_pattern="logs-2024.*"):
+        tasks = iter(range(1, 100))
+
+        def reindex(method, path):
+            return {"task": f"abc:{next(tasks)}"}
+
+        def task(method, path):
+            return {"completed": True, "response": {"total": 1, "took": 10, "failures": []}}
+
+        responses = {
+            "/_cat/indices/logs-2024.*": [{"index": "logs-2024.01.02"}, {"index": "logs-2024.01.01"}],
+            "/_cat/thread_pool/write,search": [],
+            "/_cluster/pending_tasks": {"tasks": []},
+            "/_reindex": reindex,
+            "/_tasks/abc%3A1": task,
+            "/_tasks/abc%3A2": task,
+        }
+
+        with StubElasticsearch(responses) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = IndexReindexMany(self.app, [], cmd_name="index reindex-many")
+            parsed_args = cmd.get_parser("index reindex-many").parse_args(
+                [source_pattern, "logs-v2-2024.*", "--state-file", state_file, "--interval", "0", "--concurrency", "1"],
+            )
+
+            # Like the command line does
+            with unittest.mock.patch("builtins.print"):
+                returncode = cmd.run(parsed_args)
+
+            return returncode, stub
+
+    def test_indices_are_reindexed_and_checkpointed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_file = os.path.join(directory, "state.json")
+            returncode, stub = self.run_reindex_many(state_file)
+
+            self.assertEqual(returncode, 0)
+            self.assertEqual(
+                [body.get("dest").get("index") for body in stub.bodies if body is not None],
+                ["logs-v2-2024.01.01", "logs-v2-2024.01.02"],
+            )
+
+            with open(state_file) as state:
+                self.assertEqual(
+                    {source: index.get("state") for source, index in json.load(state).get("indices").items()},
+                    {"logs-2024.01.01": "done", "logs-2024.01.02": "done"},
+                )
+
+            # Everything is done already : nothing is reindexed again
+            _, stub = self.run_reindex_many(state_file)
+
+            self.assertEqual([path for method, path in stub.requests if method == "POST"], [])
+
+    def test_patterns_which_cant_be_mapped_are_refused(self):
+        with tempfile.TemporaryDirectory() as directory:
+            state_file = os.path.join(directory, "state.json")
+
+            with self.assertRaises(SystemExit) as exit, self.assertLogs("esctl", level="CRITICAL"):
+                self.run_reindex_many(state_file, source_pattern="logs-2024.*,logs-2023.*")
+
+            self.assertEqual(exit.exception.code, 1)
+            self.assertFalse(os.path.exists(state_file))
@@ -67,6 +67,8 @@ def test_transform(mock_request: MagicMock, capsys):
     parsed_args.columns = ("Kind", "Level", "Message", "Doc")
     parsed_args.formatter = "json"
     parsed_args.sort_columns = []
+    parsed_args.jmespath = None
+    parsed_args.watch = None
 
     migration_deprecations_cmd.run(parsed_args)
 
@@ -0,0 +1,80 @@
+import unittest.mock
+from urllib.parse import parse_qs, urlsplit
+
+from esctl.cmd.node import NodeStats
+from esctl.config import Context
+from esctl.elasticsearch import Client
+
+from ..base_test_class import EsctlTestCase
+from ..stub_elasticsearch import StubElasticsearch
+
+NODES_STATS = {
+    "nodes": {
+        "abc": {"name": "es-1", "jvm": {"mem": {"heap_used_percent": 42}}},
+        "def": {"name": "es-2", "jvm": {"mem": {"heap_used_percent": 64}}},
+    },
+}
+
+
+class TestNodeStats(EsctlTestCase):
+    def run_node_stats(self, *argv):
+        with StubElasticsearch({"/_nodes/stats/jvm": NODES_STATS}) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = NodeStats(self.app, [])
+            parsed_args = cmd.get_parser("node stats").parse_args(argv)
+            cmd.formatter = cmd._formatter_plugins["json"].obj
+
+            result = cmd.take_action(parsed_args)
+            path, query = urlsplit(stub.requests[0][1])[2:4]
+
+            return result, path, parse_qs(query)
+
+    def test_jmespath_is_pushed_down(self):
+        result, path, query = self.run_node_stats("--jmespath", "values(@)[?jvm.mem.heap_used_percent > `50`].name")
+
+        self.assertEqual(result, (("Result",), (["es-2"],)))
+        self.assertEqual(path, "/_nodes/stats/jvm")
+        self.assertEqual(query["filter_path"], ["nodes.*.jvm.mem.heap_used_percent,nodes.*.name"])
+
+    def test_fields_are_pushed_down(self):
+        _, path, query = self.run_node_stats("--fields", "jvm.mem.heap_used_percent")
+
+        self.assertEqual(path, "/_nodes/stats/jvm")
+        self.assertEqual(query["filter_path"], ["nodes.*.jvm.mem.heap_used_percent"])
+
+
+class TestNodeStatsRate(EsctlTestCase):
+    def test_rates(self):
+        totals = iter([100, 400])
+
+        def nodes_stats(method, path):
+            total = next(totals)
+            return {
+                "nodes": {
+                    "abc": {"name": "es-1", "timestamp": total * 10, "indices": {"indexing": {"index_total": total}}}
+                }
+            }
+
+        with StubElasticsearch({"/_nodes/stats/indices/indexing": nodes_stats}) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = NodeStats(self.app, [])
+            parsed_args = cmd.get_parser("node stats").parse_args(
+                ["--rate", "0.01", "--fields", "indices.indexing.index_total", "--no-pretty"],
+            )
+            cmd.formatter = cmd._formatter_plugins["json"].obj
+
+            result = cmd.take_action(parsed_args)
+            query = parse_qs(urlsplit(stub.requests[0][1])[3])
+
+        self.assertEqual(result, (("es-1.indices.indexing.index_total/s",), (100.0,)))
+        self.assertEqual(query["filter_path"], ["nodes.*.indices.indexing.index_total,nodes.*.name,nodes.*.timestamp"])
+        self.assertEqual(len(stub.requests), 2)
+
+    def test_invalid_sampling(self):
+        parser = NodeStats(self.app, []).get_parser("node stats")
+
+        for argv in [["--rate", "0"], ["--rate", "-1"], ["--rate", "1", "--samples", "1"]]:
+            with self.subTest(argv=argv), self.assertRaises(SystemExit), unittest.mock.patch("sys.stderr"):
+                parser.parse_args(argv)
@@ -0,0 +1,66 @@
+import io
+import os
+import tempfile
+import unittest.mock
+
+from esctl.cmd.record import Record, Replay, parse_time
+from esctl.config import Context
+from esctl.elasticsearch import Client
+from esctl.watch import strip_ansi
+
+from ..base_test_class import EsctlTestCase
+from ..stub_elasticsearch import StubElasticsearch
+
+RESPONSES = {
+    "/_cluster/health": {"cluster_name": "test", "status": "yellow", "number_of_nodes": 3},
+    "/_nodes/stats": {"nodes": {"abc": {"name": "es-1", "jvm": {"mem": {"heap_used_percent": 42}}}}},
+    "/_cat/thread_pool": [{"node_name": "es-1", "name": "write", "active": "0", "queue": "0", "rejected": "7"}],
+    "/_cat/allocation": [{"node": "es-1", "shards": "10"}],
+}
+
+
+class TestRecordAndReplay(EsctlTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.directory.name, "record.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def record(self):
+        with StubElasticsearch(RESPONSES) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+            cmd = Record(self.app, [])
+            parsed_args = cmd.get_parser("record").parse_args(
+                ["--file", self.file, "--interval", "0.05", "--duration", "0.12"],
+            )
+
+            with unittest.mock.patch("builtins.print"):
+                cmd.take_action(parsed_args)
+
+            return stub.requests
+
+    def replay(self, *argv):
+        self.app.stdout = io.StringIO()
+        cmd = Replay(self.app, [])
+        parsed_args = cmd.get_parser("replay").parse_args(["--file", self.file, *argv])
+
+        self.assertEqual(cmd.take_action(parsed_args), 0)
+
+        return self.app.stdout.getvalue()
+
+    def test_recorded_commands_are_replayed(self):
+        requests = self.record()
+
+        self.assertEqual({path.split("?")[0] for _, path in requests}, set(RESPONSES))
+        self.assertIn("| write | 7 ", strip_ansi(self.replay("cat", "thread-pool", "--headers", "name,rejected")))
+        self.assertIn('"status": "yellow"', self.replay("cluster", "health", "-f", "json"))
+        self.assertIn("42", self.replay("node", "stats", "--fields", "jvm.mem.heap_used_percent"))
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time("1700000000"), 1700000000.0)
+
+        with unittest.mock.patch("time.time", return_value=1000.0):
+            self.assertEqual(parse_time("10m"), 400.0)
+            self.assertEqual(parse_time("-1h"), -2600.0)
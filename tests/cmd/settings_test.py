@@ -0,0 +1,191 @@
+import io
+import unittest.mock
+from urllib.parse import parse_qs, urlsplit
+
+from esctl.cmd.settings import ClusterSettingsApply, IndexSettingsDiff
+from esctl.config import Context
+from esctl.elasticsearch import Client
+
+from ..base_test_class import EsctlTestCase
+from ..stub_elasticsearch import StubElasticsearch
+
+CLUSTER_SETTINGS = {
+    "transient": {"cluster": {"routing": {"allocation": {"enable": "primaries"}}}},
+    "persistent": {"indices": {"recovery": {"max_bytes_per_sec": "40mb"}}},
+    "defaults": {"cluster": {"routing": {"allocation": {"enable": "all"}}}},
+}
+
+DOCUMENT = """
+transient:
+  cluster.routing.allocation.enable: primaries
+  cluster.routing.allocation.node_concurrent_recoveries: 4
+persistent:
+  indices:
+    recovery:
+      max_bytes_per_sec: 40mb
+  action.destructive_requires_name: true
+"""
+
+
+class TestClusterSettingsApply(EsctlTestCase):
+    def run_apply(self, *argv):
+        with StubElasticsearch({"/_cluster/settings": CLUSTER_SETTINGS}) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = ClusterSettingsApply(self.app, [])
+            parsed_args = cmd.get_parser("cluster settings apply").parse_args(argv)
+            cmd.formatter = cmd._formatter_plugins["json"].obj
+
+            with unittest.mock.patch("sys.stdin", io.StringIO(DOCUMENT)):
+                _, lines = cmd.take_action(parsed_args)
+
+            return list(lines), stub
+
+    def test_only_changed_settings_are_sent(self):
+        lines, stub = self.run_apply()
+
+        self.assertEqual(
+            lines,
+            [
+                ("cluster.routing.allocation.node_concurrent_recoveries", "transient", None, "4"),
+                ("action.destructive_requires_name", "persistent", None, "true"),
+            ],
+        )
+        self.assertEqual([method for method, _ in stub.requests], ["GET", "PUT"])
+        self.assertEqual(
+            parse_qs(urlsplit(stub.requests[0][1]).query)["filter_path"][0].split(","),
+            [
+                "transient.cluster.routing.allocation.enable",
+                "transient.cluster.routing.allocation.node_concurrent_recoveries",
+                "transient.indices.recovery.max_bytes_per_sec",
+                "transient.action.destructive_requires_name",
+                "persistent.cluster.routing.allocation.enable",
+                "persistent.cluster.routing.allocation.node_concurrent_recoveries",
+                "persistent.indices.recovery.max_bytes_per_sec",
+                "persistent.action.destructive_requires_name",
+                "defaults.cluster.routing.allocation.enable",
+                "defaults.cluster.routing.allocation.node_concurrent_recoveries",
+                "defaults.indices.recovery.max_bytes_per_sec",
+                "defaults.action.destructive_requires_name",
+            ],
+        )
+        self.assertEqual(
+            stub.bodies[1],
+            {
+                "transient": {"cluster.routing.allocation.node_concurrent_recoveries": "4"},
+                "persistent": {"action.destructive_requires_name": "true"},
+            },
+        )
+
+    def test_dry_run(self):
+        lines, stub = self.run_apply("--dry-run")
+
+        self.assertEqual(len(lines), 2)
+        self.assertEqual([method for method, _ in stub.requests], ["GET"])
+
+
+INDICES_SETTINGS = {
+    "logs-1": {
+        "settings": {"index.number_of_replicas": "1", "index.uuid": "a"},
+        "defaults": {"index.refresh_interval": "1s", "index.hidden": "false", "index.query.default_field": ["*"]},
+    },
+    "logs-2": {
+        "settings": {"index.number_of_replicas": "1", "index.uuid": "b"},
+        "defaults": {"index.refresh_interval": "1s", "index.hidden": "false", "index.query.default_field": ["*"]},
+    },
+    "logs-3": {
+        "settings": {"index.number_of_replicas": "2", "index.refresh_interval": "30s", "index.uuid": "c"},
+        "defaults": {"index.hidden": "false", "index.query.default_field": ["*"]},
+    },
+}
+
+INDEX_TEMPLATES = {
+    "index_templates": [
+        {
+            "name": "logs",
+            "index_template": {
+                "index_patterns": ["logs-*"],
+                "priority": 100,
+                "composed_of": ["logs-settings"],
+                # A list : indices hold the same one, so it doesn't drift
+                "template": {"settings": {"index": {"number_of_replicas": "1", "query": {"default_field": ["*"]}}}},
+            },
+        },
+        {
+            "name": "logs-one",
+            "index_template": {
+                "index_patterns": ["logs-1"],
+                "priority": 200,
+                "template": {"settings": {"index.refresh_interval": "5s"}},
+            },
+        },
+        {
+            "name": "catch-all",
+            "index_template": {"index_patterns": ["*"], "template": {"settings": {"number_of_replicas": 5}}},
+        },
+    ],
+}
+
+COMPONENT_TEMPLATES = {
+    "component_templates": [
+        {
+            "name": "logs-settings",
+            "component_template": {
+                "template": {"settings": {"index": {"number_of_replicas": 3, "refresh_interval": "1s"}}}
+            },
+        },
+    ],
+}
+
+
+class TestIndexSettingsDiff(EsctlTestCase):
+    def run_diff(self, *argv):
+        with StubElasticsearch(
+            {
+                "/logs-*/_settings/index.*": INDICES_SETTINGS,
+                "/_index_template": INDEX_TEMPLATES,
+                "/_component_template": COMPONENT_TEMPLATES,
+            },
+        ) as stub:
+            self.app.client = Client(Context("test", None, {"servers": [stub.url]}, {}))
+
+            cmd = IndexSettingsDiff(self.app, [])
+            parsed_args = cmd.get_parser("index settings diff").parse_args(argv)
+            cmd.formatter = cmd._formatter_plugins["json"].obj
+
+            return cmd.take_action(parsed_args)
+
+    def test_groups_and_differing_settings(self):
+        headers, lines = self.run_diff("logs-*")
+
+        self.assertEqual(headers, ("Group", "Count", "Indices", "index.number_of_replicas", "index.refresh_interval"))
+        self.assertEqual(list(lines), [(1, 2, "logs-1, logs-2", "1", "1s"), (2, 1, "logs-3", "2", "30s")])
+
+    def test_jmespath(self):
+        _, lines = self.run_diff("logs-*", "--jmespath", "[].indices")
+
+        self.assertEqual(lines, ((["logs-1", "logs-2"],), (["logs-3"],)))
+
+    def test_drift_from_templates(self):
+        headers, lines = self.run_diff("logs-*", "--template")
+
+        self.assertEqual(
+            headers,
+            ("Group", "Count", "Indices", "Template", "Drift", "index.number_of_replicas", "index.refresh_interval"),
+        )
+        self.assertEqual(
+            list(lines),
+            [
+                (1, 1, "logs-1", "logs-one", "index.refresh_interval=1s (template: 5s)", "1", "1s"),
+                (2, 1, "logs-2", "logs", "", "1", "1s"),
+                (
+                    3,
+                    1,
+                    "logs-3",
+                    "logs",
+                    "index.number_of_replicas=2 (template: 1)\nindex.refresh_interval=30s (template: 1s)",
+                    "2",
+                    "30s",
+                ),
+            ],
+        )
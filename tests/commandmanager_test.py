@@ -0,0 +1,21 @@
+from importlib import metadata
+
+from esctl.commandmanager import COMMANDS, LazyCommandManager
+
+from .base_test_class import EsctlTestCase
+
+
+class TestLazyCommandManager(EsctlTestCase):
+    def test_index_matches_entry_points(self):
+        entry_points = {ep.name: ep.value for ep in metadata.entry_points(group="esctl")}
+
+        self.assertEqual(COMMANDS, entry_points)
+
+    def test_find_command_loads_class(self):
+        from esctl.cmd.cluster import ClusterHealth
+
+        cmd_factory, cmd_name, sub_argv = LazyCommandManager("esctl").find_command(["cluster", "health", "--help"])
+
+        self.assertIs(cmd_factory, ClusterHealth)
+        self.assertEqual(cmd_name, "cluster health")
+        self.assertEqual(sub_argv, ["--help"])
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest.mock
+from unittest import TestCase
+
+from esctl.config import ConfigCache, ConfigFileParser
+
+
+class TestConfigCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "esctlrc.yml")
+        shutil.copy(
+            os.path.join(os.path.dirname(os.path.realpath(__file__)), "files", "valid_esctlrc.yml"),
+            self.path,
+        )
+        self.cache = ConfigCache(os.path.join(self.directory.name, "cache"))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def load(self):
+        parser = ConfigFileParser(self.cache)
+
+        with unittest.mock.patch.object(
+            ConfigFileParser,
+            "_ensure_config_file_is_valid",
+            wraps=parser._ensure_config_file_is_valid,
+        ) as validator:
+            config = parser.load_configuration(self.path)
+
+        return parser, config, validator.called
+
+    def test_unchanged_file_is_read_from_cache(self):
+        _, config, validated = self.load()
+        self.assertTrue(validated)
+
+        parser, cached_config, validated = self.load()
+        self.assertFalse(validated)
+        self.assertEqual(cached_config, config)
+        self.assertEqual(parser.create_context("foobar").cluster, config["clusters"]["foobar"])
+
+    def test_modified_file_invalidates_cache(self):
+        self.load()
+
+        with open(self.path, "a") as config_file:
+            config_file.write("\n# modified\n")
+
+        _, _, validated = self.load()
+        self.assertTrue(validated)
+
+    def test_write_config_file_invalidates_cache(self):
+        parser, config, _ = self.load()
+        config["default-context"] = "foobar"
+        parser.write_config_file(dict(config))
+
+        self.assertIsNone(self.cache.load(self.path))
+
+
+class TestResolveContextNames(TestCase):
+    def setUp(self):
+        self.parser = ConfigFileParser()
+        self.parser.contexts = {"prod-eu": {}, "prod-us": {}, "staging": {}}
+
+    def test_default_context(self):
+        self.assertEqual(self.parser.resolve_context_names(None), [None])
+
+    def test_list_and_globs(self):
+        self.assertEqual(self.parser.resolve_context_names("staging,prod-*"), ["staging", "prod-eu", "prod-us"])
+        self.assertEqual(self.parser.resolve_context_names("prod-eu,prod-*"), ["prod-eu", "prod-us"])
+
+    def test_all(self):
+        self.assertEqual(self.parser.resolve_context_names("all"), ["prod-eu", "prod-us", "staging"])
+
+    def test_nothing_matches(self):
+        with self.assertRaises(SystemExit):
+            self.parser.resolve_context_names("dev-*")
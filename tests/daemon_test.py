@@ -0,0 +1,84 @@
+import os
+import tempfile
+import threading
+import unittest.mock
+
+from esctl import launcher
+from esctl.daemon import Daemon
+
+from .base_test_class import EsctlTestCase
+
+
+class TestDaemon(EsctlTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.socket = os.path.join(self.directory.name, "daemon.sock")
+        self.daemon = Daemon(self.socket)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+
+        while not os.path.exists(self.socket):
+            pass
+
+    def tearDown(self):
+        launcher.request({"action": "stop"}, self.socket)
+        self.thread.join()
+        self.directory.cleanup()
+
+    def run_command(self, *argv):
+        return launcher.request(
+            {"action": "run", "argv": ["--config", self.app.options.config_file, *argv]},
+            self.socket,
+        )
+
+    def test_run_command(self):
+        response = self.run_command("config", "context", "list", "-f", "value")
+
+        self.assertEqual(response.get("returncode"), 0)
+        self.assertIn("foobar", response.get("stdout"))
+
+    def test_session_is_reused(self):
+        self.run_command("config", "show")
+        session = next(iter(self.daemon.sessions.values()))
+        self.run_command("config", "show")
+
+        self.assertIs(next(iter(self.daemon.sessions.values())), session)
+        self.assertEqual(launcher.request({"action": "status"}, self.socket).get("requests"), 2)
+
+    def test_unknown_command(self):
+        response = self.run_command("foo", "bar")
+
+        self.assertNotEqual(response.get("returncode"), 0)
+        self.assertIn("foo bar", response.get("stdout") + response.get("stderr"))
+
+    def test_failing_command_doesnt_stop_the_daemon(self):
+        from elastic_transport import ConnectionError
+
+        with unittest.mock.patch("esctl.daemon.DaemonEsctl.run", side_effect=ConnectionError("connection refused")):
+            response = self.run_command("cluster", "health", "--debug")
+
+        self.assertEqual(response.get("returncode"), 1)
+        self.assertIn("ConnectionError", response.get("stderr"))
+        self.assertEqual(self.run_command("config", "show").get("returncode"), 0)
+
+    def test_interactive_mode_runs_in_process(self):
+        self.assertTrue(self.run_command().get("run_in_process"))
+
+    def test_forward_falls_back_to_in_process(self):
+        with unittest.mock.patch("esctl.launcher.request", return_value={"run_in_process": True}):
+            self.assertIsNone(launcher.forward(["cluster", "health"]))
+
+    def test_commands_running_in_process(self):
+        for argv in [
+            ["daemon", "status"],
+            ["index", "reindex", "foo", "bar"],
+            ["index", "reindex-many", "-"],
+            ["task", "watch", "abc:42"],
+            ["cat", "nodes", "--watch", "2"],
+            ["cat", "nodes", "--watch=2"],
+            ["node", "stats", "--rate", "5"],
+            ["record", "--interval", "10"],
+        ]:
+            with self.subTest(argv=argv):
+                self.assertFalse(launcher.should_forward(argv))
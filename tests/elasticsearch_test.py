@@ -0,0 +1,36 @@
+import time
+import unittest.mock
+from concurrent.futures import ThreadPoolExecutor
+
+from esctl.cmd.config import ConfigShow
+from esctl.elasticsearch import Client
+
+from .base_test_class import EsctlTestCase
+
+
+class TestLazyClient(EsctlTestCase):
+    def test_client_is_not_built_by_initialize_app(self):
+        self.assertIsInstance(self.app.client, Client)
+        self.assertIsNone(self.app.client._es)
+
+    def test_client_is_built_once(self):
+        es = self.app.client.es
+
+        self.assertIs(self.app.client.es, es)
+        self.assertIs(ConfigShow(self.app, []).es, es)
+
+    def test_client_is_built_once_by_concurrent_threads(self):
+        client = Client(self.app.client.context)
+
+        def initialize():
+            time.sleep(0.1)
+            return object()
+
+        with (
+            unittest.mock.patch.object(client, "initialize_elasticsearch_connection", side_effect=initialize) as init,
+            ThreadPoolExecutor(max_workers=8) as executor,
+        ):
+            clients = list(executor.map(lambda _: client.es, range(8)))
+
+        self.assertEqual(init.call_count, 1)
+        self.assertTrue(all(es is clients[0] for es in clients))
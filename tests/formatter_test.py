@@ -1,4 +1,9 @@
-from esctl.formatter import TableKey
+import io
+from argparse import Namespace
+
+from cliff.formatters.json_format import JSONFormatter
+
+from esctl.formatter import JSONToCliffFormatter, NDJSONFormatter, StreamingJSONFormatter, TableKey
 
 from .base_test_class import EsctlTestCase
 
@@ -53,3 +58,65 @@ class TestCreateColumnNameFromId(EsctlTestCase):
                 TableKey(case)._create_name_from_id(pretty_key=False),
                 case,
             )
+
+    def test_name_is_cached_per_pretty_key(self):
+        self.assertEqual(TableKey("foo.percent").name, "Foo %")
+        self.assertEqual(TableKey("foo.percent", pretty_key=False).name, "foo.percent")
+        self.assertEqual(TableKey("foo.percent").name, "Foo %")
+
+    def test_split_string(self):
+        cases = {
+            "foo": ["foo"],
+            "foo_bar": ["foo", "bar"],
+            "_foo_bar": ["", "foo", "bar"],
+            "foo.bar_baz.qux": ["foo", "bar", "baz", "qux"],
+            "_source._meta_data.create_time": ["_source", "_meta_data", "create", "time"],
+        }
+
+        for string, words in cases.items():
+            self.assertEqual(TableKey._split_string(string), words)
+
+
+class TestFormatForLister(EsctlTestCase):
+    def test_lines_are_built_lazily(self):
+        consumed = []
+
+        def lines():
+            for i in range(3):
+                consumed.append(i)
+                yield {"index": f"index-{i}", "docs.count": i or None}
+
+        headers, data = JSONToCliffFormatter(lines()).format_for_lister(
+            columns=[("index",), ("docs.count",)],
+            none_as="-",
+        )
+
+        self.assertEqual(headers, ("Index", "Docs Count"))
+        self.assertEqual(consumed, [])
+        self.assertEqual(next(data), ("index-0", "-"))
+        self.assertEqual(consumed, [0])
+        self.assertEqual(list(data), [("index-1", 1), ("index-2", 2)])
+
+
+class TestStreamingFormatters(EsctlTestCase):
+    columns = ("Index", "Docs Count")
+    rows = [("foo", 1), ("bar\nbaz", None)]
+
+    def emit(self, formatter, rows, noindent=False):
+        stdout = io.StringIO()
+        formatter.emit_list(self.columns, iter(rows), stdout, Namespace(noindent=noindent))
+        return stdout.getvalue()
+
+    def test_json_output_is_the_same_as_cliff(self):
+        for rows in [self.rows, self.rows[:1], []]:
+            for noindent in [False, True]:
+                self.assertEqual(
+                    self.emit(StreamingJSONFormatter(), rows, noindent),
+                    self.emit(JSONFormatter(), rows, noindent),
+                )
+
+    def test_ndjson(self):
+        self.assertEqual(
+            self.emit(NDJSONFormatter(), self.rows),
+            '{"Index": "foo", "Docs Count": 1}\n{"Index": "bar\\nbaz", "Docs Count": null}\n',
+        )
@@ -0,0 +1,67 @@
+from esctl.query import NodeStatsPlan, compile_expression, fields_to_paths, read_paths
+
+from .base_test_class import EsctlTestCase
+
+
+class TestCompileExpression(EsctlTestCase):
+    def test_expression_is_compiled_once(self):
+        compile_expression.cache_clear()
+
+        for _ in range(3):
+            self.assertEqual(compile_expression("*.name").search({"a": {"name": "foo"}}), ["foo"])
+
+        self.assertEqual(compile_expression.cache_info().misses, 1)
+        self.assertEqual(compile_expression.cache_info().hits, 2)
+
+
+class TestReadPaths(EsctlTestCase):
+    def test_read_paths(self):
+        cases = {
+            "*.jvm.mem.heap_used_percent": {("*", "jvm", "mem", "heap_used_percent")},
+            "*.{name: name, heap: jvm.mem.heap_used_percent}": {
+                ("*", "name"),
+                ("*", "jvm", "mem", "heap_used_percent"),
+            },
+            "abc.fs.data[0].available_in_bytes": {("abc", "fs", "data", "available_in_bytes")},
+            "values(@)[?jvm.mem.heap_used_percent > `50`].name": {
+                ("*", "name"),
+                ("*", "jvm", "mem", "heap_used_percent"),
+            },
+            "sort_by(values(@), &jvm.uptime_in_millis)[].name": {
+                ("*", "name"),
+                ("*", "jvm", "uptime_in_millis"),
+            },
+            "*.indices | [0].docs": {("*", "indices", "docs")},
+            "*.jvm.mem.heap_used_percent | max(@)": {("*", "jvm", "mem", "heap_used_percent")},
+            "*.jvm.mem | [?heap_used_percent > `50`]": {("*", "jvm", "mem")},
+            "keys(@)": {()},
+            "@": {()},
+        }
+
+        for expression, paths in cases.items():
+            self.assertEqual(read_paths(expression), paths, expression)
+
+
+class TestNodeStatsPlan(EsctlTestCase):
+    def test_plan(self):
+        plan = NodeStatsPlan(read_paths("*.{name: name, docs: indices.docs.count, merges: indices.merges}"))
+
+        self.assertEqual(plan.metric, ["indices"])
+        self.assertEqual(plan.index_metric, ["docs", "merge"])
+        self.assertEqual(plan.filter_path, ["nodes.*.indices.docs.count", "nodes.*.indices.merges", "nodes.*.name"])
+
+    def test_plan_from_fields(self):
+        plan = NodeStatsPlan(fields_to_paths(["jvm.mem", "fs.total", "jvm.mem.heap_used_percent"]))
+
+        self.assertEqual(plan.metric, ["fs", "jvm"])
+        self.assertIsNone(plan.index_metric)
+        self.assertEqual(plan.filter_path, ["nodes.*.fs.total", "nodes.*.jvm.mem"])
+
+    def test_nothing_can_be_narrowed(self):
+        for paths in [{()}, {("*",)}, {("*", "unknown")}, {("*", "*", "mem")}]:
+            plan = NodeStatsPlan(paths)
+
+            self.assertIsNone(plan.metric)
+            self.assertIsNone(plan.index_metric)
+
+        self.assertIsNone(NodeStatsPlan({()}).filter_path)
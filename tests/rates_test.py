@@ -0,0 +1,106 @@
+from esctl.rates import CounterRates, is_counter, operations_counter
+
+from .base_test_class import EsctlTestCase
+
+
+def node_stats(timestamp, queries, query_time, gc_time, heap=100):
+    return {
+        "abc": {
+            "name": "es-1",
+            "timestamp": timestamp,
+            "indices": {"search": {"query_total": queries, "query_time_in_millis": query_time, "open_contexts": 3}},
+            "jvm": {
+                "uptime_in_millis": timestamp,
+                "mem": {"heap_used_in_bytes": heap},
+                "gc": {
+                    "collectors": {"young": {"collection_count": gc_time // 10, "collection_time_in_millis": gc_time}}
+                },
+            },
+        },
+    }
+
+
+class TestCounters(EsctlTestCase):
+    def test_is_counter(self):
+        self.assertTrue(is_counter("indices.indexing.index_total"))
+        self.assertTrue(is_counter("thread_pool.write.rejected"))
+        self.assertTrue(is_counter("transport.rx_size_in_bytes"))
+        self.assertFalse(is_counter("jvm.mem.heap_used_in_bytes"))
+        self.assertFalse(is_counter("jvm.uptime_in_millis"))
+        self.assertFalse(is_counter("indices.search.open_contexts"))
+
+    def test_gauges_are_not_counters(self):
+        for key in [
+            "indices.docs.count",
+            "indices.segments.count",
+            "jvm.threads.count",
+            "indices.shard_stats.total_count",
+            "indices.segments.memory_size_in_bytes",
+            "indices.fielddata.memory_size_in_bytes",
+            "breakers.request.estimated_size_in_bytes",
+            "indices.translog.uncommitted_size_in_bytes",
+            "indices.store.size_in_bytes",
+            "http.current_open",
+        ]:
+            with self.subTest(key=key):
+                self.assertFalse(is_counter(key))
+
+    def test_counters(self):
+        for key in [
+            "indices.merges.total",
+            "indices.merges.total_size_in_bytes",
+            "indices.query_cache.hit_count",
+            "jvm.gc.collectors.old.collection_count",
+            "jvm.gc.collectors.old.collection_time_in_millis",
+            "breakers.parent.tripped",
+            "http.total_opened",
+            "ingest.total.count",
+            "ingest.total.time_in_millis",
+            "process.cpu.total_in_millis",
+        ]:
+            with self.subTest(key=key):
+                self.assertTrue(is_counter(key))
+
+    def test_operations_counter(self):
+        keys = {"indices.search.query_total", "indices.merges.total", "indices.get.total"}
+
+        self.assertEqual(operations_counter("indices.search.query_time_in_millis", keys), "indices.search.query_total")
+        self.assertEqual(operations_counter("indices.merges.total_time_in_millis", keys), "indices.merges.total")
+        self.assertEqual(operations_counter("indices.get.time_in_millis", keys), "indices.get.total")
+        self.assertIsNone(operations_counter("indices.indexing.throttle_time_in_millis", keys))
+
+
+class TestCounterRates(EsctlTestCase):
+    def test_rates(self):
+        counter_rates = CounterRates()
+        counter_rates.add(node_stats(0, 100, 1_000, 0))
+        counter_rates.add(node_stats(10_000, 300, 1_600, 100, heap=50))
+        counter_rates.add(node_stats(20_000, 1_300, 2_600, 300))
+
+        self.assertEqual(
+            counter_rates.rates(),
+            {
+                "es-1": {
+                    "indices.search.query_latency_in_millis": 1.333,
+                    "indices.search.query_time_in_millis/s": 80.0,
+                    "indices.search.query_total/s": 60.0,
+                    "jvm.gc.collectors.young.collection_count/s": 1.5,
+                    "jvm.gc.collectors.young.collection_latency_in_millis": 10.0,
+                    "jvm.gc.collectors.young.collection_time_in_millis/s": 15.0,
+                    "jvm.gc.collectors.young.pause_percent": 1.5,
+                    "jvm.gc.pause_percent": 1.5,
+                },
+            },
+        )
+        self.assertEqual(counter_rates.rates(with_peaks=True)["es-1"]["indices.search.query_total/s max"], 100.0)
+        self.assertEqual(len(counter_rates.metrics), 4)
+
+    def test_restarted_node_and_new_metrics(self):
+        counter_rates = CounterRates()
+        counter_rates.add({"abc": {"name": "es-1", "timestamp": 0, "indexing": {"index_total": 500}}})
+        counter_rates.add(
+            {"abc": {"name": "es-1", "timestamp": 5_000, "indexing": {"index_total": 10}, "get": {"total": 5}}},
+        )
+
+        # The counter went down, and the new one has no previous value
+        self.assertEqual(counter_rates.rates(), {"es-1": {}})
@@ -0,0 +1,103 @@
+import os
+import tempfile
+
+from esctl.exceptions import NotRecordedError
+from esctl.record import MetricsStore, RecordedElasticsearch, filter_document
+
+from .base_test_class import EsctlTestCase
+
+
+class TestMetricsStore(EsctlTestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = MetricsStore(os.path.join(self.directory.name, "records", "test.sqlite"))
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_state_at_any_time(self):
+        self.store.append("cluster health", 10, {"status": "green"})
+        self.store.append("cluster health", 20, {"status": "green"})
+        self.store.append("cluster health", 30, {"status": "red"})
+        self.assertEqual(self.store.flush(), 3)
+
+        self.assertIsNone(self.store.at("cluster health", 5))
+        self.assertEqual(self.store.at("cluster health", 25), (20, {"status": "green"}))
+        self.assertEqual(self.store.at("cluster health", 30), (30, {"status": "red"}))
+
+        # The second sample is the same as the first one : its body isn't stored again
+        bodies = self.store.connection.execute("SELECT body IS NULL FROM samples ORDER BY timestamp").fetchall()
+        self.assertEqual([row[0] for row in bodies], [0, 1, 0])
+        self.assertEqual(self.store.summary()[0]["samples"], 3)
+
+
+class TestRecordedElasticsearch(EsctlTestCase):
+    def test_filter_document(self):
+        document = {"nodes": {"a": {"name": "es-1", "jvm": {"mem": 1, "gc": 2}}, "b": {"name": "es-2"}}}
+
+        self.assertEqual(
+            filter_document(document, ["nodes.*.name", "nodes.a.jvm.gc"]),
+            {"nodes": {"a": {"name": "es-1", "jvm": {"gc": 2}}, "b": {"name": "es-2"}}},
+        )
+
+    def test_recorded_apis(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = MetricsStore(os.path.join(directory, "test.sqlite"))
+            store.append("cat thread-pool", 10, [{"node_name": "es-1", "name": "write", "rejected": "3"}])
+            store.flush()
+
+            es = RecordedElasticsearch(store, 15)
+
+            self.assertEqual(es.cat.thread_pool(format="json", h="name,rejected"), [{"name": "write", "rejected": "3"}])
+            self.assertEqual(es.sample_times, {"cat thread-pool": 10})
+
+            with self.assertRaises(NotRecordedError):
+                es.cat.thread_pool(format="json", h="name,pool_size")
+
+            with self.assertRaises(NotRecordedError):
+                es.cat.shards()
+
+            with self.assertRaises(NotRecordedError):
+                es.cluster.health()
+
+            store.close()
+
+    def test_nodes_stats_metrics(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = MetricsStore(os.path.join(directory, "test.sqlite"))
+            store.append(
+                "nodes stats",
+                10,
+                {
+                    "nodes": {
+                        "abc": {
+                            "name": "es-1",
+                            "timestamp": 10000,
+                            "jvm": {"threads": {"count": 20}},
+                            "breakers": {"parent": {"tripped": 0}},
+                            "indices": {"docs": {"count": 3}, "merges": {"total": 1}},
+                        },
+                    },
+                },
+            )
+            store.flush()
+
+            es = RecordedElasticsearch(store, 15)
+
+            self.assertEqual(
+                es.nodes.stats(metric="breaker,indices", index_metric="merge")["nodes"]["abc"],
+                {
+                    "name": "es-1",
+                    "timestamp": 10000,
+                    "breakers": {"parent": {"tripped": 0}},
+                    "indices": {"merges": {"total": 1}},
+                },
+            )
+            self.assertEqual(
+                es.nodes.stats(metric="_all")["nodes"]["abc"]["jvm"],
+                {"threads": {"count": 20}},
+            )
+
+            store.close()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+from esctl.reindex import (
+    DONE,
+    FAILED,
+    PENDING,
+    PressureGauge,
+    ReindexState,
+    check_destination_template,
+    destination_name,
+)
+
+from .base_test_class import EsctlTestCase
+
+
+class TestDestinationName(EsctlTestCase):
+    def test_wildcards(self):
+        self.assertEqual(destination_name("logs-2024.*", "logs-v2-2024.*", "logs-2024.01.31"), "logs-v2-2024.01.31")
+        self.assertEqual(destination_name("*-logs-*", "logs-*-*", "app-logs-2024"), "logs-app-2024")
+
+    def test_index_placeholder(self):
+        self.assertEqual(destination_name("logs-*", "{index}-v2", "logs-2024"), "logs-2024-v2")
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            destination_name("logs-*", "v2-*", "metrics-2024")
+
+        with self.assertRaises(ValueError):
+            destination_name("logs-*", "v2-*-*", "logs-2024")
+
+    def test_check_destination_template(self):
+        check_destination_template("logs-*", "{index}-v2")
+
+        for pattern, template in [("a-*,b-*", "v2-*"), ("logs-*", "v2-*-*"), ("logs-*", "logs-v2")]:
+            with self.subTest(pattern=pattern, template=template), self.assertRaises(ValueError):
+                check_destination_template(pattern, template)
+
+
+class TestReindexState(EsctlTestCase):
+    def test_state_is_saved_and_resumed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.json")
+
+            state = ReindexState.load(path)
+            state.add("logs-1", "logs-v2-1")
+            state.add("logs-2", "logs-v2-2")
+            state.update("logs-1", state=DONE)
+            state.update("logs-2", state=FAILED, error="boom")
+
+            state = ReindexState.load(path)
+            state.add("logs-1", "ignored")
+            state.resume()
+
+            self.assertEqual(state.indices["logs-1"], {"destination": "logs-v2-1", "state": DONE, "task": None})
+            self.assertEqual(state.with_state(PENDING), ["logs-2"])
+
+
+class TestPressureGauge(EsctlTestCase):
+    def test_pressure(self):
+        gauge = PressureGauge(max_queue=10, max_pending_tasks=5)
+        write = {"node_name": "es-1", "name": "write", "queue": "0", "rejected": "3"}
+
+        self.assertIsNone(gauge.check([write], 0))
+        self.assertEqual(gauge.check([dict(write, queue="11")], 0), "write queue at 11 on es-1")
+        self.assertEqual(
+            gauge.check([dict(write, rejected="5")], 6), "6 pending cluster tasks, 2 write rejections on es-1"
+        )
+        self.assertIsNone(gauge.check([dict(write, rejected="5")], 0))
@@ -0,0 +1,125 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from esctl.config import Context
+from esctl.elasticsearch import Client
+from esctl.response_cache import ResponseCache, time_to_live
+
+from .stub_elasticsearch import StubElasticsearch
+
+HEADERS = {"x-elastic-product": "Elasticsearch"}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.clock = Clock()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def cache(self, **kwargs):
+        return ResponseCache("test", self.directory.name, clock=self.clock, **kwargs)
+
+    def test_only_read_only_endpoints_are_cached(self):
+        self.assertEqual(time_to_live("GET", "/_cat/nodes?format=json&h=name"), 30)
+        self.assertEqual(time_to_live("GET", "/_cat/indices/foo-*?format=json"), 10)
+        self.assertEqual(time_to_live("GET", "/"), 60)
+        self.assertIsNone(time_to_live("GET", "/_cat/shards?format=json"))
+        self.assertIsNone(time_to_live("DELETE", "/_cat/nodes"))
+
+    def test_responses_expire(self):
+        cache = self.cache()
+        cache.put("GET", "/_cat/nodes?h=name", 200, HEADERS, [{"name": "es-1"}])
+
+        self.assertEqual(cache.get("GET", "/_cat/nodes?h=name"), (200, HEADERS, [{"name": "es-1"}]))
+        # Parameters are part of the key
+        self.assertIsNone(cache.get("GET", "/_cat/nodes?h=ip"))
+
+        self.clock.now += 31
+        self.assertIsNone(cache.get("GET", "/_cat/nodes?h=name"))
+
+    def test_errors_are_not_cached(self):
+        cache = self.cache()
+        cache.put("GET", "/_cat/indices/foo", 404, HEADERS, {"error": "index_not_found_exception"})
+
+        self.assertIsNone(cache.get("GET", "/_cat/indices/foo"))
+
+    def test_responses_are_shared_on_disk(self):
+        self.cache().put("GET", "/", 200, HEADERS, {"cluster_name": "foo"})
+
+        self.assertEqual(self.cache().get("GET", "/"), (200, HEADERS, {"cluster_name": "foo"}))
+        self.assertIsNone(ResponseCache("other", self.directory.name, clock=self.clock).get("GET", "/"))
+
+    def test_memory_follows_the_disk(self):
+        # Like the daemon, while another esctl process runs commands
+        daemon, other = self.cache(), self.cache()
+        daemon.put("GET", "/", 200, HEADERS, {"cluster_name": "foo"})
+
+        other.clear()
+        self.assertIsNone(daemon.get("GET", "/"))
+
+        other.put("GET", "/", 200, HEADERS, {"cluster_name": "bar"})
+        self.assertEqual(daemon.get("GET", "/")[2], {"cluster_name": "bar"})
+
+        other.clear()
+        other.put("GET", "/", 200, HEADERS, {"cluster_name": "baz"})
+        self.assertEqual(daemon.get("GET", "/")[2], {"cluster_name": "baz"})
+
+    def test_least_recently_used_responses_are_dropped(self):
+        cache = self.cache(max_entries=2, max_disk_entries=2)
+
+        for index, name in enumerate(["a", "b", "c"]):
+            cache.put("GET", f"/_cat/indices/{name}", 200, HEADERS, [])
+            # Files are told apart by their modification time
+            os.utime(cache._path(cache._key("GET", f"/_cat/indices/{name}")), (index, index))
+
+        self.assertEqual(len(cache.entries), 2)
+        self.assertEqual(len(os.listdir(cache.directory)), 2)
+        self.assertIsNone(self.cache().get("GET", "/_cat/indices/a"))
+        self.assertIsNotNone(self.cache().get("GET", "/_cat/indices/c"))
+
+    def test_refresh_and_no_cache(self):
+        cache = self.cache()
+        cache.put("GET", "/", 200, HEADERS, {"cluster_name": "foo"})
+
+        cache.read = False
+        self.assertIsNone(cache.get("GET", "/"))
+        cache.put("GET", "/", 200, HEADERS, {"cluster_name": "bar"})
+
+        cache.write = False
+        cache.put("GET", "/", 200, HEADERS, {"cluster_name": "baz"})
+
+        cache.read = True
+        self.assertEqual(cache.get("GET", "/")[2], {"cluster_name": "bar"})
+
+    def test_requests_through_the_client(self):
+        responses = {"/_cat/nodes": [{"name": "es-1"}], "/_cluster/settings": {"acknowledged": True}}
+
+        with StubElasticsearch(responses) as stub:
+            cache = self.cache()
+            client = Client(Context("test", None, {"servers": [stub.url]}, {}), response_cache=cache)
+
+            for _ in range(2):
+                nodes = client.es.cat.nodes(format="json", h="name")
+                self.assertEqual(nodes.body, [{"name": "es-1"}])
+                # Commands modify what they get : it mustn't change the cached response
+                nodes.body.append({"name": "changed"})
+
+            self.assertEqual(len(stub.requests), 1)
+
+            # Changing anything drops the cached responses
+            client.es.cluster.put_settings(transient={"cluster.routing.allocation.enable": "all"})
+            self.assertEqual(os.listdir(cache.directory), [])
+            client.es.cat.nodes(format="json", h="name")
+
+            self.assertEqual(len(stub.requests), 3)
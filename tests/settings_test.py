@@ -77,6 +77,96 @@ class TestClusterSettingsRetrieval(EsctlTestCase):
             None,
         )
 
+    def test_settings_get_only_fetches_the_key(self):
+        import esctl.settings
+
+        esctl.settings.ClusterSettings().get("cluster.routing.allocation.*", persistency="transient")
+
+        self.assertEqual(
+            self.mock.cluster.get_settings.call_args.kwargs.get("filter_path"),
+            [
+                "transient.cluster.routing.allocation.*",
+                "persistent.cluster.routing.allocation.*",
+                "defaults.cluster.routing.allocation.*",
+            ],
+        )
+
+    def test_settings_are_fetched_once(self):
+        import esctl.settings
+
+        cluster_settings = esctl.settings.ClusterSettings()
+        cluster_settings.list_()
+        cluster_settings.get("thread_pool.estimated_time_interval")
+        cluster_settings.mget_many(["thread_pool.estimated_time_interval", "cluster.*"])
+
+        self.assertEqual(self.mock.cluster.get_settings.call_count, 1)
+
+        cluster_settings.set("thread_pool.estimated_time_interval", "1s")
+        cluster_settings.get("thread_pool.estimated_time_interval")
+
+        self.assertEqual(self.mock.cluster.get_settings.call_count, 2)
+
+    def test_settings_mget_many(self):
+        import esctl.settings
+
+        settings = esctl.settings.ClusterSettings().mget_many(["cluster.routing.*", "foobar"])
+
+        self.assertEqual(
+            list(settings.keys()),
+            [
+                "cluster.routing.allocation.allow_rebalance",
+                "cluster.routing.allocation.disk.watermark.high",
+                "foobar",
+            ],
+        )
+        self.assertEqual(
+            settings.get("cluster.routing.allocation.allow_rebalance").get("persistent").value, "indices_all_active"
+        )
+        self.assertEqual(settings.get("cluster.routing.allocation.disk.watermark.high").get("transient").value, None)
+        self.assertEqual(settings.get("foobar").get("defaults").value, None)
+        self.assertEqual(self.mock.cluster.get_settings.call_count, 1)
+
+
+class TestClusterSettingsSnapshot(EsctlTestCase):
+    def setUp(self):
+        super().setUp()
+        import esctl.settings
+
+        self.snapshot = esctl.settings.ClusterSettingsSnapshot(TestClusterSettingsRetrieval.fixtures(None))
+
+    def test_with_prefix(self):
+        self.assertEqual(
+            self.snapshot.with_prefix("cluster.routing.allocation.d"),
+            ["cluster.routing.allocation.disk.watermark.high"],
+        )
+        self.assertEqual(len(self.snapshot.with_prefix("")), 3)
+        self.assertEqual(self.snapshot.with_prefix("indices."), [])
+
+    def test_match(self):
+        self.assertEqual(
+            self.snapshot.match("cluster.routing.*"),
+            ["cluster.routing.allocation.allow_rebalance", "cluster.routing.allocation.disk.watermark.high"],
+        )
+        self.assertEqual(self.snapshot.match("*.estimated_time_?nterval"), ["thread_pool.estimated_time_interval"])
+        self.assertEqual(
+            self.snapshot.match("thread_pool.estimated_time_interval"), ["thread_pool.estimated_time_interval"]
+        )
+        self.assertEqual(self.snapshot.match("foobar"), [])
+
+    def test_effective(self):
+        self.assertEqual(self.snapshot.effective("thread_pool.estimated_time_interval").value, "100ms")
+        self.assertEqual(
+            self.snapshot.effective("cluster.routing.allocation.disk.watermark.high").persistency, "defaults"
+        )
+        self.assertEqual(self.snapshot.effective("foobar").value, None)
+
+    def test_filter_path(self):
+        import esctl.settings
+
+        self.assertEqual(esctl.settings.ClusterSettings._filter_path("cluster.routing.*"), "cluster.routing.*")
+        self.assertEqual(esctl.settings.ClusterSettings._filter_path("cluster.rout*.enable"), "cluster.rout*")
+        self.assertEqual(esctl.settings.ClusterSettings._filter_path("cluster.r?uting.enable"), "cluster.*")
+
 
 class TestIndexSettingsRetrieval(EsctlTestCase):
     def setUp(self):
@@ -102,3 +192,83 @@ class TestIndexSettingsRetrieval(EsctlTestCase):
             .value,
             "standard",
         )
+
+    def test_requested_settings_are_pushed_down(self):
+        import esctl.settings
+
+        esctl.settings.IndexSettings().get("foobar", "index.number_of_*")
+
+        self.assertEqual(self.mock.indices.get_settings.call_args.kwargs.get("name"), "index.number_of_*")
+
+
+class TestIndexSettingsTable(EsctlTestCase):
+    def setUp(self):
+        super().setUp()
+        import esctl.settings
+
+        self.table = esctl.settings.IndexSettingsTable.from_response(
+            {
+                "foo": {
+                    "settings": {"index.number_of_replicas": "1"},
+                    "defaults": {"index.refresh_interval": "1s", "index.hidden": "false"},
+                },
+                "bar": {
+                    "settings": {"index.number_of_replicas": "2", "index.refresh_interval": "30s"},
+                    "defaults": {"index.hidden": "false"},
+                },
+                "baz": {
+                    "settings": {},
+                    "defaults": {"index.refresh_interval": "5s", "index.number_of_replicas": "1"},
+                },
+            },
+        )
+
+    def test_get(self):
+        self.assertEqual(self.table.get("foo", "index.number_of_replicas").value, "1")
+        self.assertEqual(self.table.get("foo", "index.refresh_interval").persistency, "defaults")
+        self.assertEqual(self.table.get("bar", "index.refresh_interval").value, "30s")
+        self.assertEqual(self.table.get("bar", "index.refresh_interval").persistency, "settings")
+        self.assertEqual(self.table.get("baz", "index.refresh_interval").value, "5s")
+        self.assertIsNone(self.table.get("foo", "index.foobar"))
+        self.assertIsNone(self.table.get("qux", "index.hidden"))
+
+    def test_defaults_are_stored_once(self):
+        import esctl.settings
+
+        self.assertEqual(self.table.keys, ["index.number_of_replicas", "index.refresh_interval", "index.hidden"])
+        self.assertEqual(self.table.defaults, ["1", "1s", "false"])
+        # Only "baz" has a default which differs from the others', and "bar" and "baz" lack some of them
+        self.assertEqual(
+            self.table.default_overrides,
+            {1: {1: esctl.settings.NO_DEFAULT}, 2: {1: "5s", 2: esctl.settings.NO_DEFAULT}},
+        )
+
+    def test_missing_defaults_are_not_taken_from_other_indices(self):
+        import esctl.settings
+
+        table = esctl.settings.IndexSettingsTable.from_response(
+            {
+                "foo": {"settings": {"index.number_of_replicas": "1"}, "defaults": {}},
+                "bar": {"settings": {}, "defaults": {"index.hidden": "false"}},
+                "baz": {"settings": {}, "defaults": {}},
+            },
+        )
+
+        # "foo" came before the first index with a default, "baz" after it
+        self.assertIsNone(table.get("foo", "index.hidden"))
+        self.assertEqual(table.get("bar", "index.hidden").value, "false")
+        self.assertIsNone(table.get("baz", "index.hidden"))
+        self.assertEqual(table.as_dict("baz"), {"settings": {}, "defaults": {}})
+        self.assertIsNone(self.table.get("baz", "index.hidden"))
+
+    def test_as_dict(self):
+        self.assertEqual(
+            self.table.as_dict("baz"),
+            {
+                "settings": {},
+                "defaults": {
+                    "index.number_of_replicas": "1",
+                    "index.refresh_interval": "5s",
+                },
+            },
+        )
@@ -0,0 +1,71 @@
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubElasticsearch:
+    """Minimal local HTTP server answering like an Elasticsearch node.
+
+    `responses` maps a path (without query string) to the JSON document to return.
+    `delay` makes every response wait that many seconds, to simulate a slow node.
+    Request bodies are kept in `bodies`, parsed, in the same order as `requests`.
+    """
+
+    def __init__(self, responses=None, delay: float = 0.0):
+        self.responses = responses or {}
+        self.delay = delay
+        self.requests: list[tuple[str, str]] = []
+        self.bodies: list = []
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                stub.requests.append((self.command, self.path))
+
+                length = int(self.headers.get("Content-Length") or 0)
+                stub.bodies.append(json.loads(self.rfile.read(length)) if length else None)
+
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                response = stub.responses.get(self.path.split("?")[0], {})
+                if callable(response):
+                    response = response(self.command, self.path)
+
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-Elastic-Product", "Elasticsearch")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_PUT = do_POST = do_DELETE = _respond
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.block_on_close = False
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def dead_server_url() -> str:
+    """Return the URL of a local port nobody listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    return f"http://127.0.0.1:{port}"
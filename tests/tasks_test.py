@@ -0,0 +1,48 @@
+from esctl.tasks import TaskProgress, TaskStatus, format_duration
+
+from .base_test_class import EsctlTestCase
+
+
+def task_response(created, total=1000, running_time=10, slices=None):
+    status = {"total": total, "created": created, "updated": 0, "deleted": 0, "noops": 0, "version_conflicts": 0}
+    if slices is not None:
+        status["slices"] = slices
+
+    return {"completed": False, "task": {"status": status, "running_time_in_nanos": running_time * 10**9}}
+
+
+class TestFormatDuration(EsctlTestCase):
+    def test_format_duration(self):
+        self.assertEqual(format_duration(3.4), "3s")
+        self.assertEqual(format_duration(123), "2m03s")
+        self.assertEqual(format_duration(3723), "1h02m03s")
+        self.assertEqual(format_duration(None), "-")
+
+
+class TestTaskStatus(EsctlTestCase):
+    def test_progress(self):
+        status = TaskStatus.from_response(task_response(250))
+
+        self.assertEqual(status.processed, 250)
+        self.assertEqual(status.ratio, 0.25)
+        self.assertEqual(status.running_time, 10)
+        self.assertEqual(status.describe(), "25.0% (250/1000 docs)")
+
+    def test_unknown_total(self):
+        self.assertIsNone(TaskStatus.from_response(task_response(0, total=0)).ratio)
+
+    def test_slices(self):
+        status = TaskStatus.from_response(task_response(0, slices=[{"slice_id": 0, "total": 10, "created": 5}, None]))
+
+        self.assertEqual([slice_status.processed for slice_status in status.slices], [5])
+
+
+class TestTaskProgress(EsctlTestCase):
+    def test_rate_and_eta(self):
+        progress = TaskProgress()
+
+        # 100 docs in 10 seconds since the task started
+        self.assertEqual(progress.update(TaskStatus.from_response(task_response(100)), now=0), 10)
+        # 200 more docs in 5 seconds : 40 docs/s, averaged with the previous rate
+        self.assertAlmostEqual(progress.update(TaskStatus.from_response(task_response(300)), now=5), 19)
+        self.assertAlmostEqual(progress.eta(TaskStatus.from_response(task_response(300))), 700 / 19)
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from esctl.config import Context
+from esctl.elasticsearch import Client
+
+from .stub_elasticsearch import StubElasticsearch, dead_server_url
+
+HEALTH = {"/_cluster/health": {"status": "green"}}
+
+
+class TestMultiNodeClient(TestCase):
+    def client(self, servers, **settings):
+        return Client(Context("test", None, {"servers": servers}, settings))
+
+    def test_round_robin_uses_every_node(self):
+        with StubElasticsearch(HEALTH) as first, StubElasticsearch(HEALTH) as second:
+            client = self.client([first.url, second.url], node_selector="round_robin")
+
+            for _ in range(4):
+                self.assertEqual(client.es.cluster.health()["status"], "green")
+
+            self.assertEqual(len(first.requests), 2)
+            self.assertEqual(len(second.requests), 2)
+
+    def test_dead_node_is_skipped(self):
+        with StubElasticsearch(HEALTH) as alive:
+            client = self.client([dead_server_url(), alive.url], max_retries=2)
+
+            for _ in range(4):
+                self.assertEqual(client.es.cluster.health()["status"], "green")
+
+            self.assertEqual(len(alive.requests), 4)
+            self.assertEqual(len(client.es.transport.node_pool._dead_nodes.queue), 1)
+
+    def test_least_latency_avoids_slow_node(self):
+        with StubElasticsearch(HEALTH, delay=0.3) as slow, StubElasticsearch(HEALTH) as fast:
+            client = self.client([slow.url, fast.url], node_selector="least_latency")
+
+            for _ in range(10):
+                self.assertEqual(client.es.cluster.health()["status"], "green")
+
+            # The slow node is only used until the fast one has been measured
+            self.assertEqual(len(slow.requests), 1)
+            self.assertEqual(len(fast.requests), 9)
+
+    def test_least_latency_measures_other_nodes_again(self):
+        with StubElasticsearch(HEALTH, delay=0.3) as slow, StubElasticsearch(HEALTH) as fast:
+            client = self.client([slow.url, fast.url], node_selector="least_latency")
+
+            for _ in range(40):
+                client.es.cluster.health()
+
+            # Every 20th request checks whether the slow node got faster
+            self.assertEqual(len(slow.requests), 3)
+
+    def test_slow_node_times_out_and_is_retried_elsewhere(self):
+        with StubElasticsearch(HEALTH, delay=2) as slow, StubElasticsearch(HEALTH) as fast:
+            client = self.client(
+                [slow.url, fast.url],
+                timeout=1,
+                max_retries=1,
+                retry_on_timeout=True,
+                node_selector="round_robin",
+            )
+
+            self.assertEqual(client.es.cluster.health()["status"], "green")
+            self.assertEqual(len(fast.requests), 1)
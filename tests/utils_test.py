@@ -0,0 +1,81 @@
+import argparse
+
+from esctl.utils import flatten_dict, float_at_least, int_at_least, positive_float
+
+from .base_test_class import EsctlTestCase
+
+
+class TestFlattenDict(EsctlTestCase):
+    def setUp(self):
+        self.document = {
+            "cluster_name": "foo",
+            "nodes": {
+                "count": {"total": 3, "data": 2},
+                "jvm": {"versions": [{"version": "21", "count": 3}]},
+                "plugins": [],
+                "settings": {},
+            },
+            "status": "green",
+        }
+
+    def test_flatten_dict(self):
+        flat_dict = flatten_dict(self.document)
+
+        self.assertEqual(
+            flat_dict,
+            {
+                "cluster_name": "foo",
+                "nodes.count.total": 3,
+                "nodes.count.data": 2,
+                "nodes.jvm.versions": [{"version": "21", "count": 3}],
+                "nodes.plugins": [],
+                "status": "green",
+            },
+        )
+        # Keys keep the order of the original document
+        self.assertEqual(list(flat_dict)[-1], "status")
+
+    def test_flatten_lists(self):
+        self.assertEqual(
+            flatten_dict(self.document["nodes"], flatten_lists=True),
+            {
+                "count.total": 3,
+                "count.data": 2,
+                "jvm.versions[0].version": "21",
+                "jvm.versions[0].count": 3,
+            },
+        )
+
+    def test_max_depth(self):
+        self.assertEqual(
+            flatten_dict(self.document, max_depth=2),
+            {
+                "cluster_name": "foo",
+                "nodes.count": {"total": 3, "data": 2},
+                "nodes.jvm": {"versions": [{"version": "21", "count": 3}]},
+                "nodes.plugins": [],
+                "nodes.settings": {},
+                "status": "green",
+            },
+        )
+
+    def test_prefixes(self):
+        self.assertEqual(
+            flatten_dict(self.document, flatten_lists=True, prefixes=["nodes.jvm.versions[0].v", "status"]),
+            {"nodes.jvm.versions[0].version": "21", "status": "green"},
+        )
+
+    def test_positive_float(self):
+        self.assertEqual(positive_float("0.5"), 0.5)
+
+        for value in ["0", "-1", "nan", "soon"]:
+            with self.subTest(value=value), self.assertRaises(argparse.ArgumentTypeError):
+                positive_float(value)
+
+    def test_at_least(self):
+        self.assertEqual(int_at_least(1)("3"), 3)
+        self.assertEqual(float_at_least(0)("0"), 0.0)
+
+        for parse, value in [(int_at_least(1), "0"), (int_at_least(0), "1.5"), (float_at_least(0), "-0.1")]:
+            with self.subTest(value=value), self.assertRaises(argparse.ArgumentTypeError):
+                parse(value)
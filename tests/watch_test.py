@@ -0,0 +1,78 @@
+import io
+
+from esctl.watch import HIGHLIGHT, LiveTable, Schedule, fit, strip_ansi
+
+from .base_test_class import EsctlTestCase
+
+
+class TestSchedule(EsctlTestCase):
+    def test_ticks_dont_drift(self):
+        now = [100.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        schedule = Schedule(2, clock=lambda: now[0], sleep=sleep)
+
+        # Each run takes some time, which is taken off the next sleep
+        now[0] += 0.5
+        self.assertEqual(schedule.wait(), 0)
+        now[0] += 1.5
+        self.assertEqual(schedule.wait(), 0)
+
+        self.assertEqual(sleeps, [1.5, 0.5])
+        self.assertEqual(now[0], 104.0)
+
+    def test_late_ticks_are_skipped(self):
+        now = [0.0]
+        schedule = Schedule(2, clock=lambda: now[0], sleep=lambda seconds: now.__setitem__(0, now[0] + seconds))
+
+        now[0] += 5
+        self.assertEqual(schedule.wait(), 2)
+        self.assertEqual(now[0], 6.0)
+
+
+class TestLiveTable(EsctlTestCase):
+    def test_rates_and_highlights(self):
+        table = LiveTable(io.StringIO(), counter_columns=["Rejected"], key_columns=2, tty=False)
+
+        table.draw("title", ["Node", "Pool", "Rejected"], [("es-1", "write", "10"), ("es-1", "search", "0")], now=0)
+        table.draw("title", ["Node", "Pool", "Rejected"], [("es-1", "write", "30"), ("es-1", "search", "0")], now=10)
+
+        self.assertEqual(
+            table.lines,
+            [
+                "title",
+                "",
+                "Node  Pool    Rejected  Rejected/s",
+                "es-1  write   30        2.0",
+                "es-1  search  0         0.0",
+            ],
+        )
+
+        table.tty = True
+        table.draw("title", ["Node", "Pool", "Rejected"], [("es-1", "write", "30"), ("es-1", "search", "5")], now=20)
+
+        self.assertNotIn(HIGHLIGHT, table.lines[3])
+        self.assertIn(f"{HIGHLIGHT}5", table.lines[4])
+
+    def test_only_changed_lines_are_redrawn(self):
+        stream = io.StringIO()
+        table = LiveTable(stream, tty=True)
+
+        table.draw("title", ["Name", "Status"], [("a", "green"), ("b", "green"), ("c", "green")])
+        stream.truncate(0)
+        stream.seek(0)
+        table.draw("title", ["Name", "Status"], [("a", "green"), ("b", "red  ")])
+
+        output = stream.getvalue()
+        self.assertNotIn("title", output)
+        self.assertNotIn("a  green", output)
+        self.assertIn("\033[5;1H", output)
+        self.assertTrue(output.endswith("\033[6;1H\033[J"))
+
+    def test_fit(self):
+        self.assertEqual(strip_ansi(fit("ab\033[91mcdef\033[0mgh", 4)), "abcd")
+        self.assertEqual(fit("abc", 5), "abc")